@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { useFrappeGetCall, useFrappeAuth } from 'frappe-react-sdk';
+import { useFrappeGetCall, useFrappePostCall, useFrappeAuth } from 'frappe-react-sdk';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from './ui/card';
 import { Badge } from './ui/badge';
 import { Button } from './ui/button';
@@ -37,7 +37,8 @@ interface ActivityStats {
 interface ActivityResponse {
   status: string;
   activities: ActivityItem[];
-  stats: ActivityStats;
+  stats: ActivityStats | null;
+  next_cursor?: string | null;
   user: string;
   message?: ActivityResponse;
 }
@@ -51,7 +52,7 @@ const UserActivity = () => {
   const { currentUser } = useFrappeAuth();
   const { data: activityData, error: activityError, mutate: refreshActivity, isLoading } = useFrappeGetCall<ActivityResponse>(
     'surgical_training.api.user_activity.get_user_activity_history',
-    {}, // No limit - get all activities
+    {}, // First page; older pages are fetched with next_cursor
     undefined,
     {
       isPaused: () => !currentUser, // Only call API when user is authenticated
@@ -73,9 +74,36 @@ const UserActivity = () => {
   // Removed: Force refresh when currentUser becomes available
   // This was causing excessive re-renders and tab state resets
 
+  // Older pages fetched with the cursor of the previous page
+  const { call: fetchActivityPage } = useFrappePostCall(
+    'surgical_training.api.user_activity.get_user_activity_history'
+  );
+  const [olderActivities, setOlderActivities] = useState<ActivityItem[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+
   // Handle both direct response and message-wrapped response
   const responseData = activityData?.message || activityData;
-  const activities = responseData?.activities || [];
+  const activities = [...(responseData?.activities || []), ...olderActivities];
+
+  // A fresh first page restarts pagination
+  useEffect(() => {
+    setOlderActivities([]);
+    setNextCursor(responseData?.next_cursor || null);
+  }, [responseData]);
+
+  const loadMoreActivities = async () => {
+    if (!nextCursor || isLoadingMore) return;
+    setIsLoadingMore(true);
+    try {
+      const response = await fetchActivityPage({ cursor: nextCursor });
+      const page = response?.message || response;
+      setOlderActivities(prev => [...prev, ...(page?.activities || [])]);
+      setNextCursor(page?.next_cursor || null);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
   
   // Track successful loads and detect empty responses
   useEffect(() => {
@@ -479,6 +507,13 @@ const UserActivity = () => {
                   </button>
                 </div>
               ))}
+              {nextCursor && (
+                <div className="flex justify-center pt-2">
+                  <Button variant="outline" onClick={loadMoreActivities} disabled={isLoadingMore}>
+                    {isLoadingMore ? 'Loading...' : 'Load older activity'}
+                  </Button>
+                </div>
+              )}
             </div>
           )}
         </CardContent>
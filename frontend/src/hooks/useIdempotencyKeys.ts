@@ -0,0 +1,26 @@
+import { useCallback, useRef } from 'react';
+
+/**
+ * One idempotency key per logical submit.
+ * keyFor returns the same key for a draft until it is released, so a retried
+ * request replays the first response on the server instead of duplicating the write.
+ * Release the draft once the write succeeds; the next submit then gets a new key.
+ */
+export const useIdempotencyKeys = () => {
+  const keys = useRef(new Map<string, string>());
+
+  const keyFor = useCallback((draftId: string) => {
+    let key = keys.current.get(draftId);
+    if (!key) {
+      key = crypto.randomUUID();
+      keys.current.set(draftId, key);
+    }
+    return key;
+  }, []);
+
+  const release = useCallback((draftId: string) => {
+    keys.current.delete(draftId);
+  }, []);
+
+  return { keyFor, release };
+};
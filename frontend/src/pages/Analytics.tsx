@@ -47,6 +47,8 @@ interface SessionAssignment {
   assigned_user: string;
   assigned_by: string;
   assignment_date: string;
+  full_name?: string;
+  session_title?: string;
 }
 
 const Analytics = () => {
@@ -60,6 +62,9 @@ const Analytics = () => {
   const [selectedSessions, setSelectedSessions] = useState<string[]>([]);
   const [users, setUsers] = useState<User[]>([]);
   const [assignments, setAssignments] = useState<SessionAssignment[]>([]);
+  const [assignmentsCursor, setAssignmentsCursor] = useState<string | null>(null);
+  const [assignmentTotals, setAssignmentTotals] = useState({ total: 0, users: 0 });
+  const [selectedUserSessions, setSelectedUserSessions] = useState<Set<string>>(new Set());
   const [assignmentLoading, setAssignmentLoading] = useState(false);
   // Use the reusable role hook
   const { 
@@ -90,6 +95,23 @@ const Analytics = () => {
   // Use hasAdmin from the hook, with fallback
   const hasAdministratorAccess = hasAdmin || fallbackAdminCheck;
   
+  // Fetch one page of assignments; without a cursor the list restarts from the first page
+  const fetchAssignments = async (cursor: string | null = null) => {
+    const params = new URLSearchParams();
+    if (cursor) params.set('cursor', cursor);
+    const assignmentsResponse = await fetch(`/api/method/surgical_training.api.session_assignment.get_session_assignments?${params}`, {
+      method: 'GET',
+      headers: { 'Content-Type': 'application/json' }
+    });
+    const assignmentsResult = await assignmentsResponse.json();
+    if (assignmentsResult && assignmentsResult.message && assignmentsResult.message.message === 'Success') {
+      const page = assignmentsResult.message.data;
+      setAssignments(prev => cursor ? [...prev, ...page.assignments] : page.assignments);
+      setAssignmentsCursor(page.next_cursor);
+      setAssignmentTotals({ total: page.total, users: page.total_users });
+    }
+  };
+
   // Fetch users and assignments - moved to top to avoid hooks order violations
   useEffect(() => {
     const fetchUsersAndAssignments = async () => {
@@ -107,14 +129,7 @@ const Analytics = () => {
         }
 
         // Fetch assignments
-        const assignmentsResponse = await fetch('/api/method/surgical_training.api.session_assignment.get_session_assignments', {
-          method: 'GET',
-          headers: { 'Content-Type': 'application/json' }
-        });
-        const assignmentsResult = await assignmentsResponse.json();
-        if (assignmentsResult && assignmentsResult.message && assignmentsResult.message.message === 'Success') {
-          setAssignments(assignmentsResult.message.data);
-        }
+        await fetchAssignments();
       } catch (error) {
         console.error('Error fetching users and assignments:', error);
       }
@@ -123,6 +138,40 @@ const Analytics = () => {
     fetchUsersAndAssignments();
   }, [hasAdministratorAccess]);
 
+  // Sessions already assigned to the selected user, read from the server rather than the paged list
+  useEffect(() => {
+    let cancelled = false;
+    setSelectedUserSessions(new Set());
+    if (!selectedUser) return;
+
+    const fetchSelectedUserSessions = async () => {
+      const sessions = new Set<string>();
+      let cursor: string | null = null;
+      try {
+        do {
+          const params = new URLSearchParams({ user: selectedUser, limit: '200' });
+          if (cursor) params.set('cursor', cursor);
+          const response = await fetch(`/api/method/surgical_training.api.session_assignment.get_session_assignments?${params}`, {
+            method: 'GET',
+            headers: { 'Content-Type': 'application/json' }
+          });
+          const result = await response.json();
+          if (!result?.message || result.message.message !== 'Success') break;
+          result.message.data.assignments.forEach((a: SessionAssignment) => sessions.add(a.session));
+          cursor = result.message.data.next_cursor;
+        } while (cursor && !cancelled);
+      } catch (error) {
+        console.error('Error fetching assignments of the selected user:', error);
+      }
+      if (!cancelled) setSelectedUserSessions(sessions);
+    };
+
+    fetchSelectedUserSessions();
+    return () => {
+      cancelled = true;
+    };
+  }, [selectedUser]);
+
   // Fetch individual session details and comments - moved to top
   useEffect(() => {
     const fetchSessionsWithComments = async () => {
@@ -332,14 +381,7 @@ const Analytics = () => {
         }
         
         // Refresh assignments
-        const assignmentsResponse = await fetch('/api/method/surgical_training.api.session_assignment.get_session_assignments', {
-          method: 'GET',
-          headers: { 'Content-Type': 'application/json' }
-        });
-        const assignmentsResult = await assignmentsResponse.json();
-        if (assignmentsResult && assignmentsResult.message && assignmentsResult.message.message === 'Success') {
-          setAssignments(assignmentsResult.message.data);
-        }
+        await fetchAssignments();
         
         // Reset form
         setSelectedUser('');
@@ -361,14 +403,7 @@ const Analytics = () => {
       const response = await removeAssignment({ assignment_name: assignmentName });
       if (response && response.message && response.message.message === 'Success') {
         // Refresh assignments
-        const assignmentsResponse = await fetch('/api/method/surgical_training.api.session_assignment.get_session_assignments', {
-          method: 'GET',
-          headers: { 'Content-Type': 'application/json' }
-        });
-        const assignmentsResult = await assignmentsResponse.json();
-        if (assignmentsResult && assignmentsResult.message && assignmentsResult.message.message === 'Success') {
-          setAssignments(assignmentsResult.message.data);
-        }
+        await fetchAssignments();
         alert('Assignment removed successfully');
       }
     } catch (error) {
@@ -575,8 +610,8 @@ const Analytics = () => {
             <CardContent>
               <div className="space-y-4">
                 <div className="flex items-center justify-between text-sm text-gray-600 border-b border-gray-200 pb-2">
-                  <span className="font-medium">Current Assignments ({assignments.length})</span>
-                  <span>Users: {new Set(assignments.map(a => a.assigned_user)).size}</span>
+                  <span className="font-medium">Current Assignments ({assignmentTotals.total})</span>
+                  <span>Users: {assignmentTotals.users}</span>
                 </div>
                 
                 {assignments.length === 0 ? (
@@ -587,19 +622,16 @@ const Analytics = () => {
                 ) : (
                   <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-4 max-h-60 overflow-y-auto">
                     {assignments.map((assignment) => {
-                      const user = users.find(u => u.name === assignment.assigned_user);
-                      const session = sessionsWithComments.find(s => s.name === assignment.session);
-                      
                       return (
                         <div key={assignment.name} className="p-3 bg-gray-50 rounded-lg border border-gray-200">
                           <div className="flex items-start justify-between mb-2">
                             <div className="flex-1 min-w-0">
                               <p className="text-sm font-medium text-gray-900 truncate">
-                                {session?.title || assignment.session}
+                                {assignment.session_title || assignment.session}
                               </p>
                               <p className="text-xs text-gray-600 flex items-center gap-1">
                                 <User size={10} />
-                                {user?.full_name || assignment.assigned_user}
+                                {assignment.full_name || assignment.assigned_user}
                               </p>
                             </div>
                             <Button
@@ -619,6 +651,13 @@ const Analytics = () => {
                     })}
                   </div>
                 )}
+                {assignmentsCursor && (
+                  <div className="text-center">
+                    <Button variant="outline" size="sm" onClick={() => fetchAssignments(assignmentsCursor)}>
+                      Load more assignments
+                    </Button>
+                  </div>
+                )}
               </div>
             </CardContent>
           </Card>
@@ -889,9 +928,7 @@ const Analytics = () => {
                   <div className="grid grid-cols-1 md:grid-cols-2 gap-3 max-h-60 overflow-y-auto border border-gray-200 rounded-lg p-3">
                     {sessionsWithComments.map((session) => {
                       const isSelected = selectedSessions.includes(session.name);
-                      const isAlreadyAssigned = selectedUser && assignments.some(
-                        a => a.session === session.name && a.assigned_user === selectedUser
-                      );
+                      const isAlreadyAssigned = selectedUser && selectedUserSessions.has(session.name);
                       
                       return (
                         <div
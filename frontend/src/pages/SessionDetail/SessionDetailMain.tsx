@@ -1,5 +1,5 @@
 import { useState, useEffect, useRef } from 'react';
-import { Link } from 'react-router-dom';
+import { Link, useSearchParams } from 'react-router-dom';
 import { useFrappeGetCall, useFrappePostCall } from 'frappe-react-sdk';
 import toast from 'react-hot-toast';
 import { Button } from '../../components/ui/button';
@@ -28,6 +28,7 @@ import { canDeleteComment, canEditComment } from './utils/permissions.utils';
 
 // Import hooks and components
 import { useSessionData } from './hooks/useSessionData';
+import { useIdempotencyKeys } from '../../hooks/useIdempotencyKeys';
 import { VideoSelectionModal, AdditionalVideosPanel, TemplateManagerModal, QuickActionBar } from './components';
 // import { SessionHeader } from './components/Layout/SessionHeader'; // TODO: Use SessionHeader component in render
 
@@ -203,6 +204,8 @@ export const SessionDetailMain: React.FC<SessionDetailMainProps> = ({ sessionNam
   const { call: addComment, loading: isAddingComment } = useFrappePostCall(
     'surgical_training.api.comment.add_comment'
   );
+  // Retried comment submits reuse their key so the server does not create duplicates
+  const commentKeys = useIdempotencyKeys();
 
   // API for deleting comments
   const { call: deleteComment, loading: isDeletingComment } = useFrappePostCall(
@@ -512,6 +515,25 @@ export const SessionDetailMain: React.FC<SessionDetailMainProps> = ({ sessionNam
     }
   }, [sessionData, error, currentVideo]);
 
+  // Deep links from comment search: ?video=<title>&t=<seconds> opens that video at the comment
+  const [searchParams] = useSearchParams();
+  const deepLinkApplied = useRef(false);
+  useEffect(() => {
+    const videoParam = searchParams.get('video');
+    if (deepLinkApplied.current || !videoParam || !sessionData?.videos) return;
+
+    const video = sessionData.videos.find((v: Video) => v.title === videoParam);
+    if (!video || !videoPlayerStates.has(video.title)) return;
+
+    deepLinkApplied.current = true;
+    setCurrentVideo(video);
+    setLayout('single');
+    const seconds = parseFloat(searchParams.get('t') || '');
+    if (!Number.isNaN(seconds)) {
+      handleSeek(video.title, seconds);
+    }
+  }, [searchParams, sessionData, videoPlayerStates]);
+
   // Load custom templates
   useEffect(() => {
     if (templatesError) {
@@ -644,6 +666,8 @@ export const SessionDetailMain: React.FC<SessionDetailMainProps> = ({ sessionNam
   // };
 
   const handleCommentChange = (videoTitle: string, comment: string) => {
+    // Editing the text starts a new draft, and with it a new idempotency key
+    commentKeys.release(`comment:${videoTitle}`);
     setVideoPlayerStates(prevStates => {
       const newStates = new Map(prevStates);
       const currentState = newStates.get(videoTitle) || {
@@ -730,6 +754,7 @@ export const SessionDetailMain: React.FC<SessionDetailMainProps> = ({ sessionNam
       return;
     }
 
+    const draftId = `label:${labelId}`;
     try {
       // Create the comment with calculated duration
       const commentData = {
@@ -738,7 +763,8 @@ export const SessionDetailMain: React.FC<SessionDetailMainProps> = ({ sessionNam
         timestamp: activeLabel.startTime,
         comment_text: activeLabel.comment,
         duration: duration,
-        comment_type: activeLabel.type
+        comment_type: activeLabel.type,
+        idempotency_key: commentKeys.keyFor(draftId)
       };
 
       const response = await addComment(commentData);
@@ -747,6 +773,7 @@ export const SessionDetailMain: React.FC<SessionDetailMainProps> = ({ sessionNam
         const responseData = response.message;
         
         if (responseData.message === 'Success') {
+          commentKeys.release(draftId);
           toast.success(`Label completed: ${formatTime(duration)} duration`);
           setLabelStatusMessage(`Label completed with ${formatTime(duration)} duration`);
           
@@ -803,12 +830,17 @@ export const SessionDetailMain: React.FC<SessionDetailMainProps> = ({ sessionNam
         commentData.comment_type = customCommentType;
       }
       
+      // Submitting the same draft again is a retry of the same write, even if the video has moved on
+      const draftId = `comment:${videoTitle}`;
+      commentData.idempotency_key = commentKeys.keyFor(draftId);
+      
       const response = await addComment(commentData);
       
       if (response && response.message) {
         const responseData = response.message;
         
         if (responseData.message === 'Success') {
+          commentKeys.release(draftId);
           toast.success('Comment added successfully');
           // Clear comment input
           handleCommentChange(videoTitle, '');
@@ -1118,6 +1150,7 @@ export const SessionDetailMain: React.FC<SessionDetailMainProps> = ({ sessionNam
   };
 
   const resetEvaluationForm = () => {
+    commentKeys.release('evaluation');
     setEvaluationData({
       identification: '',
       situation: '',
@@ -1203,17 +1236,21 @@ export const SessionDetailMain: React.FC<SessionDetailMainProps> = ({ sessionNam
         return;
       }
 
+      // One key per evaluation form; resetEvaluationForm starts the next one
+      const draftId = 'evaluation';
       const response = await addComment({
         session: sessionName,
         video_title: targetVideo.title,
         timestamp: currentTime,
-        comment_text: finalSummary
+        comment_text: finalSummary,
+        idempotency_key: commentKeys.keyFor(draftId)
       });
       
       if (response && response.message) {
         const responseData = response.message;
         
         if (responseData.message === 'Success') {
+          commentKeys.release(draftId);
           toast.success('Evaluation added successfully');
           // Reset form and close modal
           resetEvaluationForm();
@@ -1635,14 +1672,19 @@ export const SessionDetailMain: React.FC<SessionDetailMainProps> = ({ sessionNam
     } else {
       // Add as regular comment
       const currentTime = videoPlayerStates.get(videoTitle)?.currentTime || 0;
-      await addComment({
+      const draftId = `isbar:${videoTitle}:${annotationCommentType}:${isbarValue}`;
+      const response = await addComment({
         session: sessionName,
         video_title: videoTitle,
         timestamp: currentTime,
         comment_text: isbarText,
         duration: annotationDuration,
-        comment_type: annotationCommentType
+        comment_type: annotationCommentType,
+        idempotency_key: commentKeys.keyFor(draftId)
       });
+      if (response?.message?.message === 'Success') {
+        commentKeys.release(draftId);
+      }
       await refreshSession();
     }
     setIsbarValue('');
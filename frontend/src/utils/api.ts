@@ -1,4 +1,5 @@
 // API utility functions with proper CSRF and credentials handling
+import { io, Socket } from 'socket.io-client';
 
 // Get CSRF token from multiple possible sources
 export function getCsrfToken(): string {
@@ -199,11 +200,75 @@ export async function logout(): Promise<void> {
   console.log('🔐 Logout successful');
 }
 
+// Realtime subscriptions via Frappe's socket.io server
+// Comment events only name the change; fetch the content with get_comment_changes.
+export interface CommentEvent {
+  action: 'insert' | 'update' | 'delete';
+  name: string;
+  session: string;
+  session_video: string | null;
+  video_title: string;
+  modified: string;
+}
+
+let realtimeSocket: Socket | null = null;
+
+function getRealtimeSocket(): Socket {
+  if (!realtimeSocket) {
+    // Frappe serves one socket.io namespace per site; in development it listens on its own port
+    const siteName = (window as any).frappe?.boot?.sitename || import.meta.env.VITE_SITE_NAME || window.location.hostname;
+    const host = import.meta.env.DEV
+      ? `${window.location.protocol}//${window.location.hostname}:${import.meta.env.VITE_SOCKETIO_PORT || 9000}`
+      : window.location.origin;
+
+    realtimeSocket = io(`${host}/${siteName}`, {
+      withCredentials: true,
+      reconnectionAttempts: 5,
+    });
+  }
+  return realtimeSocket;
+}
+
+// Subscribe to comment changes in a session; returns an unsubscribe function
+export function subscribeToSessionComments(
+  sessionName: string,
+  onEvent: (event: CommentEvent) => void
+): () => void {
+  const socket = getRealtimeSocket();
+  const listener = (event: CommentEvent) => {
+    if (event?.session === sessionName) {
+      onEvent(event);
+    }
+  };
+
+  // The session's document room requires read access to the Session
+  socket.emit('doc_subscribe', 'Session', sessionName);
+  socket.on('video_comment', listener);
+
+  return () => {
+    socket.off('video_comment', listener);
+    socket.emit('doc_unsubscribe', 'Session', sessionName);
+  };
+}
+
+// Subscribe to new notifications for the logged-in user; returns an unsubscribe function
+export function subscribeToUserNotifications(onNotification: (notification: any) => void): () => void {
+  const socket = getRealtimeSocket();
+  socket.on('user_notification', onNotification);
+
+  return () => {
+    socket.off('user_notification', onNotification);
+  };
+}
+
 // Specific API functions
 export const api = {
   // Comment functions
-  addComment: (commentData: any) => 
-    apiCall('/api/method/surgical_training.api.comment.add_comment', 'POST', commentData),
+  // Pass the same idempotencyKey when retrying a submit so the server replays instead of duplicating
+  addComment: (commentData: any, idempotencyKey?: string) => 
+    apiCall('/api/method/surgical_training.api.comment.add_comment', 'POST',
+      idempotencyKey ? { ...commentData, idempotency_key: idempotencyKey } : commentData
+    ),
   
   updateComment: (commentData: any) => 
     apiCall('/api/method/surgical_training.api.comment.update_comment', 'POST', commentData),
@@ -211,6 +276,12 @@ export const api = {
   deleteComment: (commentData: any) => 
     apiCall('/api/method/surgical_training.api.comment.delete_comment', 'POST', commentData),
 
+  getCommentChanges: (sessionName: string, sinceCursor?: string | null) =>
+    apiCall('/api/method/surgical_training.api.comment.get_comment_changes', 'POST', { session: sessionName, since_cursor: sinceCursor || null }),
+
+  searchComments: (query: string, filters: Record<string, any> = {}, cursor?: string | null) =>
+    apiCall('/api/method/surgical_training.api.comment.search_comments', 'POST', { query, ...filters, cursor: cursor || null }),
+
   // Auth functions
   logout,
 
@@ -1,26 +1,49 @@
+import json
+from urllib.parse import quote
+
 import frappe
 from frappe import _
-from frappe.utils import cint, flt, now
+from frappe.utils import add_days, cint, flt, get_datetime, now
+
+from surgical_training.utils.author_names import get_author_name, get_author_names
+from surgical_training.utils.comment_index import get_comments_in_window as find_comments_in_window
+from surgical_training.utils.comment_changes import get_change_cursor, get_purged_cursor
+from surgical_training.utils.comment_histogram import get_comment_histogram as build_video_histogram
+from surgical_training.utils.comment_index import resolve_session_video
+from surgical_training.utils.identity import get_identity
+from surgical_training.utils.session_videos import find_session_video, get_session_videos
+from surgical_training.utils.idempotency import get_idempotency_key, get_replayed_response, save_idempotent_response
+from surgical_training.surgical_training.doctype.video_comment.video_comment import after_bulk_write
+
+VALID_COMMENT_TYPES = ["neutral", "positive", "warning", "critical"]
+
+# Relevance is a float; rounding it in SQL gives the keyset cursor a value that compares exactly
+SEARCH_SCORE_PRECISION = 6
+SEARCH_SCORE = f"ROUND(MATCH(comment_text) AGAINST (%(query)s IN NATURAL LANGUAGE MODE), {SEARCH_SCORE_PRECISION})"
 
 @frappe.whitelist()
-def add_comment(session, video_title, timestamp, comment_text, duration=None, comment_type=None):
-    """Add a new comment to a video"""
+def add_comment(session, video_title, timestamp, comment_text, duration=None, comment_type=None, idempotency_key=None):
+    """Add a new comment to a video; a retry with the same idempotency_key replays the first response"""
     if not frappe.session.user:
         return {"message": "Error", "error": "User not authenticated"}
     
     try:
-        # Check if user is admin (by email)
-        is_admin = frappe.session.user == "administrator@gmail.com"
-        
-        # Check if user is a doctor (by email pattern or role)
-        user_roles = frappe.get_roles(frappe.session.user)
-        is_physician = "Physician" in user_roles
-        is_doctor_email = frappe.session.user.lower().startswith('doctor')
+        idempotency_key = get_idempotency_key(idempotency_key)
+        replayed = get_replayed_response("add_comment", idempotency_key)
+        if replayed:
+            return replayed
+
+        # Roles and Doctor record are resolved once per request
+        identity = get_identity()
+        user_roles = identity.roles
+        is_admin = identity.is_admin
+        is_physician = identity.is_physician
+        is_doctor_email = identity.is_doctor_email
         
         # DEBUG: Enhanced logging
         frappe.logger().info(f"=== ADD COMMENT DEBUG ===")
         frappe.logger().info(f"User: {frappe.session.user}")
-        frappe.logger().info(f"User roles: {user_roles}")
+        frappe.logger().info(f"User roles: {sorted(user_roles)}")
         frappe.logger().info(f"Is admin: {is_admin}")
         frappe.logger().info(f"Is physician: {is_physician}")
         frappe.logger().info(f"Is doctor email: {is_doctor_email}")
@@ -28,47 +51,11 @@ def add_comment(session, video_title, timestamp, comment_text, duration=None, co
         frappe.logger().info(f"Video: {video_title}")
         frappe.logger().info(f"Comment: {comment_text[:50]}...")
         
-        doctor_name = None
-        
-        # Determine doctor name based on user type
-        if is_admin:
-            # Admin users use admin fallback
-            doctor_name = f"admin-{frappe.session.user}"
-            frappe.logger().info(f"ADMIN PATH: Using admin fallback doctor name: {doctor_name}")
-        elif is_doctor_email or is_physician:
-            # For doctor emails or physician users, try to find existing Doctor record first
-            doctors = []
-            try:
-                doctors = frappe.get_list("Doctor", filters={"user": frappe.session.user})
-                frappe.logger().info(f"DOCTOR/PHYSICIAN PATH: Found {len(doctors)} Doctor records")
-            except frappe.PermissionError:
-                frappe.logger().info(f"DOCTOR/PHYSICIAN PATH: No permission to read Doctor records, using fallback")
-            except Exception as e:
-                frappe.logger().info(f"DOCTOR/PHYSICIAN PATH: Error reading Doctor records: {str(e)}, using fallback")
-            if doctors:
-                doctor_name = doctors[0].name
-                frappe.logger().info(f"Found existing Doctor record: {doctor_name}")
-            else:
-                # Use email-based fallback for doctor accounts
-                doctor_name = f"doctor-{frappe.session.user}"
-                frappe.logger().info(f"Using doctor fallback doctor name: {doctor_name}")
-        else:
-            # For other users, check if they have a Doctor record
-            doctors = []
-            try:
-                doctors = frappe.get_list("Doctor", filters={"user": frappe.session.user})
-                frappe.logger().info(f"OTHER USER PATH: Found {len(doctors)} Doctor records")
-            except frappe.PermissionError:
-                frappe.logger().info(f"OTHER USER PATH: No permission to read Doctor records")
-            except Exception as e:
-                frappe.logger().info(f"OTHER USER PATH: Error reading Doctor records: {str(e)}")
-            
-            if doctors:
-                doctor_name = doctors[0].name
-                frappe.logger().info(f"Found Doctor record for regular user: {doctor_name}")
-            else:
-                frappe.logger().error(f"ACCESS DENIED: User {frappe.session.user} not registered as doctor/admin/physician")
-                return {"message": "Error", "error": "User is not registered as a doctor, administrator, or physician"}
+        # Admins use the admin fallback, doctors their Doctor record or the email-based fallback
+        doctor_name = identity.doctor_key
+        if not doctor_name:
+            frappe.logger().error(f"ACCESS DENIED: User {frappe.session.user} not registered as doctor/admin/physician")
+            return {"message": "Error", "error": "User is not registered as a doctor, administrator, or physician"}
         
         frappe.logger().info(f"Final doctor name: {doctor_name}")
         
@@ -97,6 +84,7 @@ def add_comment(session, video_title, timestamp, comment_text, duration=None, co
         frappe.logger().info(f"Creating comment with doctor: {doctor_name}, duration: {duration}, type: {final_comment_type}")
         comment = frappe.new_doc("Video Comment")
         comment.doctor = doctor_name
+        comment.user = frappe.session.user
         comment.session = session
         comment.video_title = video_title
         comment.timestamp = timestamp
@@ -112,28 +100,12 @@ def add_comment(session, video_title, timestamp, comment_text, duration=None, co
         created_at = str(comment.created_at) if comment.created_at else ""
         
         # Get doctor name for display
-        user_full_name = frappe.db.get_value("User", frappe.session.user, "full_name")
-        display_doctor_name = user_full_name or frappe.session.user.split('@')[0].title()
-        
-        if doctor_name.startswith("admin-"):
-            display_doctor_name = f"Administrator ({display_doctor_name})"
-        elif doctor_name.startswith("doctor-"):
-            # For doctor fallback, use a clean name
-            email_name = frappe.session.user.split('@')[0]
-            display_doctor_name = email_name.replace('doctor', 'Dr. ').title()
-        elif not doctor_name.startswith("admin-") and not doctor_name.startswith("doctor-"):
-            try:
-                doctor_doc = frappe.get_doc("Doctor", comment.doctor)
-                doctor_name = doctor_doc.first_name or "Unknown Doctor"
-                if doctor_doc.last_name:
-                    doctor_name += f" {doctor_doc.last_name}"
-            except:
-                doctor_name = comment.doctor
+        display_doctor_name = get_author_name(comment.doctor)
         
         frappe.logger().info(f"Display doctor name: {display_doctor_name}")
         frappe.logger().info(f"=== ADD COMMENT SUCCESS ===")
         
-        return {
+        return save_idempotent_response("add_comment", idempotency_key, {
             "message": "Success",
             "data": {
                 "name": comment.name,
@@ -147,7 +119,7 @@ def add_comment(session, video_title, timestamp, comment_text, duration=None, co
                 "comment_text": comment.comment_text,
                 "created_at": created_at
             }
-        }
+        })
         
     except Exception as e:
         frappe.logger().error(f"=== ADD COMMENT ERROR ===")
@@ -176,30 +148,19 @@ def get_comments_by_video(session, video_title):
                     "session": session,
                     "video_title": video_title
                 },
-                fields=["name", "doctor", "comment_text", "timestamp", "duration", "comment_type", "creation", "modified"],
+                fields=["name", "doctor", "session_video", "comment_text", "timestamp", "duration", "comment_type", "creation", "modified"],
                 order_by="timestamp asc"
             )
         else:
             # Only show comments for this doctor user
-            possible_doctor_names = []
-            # Try to get Doctor record for this user
-            try:
-                doctors = frappe.get_list("Doctor", filters={"user": user_email})
-                if doctors:
-                    possible_doctor_names.append(doctors[0].name)
-            except Exception:
-                pass
-            # Always add fallback
-            possible_doctor_names.append(f"doctor-{user_email}")
-            frappe.logger().info(f"Possible doctor names for user: {possible_doctor_names}")
             comments = frappe.get_all(
             "Video Comment",
                 filters={
                     "session": session,
                     "video_title": video_title,
-                    "doctor": ["in", possible_doctor_names]
+                    "user": user_email
                 },
-                fields=["name", "doctor", "comment_text", "timestamp", "duration", "comment_type", "creation", "modified"],
+                fields=["name", "doctor", "session_video", "comment_text", "timestamp", "duration", "comment_type", "creation", "modified"],
             order_by="timestamp asc"
         )
         
@@ -207,36 +168,17 @@ def get_comments_by_video(session, video_title):
         processed_comments = []
         frappe.logger().info(f"Processing {len(comments)} comments for display...")
         
+        # Resolve every distinct author in one batch
+        author_names = get_author_names([comment.doctor for comment in comments])
+
         for comment in comments:
             try:
-                # Get doctor name for display
-                doctor_name = "Unknown Doctor"
-                if comment.doctor.startswith("admin-"):
-                    # Admin fallback comment
-                    email = comment.doctor.replace("admin-", "")
-                    if email == "administrator@gmail.com":
-                        doctor_name = "Administrator"
-                    else:
-                        doctor_name = f"Administrator ({email})"
-                elif comment.doctor.startswith("doctor-"):
-                    # Doctor fallback comment
-                    email = comment.doctor.replace("doctor-", "")
-                    email_name = email.split('@')[0]
-                    doctor_name = email_name.replace('doctor', 'Dr. ').title()
-                else:
-                    # Regular doctor comment
-                    try:
-                        doctor_doc = frappe.get_doc("Doctor", comment.doctor)
-                        doctor_name = doctor_doc.first_name or "Unknown Doctor"
-                        if doctor_doc.last_name:
-                            doctor_name += f" {doctor_doc.last_name}"
-                    except Exception:
-                        doctor_name = comment.doctor
-                    frappe.logger().info(f"  - Processed comment {comment.name}: display_name={doctor_name}")
-                    processed_comments.append({
+                doctor_name = author_names.get(comment.doctor) or "Unknown Doctor"
+                processed_comments.append({
                     "name": comment.name,
                     "doctor": comment.doctor,
                     "doctor_name": doctor_name,
+                    "session_video": comment.session_video,
                     "comment_text": comment.comment_text,
                     "timestamp": comment.timestamp,
                     "duration": getattr(comment, 'duration', 30),  # Default to 30 for existing comments
@@ -258,6 +200,244 @@ def get_comments_by_video(session, video_title):
         frappe.log_error(f"Error fetching comments: {str(e)}")
         return []
 
+@frappe.whitelist()
+def get_comments_in_window(session, video, start, end, limit=None, cursor=None):
+    """
+    Get the comments of a video whose [timestamp, timestamp + duration] overlaps [start, end].
+    Pass the returned next_cursor back to fetch the rest of a truncated window.
+    """
+    try:
+        start = flt(start)
+        end = flt(end)
+        if end < start:
+            return {"message": "Error", "error": "Window end must not be before its start"}
+
+        # The video can be given as its Session Video row name or its title
+        session_video = resolve_session_video(session, video)
+        if not session_video:
+            return {"message": "Error", "error": f"Video '{video}' not found in session {session}"}
+
+        # Admin can see all comments, others only their own
+        user_email = frappe.session.user
+        is_admin = user_email == "administrator@gmail.com"
+        comments = find_comments_in_window(
+            session_video, start, end,
+            user=None if is_admin else user_email,
+            after=json.loads(cursor) if cursor else None
+        )
+
+        limit = cint(limit)
+        has_more = bool(limit) and len(comments) > limit
+        next_cursor = None
+        if has_more:
+            comments = comments[:limit]
+            # Timestamps repeat, so the cursor also carries the name as a tie-breaker
+            next_cursor = json.dumps([comments[-1].timestamp, comments[-1].name])
+
+        author_names = get_author_names([comment.doctor for comment in comments])
+        for comment in comments:
+            comment["doctor_name"] = author_names.get(comment.doctor) or "Unknown Doctor"
+            comment["session_video"] = session_video
+            comment.pop("user", None)
+
+        return {
+            "message": "Success",
+            "data": {
+                "session_video": session_video,
+                "start": start,
+                "end": end,
+                "comments": comments,
+                "has_more": has_more,
+                "next_cursor": next_cursor
+            }
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Error fetching comments in window: {e!s}")
+        return {"message": "Error", "error": str(e)}
+
+@frappe.whitelist()
+def get_comment_histogram(session, video=None, bin_width=10):
+    """Get binned comment counts per comment type for each video of a session"""
+    try:
+        bin_width = max(cint(bin_width), 1)
+
+        if video:
+            video_row = find_session_video(session, video)
+            if not video_row:
+                return {"message": "Error", "error": f"Video '{video}' not found in session {session}"}
+            videos = [video_row]
+        else:
+            videos = list(get_session_videos(session)["by_name"].values())
+
+        # Admin sees the density of all comments, others only of their own
+        user_email = frappe.session.user
+        is_admin = user_email == "administrator@gmail.com"
+
+        histograms = []
+        for video_row in videos:
+            histogram = build_video_histogram(
+                video_row.name, video_row.duration, bin_width, user=None if is_admin else user_email
+            )
+            histograms.append({
+                "session_video": video_row.name,
+                "video_title": video_row.title,
+                **histogram
+            })
+
+        return {"message": "Success", "data": histograms}
+
+    except Exception as e:
+        frappe.log_error(f"Error building comment histogram: {e!s}")
+        return {"message": "Error", "error": str(e)}
+
+@frappe.whitelist()
+def get_comment_changes(session, since_cursor=None):
+    """Get the comments inserted, updated and deleted in a session since a sync cursor"""
+    try:
+        user_email = frappe.session.user
+        is_admin = user_email == "administrator@gmail.com"
+
+        # Read the cursor first: every change up to it is visible to this transaction
+        cursor = get_change_cursor()
+        since = cint(since_cursor) if since_cursor else None
+
+        # Older cursors were timestamps, and deletes before the purge watermark are gone
+        if since_cursor and (not str(since_cursor).isdigit() or since < get_purged_cursor()):
+            return {"message": "Success", "data": {"reset": True, "cursor": None}}
+
+        # Admin can see all comments, others only their own
+        filters = {"session": session}
+        tombstone_filters = {"session": session}
+        if not is_admin:
+            filters["user"] = user_email
+            tombstone_filters["user"] = user_email
+
+        deleted = []
+        if since is not None:
+            filters["change_seq"] = ["between", [since + 1, cursor]]
+            tombstone_filters["change_seq"] = ["between", [since + 1, cursor]]
+            deleted = frappe.get_all(
+                "Video Comment Tombstone",
+                filters=tombstone_filters,
+                fields=["comment", "session_video", "video_title", "deleted_at"],
+                order_by="change_seq asc"
+            )
+
+        comments = frappe.get_all(
+            "Video Comment",
+            filters=filters,
+            fields=["name", "doctor", "session_video", "video_title", "timestamp", "duration", "comment_type", "comment_text", "created_at", "creation", "modified", "created_seq"],
+            order_by="change_seq asc"
+        )
+
+        author_names = get_author_names([comment.doctor for comment in comments])
+        inserted = []
+        updated = []
+        for comment in comments:
+            comment["doctor_name"] = author_names.get(comment.doctor) or "Unknown Doctor"
+            created_seq = comment.pop("created_seq") or 0
+            if since is not None and created_seq <= since:
+                updated.append(comment)
+            else:
+                inserted.append(comment)
+
+        return {
+            "message": "Success",
+            "data": {
+                "reset": False,
+                "cursor": str(cursor),
+                "inserted": inserted,
+                "updated": updated,
+                "deleted": deleted
+            }
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Error fetching comment changes: {e!s}")
+        return {"message": "Error", "error": str(e)}
+
+@frappe.whitelist()
+def search_comments(query, session=None, video=None, doctor=None, comment_type=None, from_date=None, to_date=None, cursor=None, limit=20):
+    """
+    Full-text search over comment text, ranked by relevance.
+    video matches a Session Video row name or title, doctor a user email or doctor value.
+    Pass the returned next_cursor back to fetch the following page.
+    """
+    try:
+        user_email = frappe.session.user
+        is_admin = user_email == "administrator@gmail.com"
+        limit = min(max(cint(limit), 1), 100)
+
+        if not query or not query.strip():
+            return {"message": "Error", "error": "Search query is required"}
+
+        values = {"query": query.strip(), "limit": limit + 1}
+        conditions = ["MATCH(comment_text) AGAINST (%(query)s IN NATURAL LANGUAGE MODE)"]
+
+        # Admin can search all comments, others only their own
+        if not is_admin:
+            conditions.append("user = %(user)s")
+            values["user"] = user_email
+        if session:
+            conditions.append("session = %(session)s")
+            values["session"] = session
+        if video:
+            conditions.append("(session_video = %(video)s OR video_title = %(video)s)")
+            values["video"] = video
+        if doctor:
+            conditions.append("(user = %(doctor)s OR doctor = %(doctor)s)")
+            values["doctor"] = doctor
+        if comment_type:
+            conditions.append("comment_type = %(comment_type)s")
+            values["comment_type"] = comment_type
+        if from_date:
+            conditions.append("creation >= %(from_date)s")
+            values["from_date"] = get_datetime(from_date)
+        if to_date:
+            conditions.append("creation < %(to_date)s")
+            values["to_date"] = add_days(get_datetime(to_date), 1)
+        if cursor:
+            # Keyset pagination on (rounded score, name), both descending
+            values["cursor_score"], values["cursor_name"] = json.loads(cursor)
+            conditions.append(f"""(
+                {SEARCH_SCORE} < %(cursor_score)s
+                OR ({SEARCH_SCORE} = %(cursor_score)s AND name < %(cursor_name)s)
+            )""")
+
+        comments = frappe.db.sql(f"""
+            SELECT name, doctor, session, session_video, video_title, timestamp, duration,
+                comment_type, comment_text, created_at, creation,
+                {SEARCH_SCORE} AS score
+            FROM `tabVideo Comment`
+            WHERE {" AND ".join(conditions)}
+            ORDER BY score DESC, name DESC
+            LIMIT %(limit)s
+        """, values, as_dict=True)
+
+        next_cursor = None
+        if len(comments) > limit:
+            comments = comments[:limit]
+            next_cursor = json.dumps([flt(comments[-1].score, SEARCH_SCORE_PRECISION), comments[-1].name])
+
+        author_names = get_author_names([comment.doctor for comment in comments])
+        for comment in comments:
+            comment["doctor_name"] = author_names.get(comment.doctor) or "Unknown Doctor"
+            # Opens the session with the video seeked to the comment
+            comment["link"] = f"/isim/session/{comment.session}?video={quote(comment.video_title or '')}&t={flt(comment.timestamp)}"
+
+        return {
+            "message": "Success",
+            "data": {
+                "comments": comments,
+                "next_cursor": next_cursor
+            }
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Error searching comments: {e!s}")
+        return {"message": "Error", "error": str(e)}
+
 @frappe.whitelist()
 def delete_comment(comment_name):
     """Delete a comment with personalized permissions"""
@@ -290,27 +470,9 @@ def delete_comment(comment_name):
             }
         else:
             # Regular users can only delete their own comments
-            # Determine possible doctor names for current user
-            possible_doctor_names = []
-            
-            # Check for actual Doctor record
-            try:
-                doctors = frappe.get_list("Doctor", filters={"user": frappe.session.user})
-                if doctors:
-                    possible_doctor_names.append(doctors[0].name)
-            except frappe.PermissionError:
-                frappe.logger().info(f"No permission to read Doctor records, using fallback only")
-            except Exception as e:
-                frappe.logger().info(f"Error reading Doctor records: {str(e)}, using fallback only")
-            
-            # Add email-based fallbacks
-            possible_doctor_names.append(f"admin-{frappe.session.user}")  # Admin fallback
-            possible_doctor_names.append(f"doctor-{frappe.session.user}")  # Doctor fallback
-            
-            # Check if this is user's own comment
-            is_own_comment = comment.doctor in possible_doctor_names
+            is_own_comment = comment.user == frappe.session.user
             
-            frappe.logger().info(f"Delete permission check: possible_doctors={possible_doctor_names}, comment.doctor={comment.doctor}, is_own={is_own_comment}")
+            frappe.logger().info(f"Delete permission check: comment.user={comment.user}, is_own={is_own_comment}")
             
             if is_own_comment:
                 comment.delete(ignore_permissions=True)
@@ -384,27 +546,9 @@ def update_comment(comment_name, comment_text=None, duration=None, comment_type=
             }
         else:
             # Regular users can only edit their own comments
-            # Determine possible doctor names for current user
-            possible_doctor_names = []
-            
-            # Check for actual Doctor record
-            try:
-                doctors = frappe.get_list("Doctor", filters={"user": frappe.session.user})
-                if doctors:
-                    possible_doctor_names.append(doctors[0].name)
-            except frappe.PermissionError:
-                frappe.logger().info(f"No permission to read Doctor records, using fallback only")
-            except Exception as e:
-                frappe.logger().info(f"Error reading Doctor records: {str(e)}, using fallback only")
-            
-            # Add email-based fallbacks
-            possible_doctor_names.append(f"admin-{frappe.session.user}")  # Admin fallback
-            possible_doctor_names.append(f"doctor-{frappe.session.user}")  # Doctor fallback
-            
-            # Check if this is user's own comment
-            is_own_comment = comment.doctor in possible_doctor_names
+            is_own_comment = comment.user == frappe.session.user
             
-            frappe.logger().info(f"Update permission check: possible_doctors={possible_doctor_names}, comment.doctor={comment.doctor}, is_own={is_own_comment}")
+            frappe.logger().info(f"Update permission check: comment.user={comment.user}, is_own={is_own_comment}")
             
             if is_own_comment:
                 # Update fields if provided
@@ -474,27 +618,9 @@ def can_edit_comment(comment_name):
             }
         else:
             # Regular users can only edit their own comments
-            # Determine possible doctor names for current user
-            possible_doctor_names = []
+            is_own_comment = comment.user == frappe.session.user
             
-            # Check for actual Doctor record
-            try:
-                doctors = frappe.get_list("Doctor", filters={"user": frappe.session.user})
-                if doctors:
-                    possible_doctor_names.append(doctors[0].name)
-            except frappe.PermissionError:
-                frappe.logger().info(f"No permission to read Doctor records, using fallback only")
-            except Exception as e:
-                frappe.logger().info(f"Error reading Doctor records: {str(e)}, using fallback only")
-            
-            # Add email-based fallbacks
-            possible_doctor_names.append(f"admin-{frappe.session.user}")  # Admin fallback
-            possible_doctor_names.append(f"doctor-{frappe.session.user}")  # Doctor fallback
-            
-            # Check if this is user's own comment
-            is_own_comment = comment.doctor in possible_doctor_names
-            
-            frappe.logger().info(f"Edit permission check: possible_doctors={possible_doctor_names}, comment.doctor={comment.doctor}, is_own={is_own_comment}")
+            frappe.logger().info(f"Edit permission check: comment.user={comment.user}, is_own={is_own_comment}")
         
         return {
             "message": "Success",
@@ -540,27 +666,9 @@ def can_delete_comment(comment_name):
             }
         else:
             # Regular users can only delete their own comments
-            # Determine possible doctor names for current user
-            possible_doctor_names = []
-            
-            # Check for actual Doctor record
-            try:
-                doctors = frappe.get_list("Doctor", filters={"user": frappe.session.user})
-                if doctors:
-                    possible_doctor_names.append(doctors[0].name)
-            except frappe.PermissionError:
-                frappe.logger().info(f"No permission to read Doctor records, using fallback only")
-            except Exception as e:
-                frappe.logger().info(f"Error reading Doctor records: {str(e)}, using fallback only")
-            
-            # Add email-based fallbacks
-            possible_doctor_names.append(f"admin-{frappe.session.user}")  # Admin fallback
-            possible_doctor_names.append(f"doctor-{frappe.session.user}")  # Doctor fallback
-            
-            # Check if this is user's own comment
-            is_own_comment = comment.doctor in possible_doctor_names
+            is_own_comment = comment.user == frappe.session.user
             
-            frappe.logger().info(f"Delete permission check: possible_doctors={possible_doctor_names}, comment.doctor={comment.doctor}, is_own={is_own_comment}")
+            frappe.logger().info(f"Delete permission check: comment.user={comment.user}, is_own={is_own_comment}")
         
         return {
             "message": "Success",
@@ -577,6 +685,177 @@ def can_delete_comment(comment_name):
         frappe.log_error(f"Error checking delete permission: {str(e)}")
         return {"message": "Error", "error": str(e)} 
 
+@frappe.whitelist()
+def bulk_comment_operations(operations):
+    """
+    Apply a batch of comment operations in one transaction.
+    operations is a list of {"op": "create", "session", "video_title", "timestamp", "comment_text", "duration", "comment_type"},
+    {"op": "update", "name", "comment_text", "duration", "comment_type"} or {"op": "delete", "name"}.
+    Returns one result per operation, in order.
+    """
+    if not frappe.session.user or frappe.session.user == "Guest":
+        return {"message": "Error", "error": "User not authenticated"}
+
+    try:
+        if isinstance(operations, str):
+            operations = json.loads(operations)
+
+        user_email = frappe.session.user
+        is_admin = user_email == "administrator@gmail.com"
+        timestamp = now()
+
+        results = [None] * len(operations)
+        creates, updates, deletes = [], [], []
+        for i, operation in enumerate(operations):
+            action = operation.get("op")
+            if action == "create":
+                creates.append((i, operation))
+            elif action == "update":
+                updates.append((i, operation))
+            elif action == "delete":
+                deletes.append((i, operation))
+            else:
+                results[i] = {"status": "error", "error": f"Unknown operation '{action}'"}
+
+        # Cached video map of every session the creates point at
+        videos = {}
+        for session in {operation.get("session") for _, operation in creates}:
+            for video in get_session_videos(session)["by_title"].values():
+                videos[(session, video.title)] = frappe._dict(video, parent=session)
+
+        # One query for every existing comment the updates and deletes touch
+        existing = {}
+        names = [operation.get("name") for _, operation in updates + deletes]
+        if names:
+            for comment in frappe.get_all(
+                "Video Comment",
+                filters={"name": ["in", names]},
+                fields=["name", "doctor", "user", "session", "session_video", "video_title", "modified"]
+            ):
+                existing[comment.name] = comment
+
+        inserted = []
+        doctor_name = get_identity().doctor_key if creates else None
+        for i, operation in creates:
+            video = videos.get((operation.get("session"), operation.get("video_title")))
+            comment_timestamp = flt(operation.get("timestamp"))
+
+            if not doctor_name:
+                results[i] = {"status": "error", "error": "User is not registered as a doctor, administrator, or physician"}
+            elif not video:
+                results[i] = {"status": "error", "error": f"Video with title '{operation.get('video_title')}' not found in session {operation.get('session')}"}
+            elif comment_timestamp < 0:
+                results[i] = {"status": "error", "error": "Timestamp must be a positive number"}
+            elif video.duration and comment_timestamp > video.duration:
+                results[i] = {"status": "error", "error": f"Timestamp {comment_timestamp} is greater than video duration {video.duration}"}
+            elif not operation.get("comment_text"):
+                results[i] = {"status": "error", "error": "Comment text is required"}
+            else:
+                comment = frappe._dict({
+                    "name": frappe.generate_hash(length=10),
+                    "doctor": doctor_name,
+                    "user": user_email,
+                    "session": video.parent,
+                    "session_video": video.name,
+                    "video_title": video.title,
+                    "timestamp": comment_timestamp,
+                    "duration": normalize_comment_duration(operation.get("duration")),
+                    "comment_type": normalize_comment_type(operation.get("comment_type")),
+                    "comment_text": operation.get("comment_text"),
+                    "created_at": timestamp,
+                    "modified": timestamp
+                })
+                inserted.append(comment)
+                results[i] = {"status": "success", "op": "create", "name": comment.name}
+
+        updated = {}
+        for i, operation in updates:
+            comment = existing.get(operation.get("name"))
+            if not comment:
+                results[i] = {"status": "error", "error": "Comment not found"}
+                continue
+            if not is_admin and comment.user != user_email:
+                results[i] = {"status": "error", "error": "You don't have permission to update this comment"}
+                continue
+
+            changes = updated.setdefault(comment.name, {})
+            if operation.get("comment_text") is not None:
+                changes["comment_text"] = operation.get("comment_text")
+            if operation.get("duration") is not None:
+                changes["duration"] = normalize_comment_duration(operation.get("duration"))
+            if operation.get("comment_type") is not None:
+                changes["comment_type"] = normalize_comment_type(operation.get("comment_type"))
+            results[i] = {"status": "success", "op": "update", "name": comment.name}
+
+        deleted = {}
+        for i, operation in deletes:
+            comment = existing.get(operation.get("name"))
+            if not comment:
+                results[i] = {"status": "error", "error": "Comment not found"}
+                continue
+            if not is_admin and comment.user != user_email:
+                results[i] = {"status": "error", "error": "You don't have permission to delete this comment"}
+                continue
+            deleted[comment.name] = comment
+            results[i] = {"status": "success", "op": "delete", "name": comment.name}
+
+        # Updates of comments deleted in the same batch are moot
+        updated = {name: changes for name, changes in updated.items() if changes and name not in deleted}
+
+        try:
+            if inserted:
+                frappe.db.bulk_insert(
+                    "Video Comment",
+                    ["name", "owner", "modified_by", "creation", "modified", "docstatus", "idx",
+                     "doctor", "user", "session", "session_video", "video_title", "timestamp",
+                     "duration", "comment_type", "comment_text", "created_at"],
+                    [
+                        (comment.name, user_email, user_email, timestamp, timestamp, 0, 0,
+                         comment.doctor, comment.user, comment.session, comment.session_video, comment.video_title, comment.timestamp,
+                         comment.duration, comment.comment_type, comment.comment_text, comment.created_at)
+                        for comment in inserted
+                    ]
+                )
+            if updated:
+                frappe.db.bulk_update("Video Comment", updated, modified=timestamp, modified_by=user_email)
+            if deleted:
+                frappe.db.delete("Video Comment", {"name": ["in", list(deleted)]})
+
+            after_bulk_write(inserted, "insert")
+            for name in updated:
+                existing[name].modified = timestamp
+            after_bulk_write([existing[name] for name in updated], "update")
+            after_bulk_write(list(deleted.values()), "delete")
+            frappe.db.commit()
+        except Exception:
+            frappe.db.rollback()
+            raise
+
+        return {
+            "message": "Success",
+            "data": {
+                "results": results,
+                "created": len(inserted),
+                "updated": len(updated),
+                "deleted": len(deleted)
+            }
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Error applying bulk comment operations: {e!s}")
+        return {"message": "Error", "error": str(e)}
+
+def normalize_comment_duration(duration):
+    """Clamp a comment duration to 1 second..10 minutes, defaulting to 30 seconds"""
+    duration = cint(duration) if duration is not None else 30
+    if duration < 1 or duration > 600:
+        duration = 30
+    return duration
+
+def normalize_comment_type(comment_type):
+    """Fall back to neutral for unknown comment types"""
+    return comment_type if comment_type in VALID_COMMENT_TYPES else "neutral"
+
 # Custom Template Management
 
 @frappe.whitelist()
@@ -678,8 +957,8 @@ def delete_custom_template(template_name):
 def test_admin_check():
     """Test endpoint to verify admin user detection"""
     try:
-        user_roles = frappe.get_roles(frappe.session.user)
-        is_admin = frappe.session.user == "administrator@gmail.com"  # Check by email instead of role
+        user_roles = sorted(get_identity().roles)
+        is_admin = get_identity().is_admin
         
         return {
             "message": "Success",
@@ -696,10 +975,11 @@ def test_admin_check():
 def test_doctor_detection():
     """Test endpoint to verify doctor account detection"""
     try:
-        user_roles = frappe.get_roles(frappe.session.user)
-        is_admin = frappe.session.user == "administrator@gmail.com"
-        is_physician = "Physician" in user_roles
-        is_doctor_email = frappe.session.user.lower().startswith('doctor')
+        identity = get_identity()
+        user_roles = sorted(identity.roles)
+        is_admin = identity.is_admin
+        is_physician = identity.is_physician
+        is_doctor_email = identity.is_doctor_email
         
         # Determine possible doctor names for current user
         possible_doctor_names = []
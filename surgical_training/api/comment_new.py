@@ -2,6 +2,9 @@ import frappe
 from frappe import _
 from frappe.utils import cint, flt, now
 
+from surgical_training.utils.author_names import get_author_name, get_author_names
+from surgical_training.utils.identity import get_identity
+
 @frappe.whitelist()
 def add_comment(session, video_title, timestamp, comment_text, duration=None, comment_type=None):
     """Add a new comment to a video with proper role-based security"""
@@ -11,7 +14,7 @@ def add_comment(session, video_title, timestamp, comment_text, duration=None, co
             frappe.throw(_("Authentication required"))
         
         # Check if user has permission to create comments
-        user_roles = frappe.get_roles(frappe.session.user)
+        user_roles = get_identity().roles
         if not ("System Manager" in user_roles or "Physician" in user_roles):
             frappe.throw(_("You don't have permission to create comments"))
         
@@ -31,6 +34,7 @@ def add_comment(session, video_title, timestamp, comment_text, duration=None, co
         comment = frappe.get_doc({
             "doctype": "Video Comment",
             "doctor": frappe.session.user,  # Will be auto-set by DocType
+            "user": frappe.session.user,
             "session": session,
             "video_title": video_title,
             "timestamp": timestamp,
@@ -81,9 +85,10 @@ def get_comments_by_video(session, video_title):
             order_by="timestamp asc"
         )
         
-        # Add display names for doctors
+        # Add display names for doctors, resolved in one batch
+        author_names = get_author_names([comment.doctor for comment in comments])
         for comment in comments:
-            comment["doctor_name"] = get_doctor_display_name(comment.doctor)
+            comment["doctor_name"] = author_names.get(comment.doctor, comment.doctor)
         
         return comments
         
@@ -160,11 +165,11 @@ def delete_comment(comment_name):
 def get_user_permissions():
     """Get current user's permissions for commenting"""
     try:
-        user_roles = frappe.get_roles(frappe.session.user)
+        user_roles = get_identity().roles
         
         return {
             "user": frappe.session.user,
-            "roles": user_roles,
+            "roles": sorted(user_roles),
             "can_create_comments": "System Manager" in user_roles or "Physician" in user_roles,
             "is_admin": "System Manager" in user_roles,
             "is_physician": "Physician" in user_roles
@@ -182,24 +187,14 @@ def get_user_permissions():
 
 def get_doctor_display_name(doctor_user):
     """Get display name for a doctor user"""
-    try:
-        # Try to get user's full name
-        user_doc = frappe.get_doc("User", doctor_user)
-        if user_doc.full_name:
-            return user_doc.full_name
-        
-        # Fallback to email-based name
-        return doctor_user.split('@')[0].replace('.', ' ').title()
-        
-    except Exception:
-        return doctor_user
+    return get_author_name(doctor_user)
 
 # Template management functions with proper security
 @frappe.whitelist()
 def get_comment_templates():
     """Get comment templates accessible to current user"""
     try:
-        user_roles = frappe.get_roles(frappe.session.user)
+        user_roles = get_identity().roles
         
         if "System Manager" in user_roles:
             # Admins can see all templates
@@ -230,7 +225,7 @@ def get_comment_templates():
 def create_comment_template(title, content, color="blue", emoji="💬"):
     """Create a new comment template"""
     try:
-        user_roles = frappe.get_roles(frappe.session.user)
+        user_roles = get_identity().roles
         
         if not ("System Manager" in user_roles or "Physician" in user_roles):
             frappe.throw(_("You don't have permission to create templates"))
@@ -1,6 +1,9 @@
 import frappe
 from frappe import _
-from frappe.utils import now
+
+from surgical_training.utils.assignment_queries import get_assignments_with_sessions, get_user_comments_by_session
+from surgical_training.utils.identity import get_identity
+from surgical_training.utils.user_stats import get_user_stats
 
 @frappe.whitelist()
 def get_doctor_sessions(status_filter=None):
@@ -8,39 +11,17 @@ def get_doctor_sessions(status_filter=None):
     user = frappe.session.user
     
     # Check if user has Physician role
-    if "Physician" not in frappe.get_roles(user):
+    if not get_identity(user).is_physician:
         frappe.throw(_("Only physicians can access this data"))
     
     try:
-        # Base filters for sessions assigned to this doctor
-        filters = {"assigned_user": user}
-        
-        # Add status filter if provided
-        if status_filter and status_filter != "All":
-            filters["doctor_status"] = status_filter
-        
-        # Get session assignments with details
-        assignments = frappe.get_all(
-            "Session Assignment",
-            filters=filters,
-            fields=[
-                "name", "session", "doctor_status", "started_at", "completed_at",
-                "progress_notes", "total_comments", "assignment_date"
-            ],
-            order_by="assignment_date desc"
+        # Assignments joined with their session details in one query
+        assignments = get_assignments_with_sessions(
+            user,
+            doctor_status=status_filter if status_filter and status_filter != "All" else None
         )
         
-        # Enrich with session details
         for assignment in assignments:
-            session_doc = frappe.get_doc("Session", assignment.session)
-            assignment.update({
-                "session_title": session_doc.title,
-                "session_description": session_doc.description,
-                "session_date": session_doc.session_date,
-                "session_status": session_doc.status,
-                "video_count": len(session_doc.videos) if session_doc.videos else 0
-            })
-            
             # Format timestamps
             for field in ["started_at", "completed_at", "assignment_date", "session_date"]:
                 if assignment.get(field):
@@ -61,7 +42,7 @@ def update_session_status(assignment_id, status, progress_notes=None):
     user = frappe.session.user
     
     # Check if user has Physician role
-    if "Physician" not in frappe.get_roles(user):
+    if not get_identity(user).is_physician:
         frappe.throw(_("Only physicians can update session status"))
     
     try:
@@ -111,48 +92,17 @@ def get_session_history():
     user = frappe.session.user
     
     # Check if user has Physician role
-    if "Physician" not in frappe.get_roles(user):
+    if not get_identity(user).is_physician:
         frappe.throw(_("Only physicians can access this data"))
     
     try:
-        # Get all completed sessions for this doctor
-        assignments = frappe.get_all(
-            "Session Assignment",
-            filters={
-                "assigned_user": user,
-                "doctor_status": "Completed"
-            },
-            fields=[
-                "name", "session", "doctor_status", "started_at", "completed_at",
-                "progress_notes", "total_comments", "assignment_date"
-            ],
-            order_by="completed_at desc"
-        )
+        # Completed sessions joined with their details, then all of the doctor's comments on them
+        assignments = get_assignments_with_sessions(user, doctor_status="Completed", order_by="completed_at")
+        comments_by_session = get_user_comments_by_session(user, {assignment.session for assignment in assignments})
         
-        # Enrich with session details and comments
         for assignment in assignments:
-            session_doc = frappe.get_doc("Session", assignment.session)
-            assignment.update({
-                "session_title": session_doc.title,
-                "session_description": session_doc.description,
-                "session_date": session_doc.session_date,
-                "video_count": len(session_doc.videos) if session_doc.videos else 0
-            })
-            
-            # Get comments made by this doctor on this session
-            comments = frappe.get_all(
-                "Video Comment",
-                filters={
-                    "session": assignment.session,
-                    "doctor": user
-                },
-                fields=[
-                    "name", "video_title", "timestamp", "comment_text", 
-                    "comment_type", "created_at"
-                ],
-                order_by="created_at asc"
-            )
-            
+            # Comments made by this doctor on this session
+            comments = comments_by_session[assignment.session]
             assignment["comments"] = comments
             
             # Format timestamps
@@ -188,7 +138,7 @@ def get_session_comments(session_id):
     user = frappe.session.user
     
     # Check if user has Physician role
-    if "Physician" not in frappe.get_roles(user):
+    if not get_identity(user).is_physician:
         frappe.throw(_("Only physicians can access this data"))
     
     try:
@@ -208,7 +158,7 @@ def get_session_comments(session_id):
             "Video Comment",
             filters={
                 "session": session_id,
-                "doctor": user
+                "user": user
             },
             fields=[
                 "name", "video_title", "timestamp", "duration", "comment_text",
@@ -248,41 +198,19 @@ def get_doctor_dashboard_stats():
     user = frappe.session.user
     
     # Check if user has Physician role
-    if "Physician" not in frappe.get_roles(user):
+    if not get_identity(user).is_physician:
         frappe.throw(_("Only physicians can access this data"))
     
     try:
-        # Get assignment counts by status
-        stats = {}
-        for status in ["Not Started", "In Progress", "Completed"]:
-            count = frappe.db.count("Session Assignment", {
-                "assigned_user": user,
-                "doctor_status": status
-            })
-            stats[status.lower().replace(" ", "_")] = count
-        
-        # Get total comments
-        total_comments = frappe.db.count("Video Comment", {"doctor": user})
-        
-        # Get recent activity (last 7 days)
-        recent_comments = frappe.db.count("Video Comment", {
-            "doctor": user,
-            "created_at": [">=", frappe.utils.add_days(now(), -7)]
-        })
-        
-        # Get sessions completed this month
-        current_month_start = frappe.utils.get_first_day(now())
-        completed_this_month = frappe.db.count("Session Assignment", {
-            "assigned_user": user,
-            "doctor_status": "Completed",
-            "completed_at": [">=", current_month_start]
-        })
+        # Every count comes from the cached per-user stats
+        user_stats = get_user_stats(user)
+        stats = user_stats["session_counts"]
         
         return {
             "session_counts": stats,
-            "total_comments": total_comments,
-            "recent_comments": recent_comments,
-            "completed_this_month": completed_this_month,
+            "total_comments": user_stats["total_comments"],
+            "recent_comments": user_stats["recent_comments"],
+            "completed_this_month": user_stats["completed_this_month"],
             "total_assigned": sum(stats.values())
         }
         
@@ -1,8 +1,12 @@
 import frappe
 from frappe import _
-from frappe.utils import now, get_datetime
+from frappe.utils import cint, now, get_datetime
 import json
 
+from surgical_training.utils.notifications import delete_notifications as delete_user_notifications
+from surgical_training.utils.notifications import coalesce_notifications, enqueue_notifications, get_notification_counts
+from surgical_training.utils.notifications import mark_notifications_read as mark_user_notifications_read
+
 
 @frappe.whitelist()
 def get_user_notifications(limit=20, offset=0, only_unread=False):
@@ -22,7 +26,7 @@ def get_user_notifications(limit=20, offset=0, only_unread=False):
 			fields=[
 				"name", "title", "message", "notification_type", "is_read", 
 				"created_at", "read_at", "action_url", "icon", "priority",
-				"related_doctype", "related_doc"
+				"related_doctype", "related_doc", "occurrence_count"
 			],
 			order_by="created_at desc",
 			limit=limit,
@@ -36,16 +40,13 @@ def get_user_notifications(limit=20, offset=0, only_unread=False):
 			if notification.read_at:
 				notification.read_at = str(notification.read_at)
 		
-		# Get unread count
-		unread_count = frappe.db.count("User Notification", {
-			"user": user,
-			"is_read": 0
-		})
+		# Counters come from the cache
+		counts = get_notification_counts(user)
 		
 		return {
 			"notifications": notifications,
-			"unread_count": unread_count,
-			"total_count": frappe.db.count("User Notification", {"user": user})
+			"unread_count": counts["unread_count"],
+			"total_count": counts["total_count"]
 		}
 		
 	except Exception as e:
@@ -89,21 +90,13 @@ def mark_all_notifications_read():
 	print(f"📖 DEBUG: mark_all_notifications_read called for {user}")
 	
 	try:
-		# Get all unread notifications for this user
-		unread_notifications = frappe.get_list(
-			"User Notification",
-			filters={"user": user, "is_read": 0},
-			fields=["name"]
-		)
-		
-		# Mark each as read
-		for notification in unread_notifications:
-			doc = frappe.get_doc("User Notification", notification.name)
-			doc.mark_as_read()
+		# One set-based update for every unread notification of this user
+		marked = mark_user_notifications_read(user)
+		frappe.db.commit()
 		
 		return {
 			"status": "success",
-			"message": f"Marked {len(unread_notifications)} notifications as read"
+			"message": f"Marked {len(marked)} notifications as read"
 		}
 		
 	except Exception as e:
@@ -111,6 +104,65 @@ def mark_all_notifications_read():
 		frappe.throw(_("Failed to mark all notifications as read"))
 
 
+@frappe.whitelist()
+def mark_notifications_read(notification_type=None, related_doctype=None, related_doc=None, notification_ids=None):
+	"""Mark the current user's unread notifications read by type, related document or ids"""
+	user = frappe.session.user
+
+	try:
+		if isinstance(notification_ids, str):
+			notification_ids = json.loads(notification_ids)
+
+		marked = mark_user_notifications_read(
+			user,
+			notification_type=notification_type,
+			related_doctype=related_doctype,
+			related_doc=related_doc,
+			names=notification_ids
+		)
+		frappe.db.commit()
+
+		return {
+			"status": "success",
+			"message": f"Marked {len(marked)} notifications as read",
+			"count": len(marked)
+		}
+
+	except Exception as e:
+		frappe.log_error(f"Error marking notifications as read: {e!s}")
+		frappe.throw(_("Failed to mark notifications as read"))
+
+
+@frappe.whitelist()
+def delete_notifications(notification_type=None, related_doctype=None, related_doc=None, notification_ids=None, only_read=False):
+	"""Delete the current user's notifications by type, related document or ids"""
+	user = frappe.session.user
+
+	try:
+		if isinstance(notification_ids, str):
+			notification_ids = json.loads(notification_ids)
+
+		deleted = delete_user_notifications(
+			user,
+			notification_type=notification_type,
+			related_doctype=related_doctype,
+			related_doc=related_doc,
+			names=notification_ids,
+			only_read=cint(only_read)
+		)
+		frappe.db.commit()
+
+		return {
+			"status": "success",
+			"message": f"Deleted {len(deleted)} notifications",
+			"count": len(deleted)
+		}
+
+	except Exception as e:
+		frappe.log_error(f"Error deleting notifications: {e!s}")
+		frappe.throw(_("Failed to delete notifications"))
+
+
 @frappe.whitelist()
 def create_notification(user, title, message, notification_type="info", 
 						related_doctype=None, related_doc=None, action_url=None, 
@@ -125,6 +177,25 @@ def create_notification(user, title, message, notification_type="info",
 		frappe.throw(_("Not permitted to create notifications for other users"))
 	
 	try:
+		# Repeats about the same document fold into the user's recent unread notification
+		merged = coalesce_notifications([user], {
+			"title": title,
+			"message": message,
+			"notification_type": notification_type,
+			"related_doctype": related_doctype,
+			"related_doc": related_doc,
+			"action_url": action_url,
+			"icon": icon,
+			"priority": priority
+		})
+		if merged:
+			frappe.db.commit()
+			return {
+				"status": "success",
+				"message": "Notification merged into an existing one",
+				"notification_id": merged[user]
+			}
+
 		notification = frappe.get_doc({
 			"doctype": "User Notification",
 			"user": user,
@@ -156,6 +227,33 @@ def create_notification(user, title, message, notification_type="info",
 		frappe.throw(_("Failed to create notification"))
 
 
+@frappe.whitelist()
+def notify_session_participants(session, title, message, notification_type="session",
+								priority="medium", icon=None, action_url=None):
+	"""Send a notification to every user assigned to a session from a background job"""
+	if not frappe.has_permission("User Notification", "create"):
+		frappe.throw(_("Not permitted to create notifications for other users"))
+
+	if not frappe.db.exists("Session", session):
+		frappe.throw(_("Session {0} not found").format(session))
+
+	enqueue_notifications({
+		"title": title,
+		"message": message,
+		"notification_type": notification_type,
+		"related_doctype": "Session",
+		"related_doc": session,
+		"action_url": action_url or f"/surgical_training/session/{session}",
+		"icon": icon,
+		"priority": priority
+	}, session=session)
+
+	return {
+		"status": "success",
+		"message": "Notifications queued"
+	}
+
+
 @frappe.whitelist()
 def delete_notification(notification_id):
 	"""Delete a notification"""
@@ -190,13 +288,8 @@ def get_notification_count():
 	user = frappe.session.user
 	
 	try:
-		total_count = frappe.db.count("User Notification", {"user": user})
-		unread_count = frappe.db.count("User Notification", {"user": user, "is_read": 0})
-		
-		return {
-			"total_count": total_count,
-			"unread_count": unread_count
-		}
+		# One cache read; SQL only on a miss
+		return get_notification_counts(user)
 		
 	except Exception as e:
 		frappe.log_error(f"Error getting notification count: {str(e)}")
@@ -208,50 +301,44 @@ def get_notification_count():
 
 # Helper functions for creating specific notification types
 
-def create_session_notification(user, session_name, session_title, action_type="assigned"):
-	"""Create a session-related notification"""
+def get_session_notification_content(session_title, action_type="assigned"):
+	"""Title, message and icon of a session-related notification"""
 	if action_type == "assigned":
-		title = "New Session Assigned"
-		message = f"You have been assigned to the training session: {session_title}"
-		icon = "calendar"
+		return "New Session Assigned", f"You have been assigned to the training session: {session_title}", "calendar"
 	elif action_type == "reminder":
-		title = "Session Reminder"
-		message = f"Your training session '{session_title}' is starting soon"
-		icon = "bell"
+		return "Session Reminder", f"Your training session '{session_title}' is starting soon", "bell"
 	else:
-		title = "Session Update"
-		message = f"Session '{session_title}' has been updated"
-		icon = "info"
+		return "Session Update", f"Session '{session_title}' has been updated", "info"
+
+
+def create_session_notification(user, session_name, session_title, action_type="assigned"):
+	"""Queue a session-related notification through the fan-out job"""
+	title, message, icon = get_session_notification_content(session_title, action_type)
 	
-	return create_notification(
-		user=user,
-		title=title,
-		message=message,
-		notification_type="session",
-		related_doctype="Session",
-		related_doc=session_name,
-		action_url=f"/surgical_training/session/{session_name}",
-		icon=icon,
-		priority="medium"
-	)
+	return enqueue_notifications({
+		"title": title,
+		"message": message,
+		"notification_type": "session",
+		"related_doctype": "Session",
+		"related_doc": session_name,
+		"action_url": f"/surgical_training/session/{session_name}",
+		"icon": icon,
+		"priority": "medium"
+	}, users=[user])
 
 
 def create_comment_notification(user, session_name, video_title, commenter_name):
-	"""Create a comment-related notification"""
-	title = "New Comment"
-	message = f"{commenter_name} commented on '{video_title}' in session"
-	
-	return create_notification(
-		user=user,
-		title=title,
-		message=message,
-		notification_type="comment",
-		related_doctype="Session",
-		related_doc=session_name,
-		action_url=f"/surgical_training/session/{session_name}",
-		icon="message-circle",
-		priority="low"
-	)
+	"""Queue a comment-related notification through the fan-out job"""
+	return enqueue_notifications({
+		"title": "New Comment",
+		"message": f"{commenter_name} commented on '{video_title}' in session",
+		"notification_type": "comment",
+		"related_doctype": "Session",
+		"related_doc": session_name,
+		"action_url": f"/surgical_training/session/{session_name}",
+		"icon": "message-circle",
+		"priority": "low"
+	}, users=[user])
 
 
 def create_system_notification(user, title, message, priority="medium"):
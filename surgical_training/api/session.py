@@ -4,6 +4,8 @@ from frappe.utils import cint
 import json
 import os, shutil
 
+from surgical_training.utils.author_names import get_author_names
+
 
 def safe_log_error(error_message, title="Session Error"):
     """Log error with character limit consideration"""
@@ -155,6 +157,7 @@ def get_session_details(session_name):
     try:
         session = frappe.get_doc("Session", session_name)
         videos = []
+        video_rows = []
         missing_files = []
         
         # Get videos from the session's video table
@@ -273,6 +276,7 @@ def get_session_details(session_name):
                 continue  # Skip this video if file doesn't exist
             
             video_data = {
+                "session_video": video_row.name,
                 "title": video_row.title,
                 "description": video_row.description or "",
                 "video_file": video_file_url,
@@ -283,6 +287,7 @@ def get_session_details(session_name):
             print(f"      video_file: '{video_data['video_file']}'")
             print(f"   ➕ Adding to videos array...")
             videos.append(video_data)
+            video_rows.append(video_row.name)
             print(f"   ✅ Video {i+1} processing complete\n")
         
         # If no videos found in session, show a helpful message
@@ -302,44 +307,35 @@ def get_session_details(session_name):
         user_email = frappe.session.user
         is_admin = user_email == "administrator@gmail.com"
         
-        # Get list of current video titles to filter comments
-        current_video_titles = [video["title"] for video in videos]
-        
         if is_admin:
             # Admin can see all comments, but only for current videos
             comments = frappe.get_list(
                 "Video Comment",
                 filters={
                     "session": session_name,
-                    "video_title": ["in", current_video_titles]  # Only comments for current videos
+                    "session_video": ["in", video_rows]  # Only comments for current videos
                 },
-                fields=["name", "doctor", "video_title", "timestamp", "comment_text", "duration", "comment_type", "created_at"],
+                fields=["name", "doctor", "video_title", "session_video", "timestamp", "comment_text", "duration", "comment_type", "created_at"],
                 order_by="created_at desc"
             )
         else:
             # Only show comments for this doctor user and current videos
-            possible_doctor_names = []
-            # Try to get Doctor record for this user
-            try:
-                doctors = frappe.get_list("Doctor", filters={"user": user_email})
-                if doctors:
-                    possible_doctor_names.append(doctors[0].name)
-            except Exception:
-                pass
-            # Always add fallback
-            possible_doctor_names.append(f"doctor-{user_email}")
-            
             comments = frappe.get_list(
                 "Video Comment",
                 filters={
                     "session": session_name,
-                    "doctor": ["in", possible_doctor_names],
-                    "video_title": ["in", current_video_titles]  # Only comments for current videos
+                    "user": user_email,
+                    "session_video": ["in", video_rows]  # Only comments for current videos
                 },
-                fields=["name", "doctor", "video_title", "timestamp", "comment_text", "duration", "comment_type", "created_at"],
+                fields=["name", "doctor", "video_title", "session_video", "timestamp", "comment_text", "duration", "comment_type", "created_at"],
                 order_by="created_at desc"
             )
         
+        # Add display names for doctors, resolved in one batch
+        author_names = get_author_names([comment.doctor for comment in comments])
+        for comment in comments:
+            comment["doctor_name"] = author_names.get(comment.doctor, comment.doctor)
+
         # Convert datetime objects to string for proper JSON serialization
         session_date = str(session.session_date) if session.session_date else ""
         
@@ -1,25 +1,66 @@
+import json
+
 import frappe
 from frappe import _
-from frappe.utils import now
+from frappe.utils import cint, now
+
+from surgical_training.utils.assignment_queries import (
+    ADMIN_PAGE_SIZE,
+    MAX_ADMIN_PAGE_SIZE,
+    get_assignment_page,
+    get_assignment_totals,
+)
+from surgical_training.utils.assignment_rules import count_rule_delta, enqueue_rule_delta, get_rule_delta
+from surgical_training.utils.assignments import BACKGROUND_ASSIGN_THRESHOLD, bulk_assign, enqueue_bulk_assign
+from surgical_training.utils.identity import get_identity
+
+# Dry runs list at most this many pending assignments
+MAX_RULE_PREVIEW = 500
 
 @frappe.whitelist(allow_guest=True)
-def get_session_assignments():
-    """Get all session assignments for admin view"""
+def get_session_assignments(session=None, user=None, status=None, from_date=None, to_date=None,
+                            sort_by="creation", sort_order="desc", cursor=None, limit=None):
+    """
+    Get one page of session assignments for the admin view.
+    Pass the returned next_cursor back to fetch the following page.
+    """
     try:
         # Check if user is admin
         if frappe.session.user != "administrator@gmail.com":
             return {"message": "Error", "error": "Access denied. Only administrators can view session assignments."}
         
-        # Get all assignments
-        assignments = frappe.get_all(
-            "Session Assignment",
-            fields=["name", "session", "assigned_user", "assigned_by", "assignment_date", "creation", "modified"],
-            order_by="creation desc"
+        limit = min(cint(limit) or ADMIN_PAGE_SIZE, MAX_ADMIN_PAGE_SIZE)
+        filters = {
+            "session": session,
+            "user": user,
+            "status": status,
+            "from_date": from_date,
+            "to_date": to_date
+        }
+
+        # Fetch one extra row to know whether another page follows
+        assignments = get_assignment_page(
+            filters, sort_by, sort_order, json.loads(cursor) if cursor else None, limit + 1
         )
         
+        next_cursor = None
+        if len(assignments) > limit:
+            assignments = assignments[:limit]
+            sort_value = assignments[-1].sort_value
+            # A NULL sort value goes out as JSON null, never as the string "None"
+            next_cursor = json.dumps([None if sort_value is None else str(sort_value), assignments[-1].name])
+        for assignment in assignments:
+            del assignment["sort_value"]
+
+        totals = get_assignment_totals(filters)
         return {
             "message": "Success",
-            "data": assignments
+            "data": {
+                "assignments": assignments,
+                "next_cursor": next_cursor,
+                "total": totals["total"],
+                "total_users": totals["users"]
+            }
         }
         
     except Exception as e:
@@ -168,47 +209,22 @@ def get_all_users():
         frappe.log_error(f"Error getting users: {str(e)}")
         return {"message": "Error", "error": str(e)}
 
-@frappe.whitelist(allow_guest=True)
+@frappe.whitelist()
 def bulk_assign_sessions(user_email, session_names):
     """Assign multiple sessions to a user at once"""
     try:
-        # Check if user is admin
-        if frappe.session.user != "administrator@gmail.com":
+        if not get_identity().is_system_manager:
             return {"message": "Error", "error": "Access denied. Only administrators can assign sessions."}
         
         if isinstance(session_names, str):
-            import json
             session_names = json.loads(session_names)
         
-        results = []
-        errors = []
-        
-        for session_name in session_names:
-            try:
-                # Check if assignment already exists
-                existing = frappe.get_all(
-                    "Session Assignment",
-                    filters={"session": session_name, "assigned_user": user_email},
-                    fields=["name"]
-                )
-                
-                if existing:
-                    errors.append(f"Session '{session_name}' is already assigned to this user")
-                    continue
-                
-                # Create new assignment
-                assignment = frappe.get_doc({
-                    "doctype": "Session Assignment",
-                    "session": session_name,
-                    "assigned_user": user_email,
-                    "assigned_by": frappe.session.user,
-                    "assignment_date": now()
-                })
-                assignment.insert(ignore_permissions=True)
-                results.append(session_name)
-                
-            except Exception as e:
-                errors.append(f"Error assigning '{session_name}': {str(e)}")
+        results = [session for session, user in bulk_assign([s for s in session_names if s], [user_email])]
+        errors = [
+            f"Session '{session_name}' is already assigned to this user or does not exist"
+            for session_name in session_names
+            if session_name not in results
+        ]
         
         return {
             "message": "Success",
@@ -223,3 +239,76 @@ def bulk_assign_sessions(user_email, session_names):
     except Exception as e:
         frappe.log_error(f"Error bulk assigning sessions: {str(e)}")
         return {"message": "Error", "error": str(e)}
+
+@frappe.whitelist()
+def bulk_assign_sessions_to_users(user_emails, session_names, notify=0):
+    """Assign every given session to every given user, skipping existing assignments"""
+    try:
+        if not get_identity().is_system_manager:
+            return {"message": "Error", "error": "Access denied. Only administrators can assign sessions."}
+
+        if isinstance(user_emails, str):
+            user_emails = json.loads(user_emails)
+        if isinstance(session_names, str):
+            session_names = json.loads(session_names)
+        user_emails = list(dict.fromkeys(u for u in user_emails if u))
+        session_names = list(dict.fromkeys(s for s in session_names if s))
+        notify = cint(notify)
+
+        if len(user_emails) * len(session_names) > BACKGROUND_ASSIGN_THRESHOLD:
+            # Progress is published to the current user while the job runs
+            enqueue_bulk_assign(session_names, user_emails, notify=notify)
+            return {
+                "message": "Success",
+                "data": {"queued": True}
+            }
+
+        pairs = bulk_assign(session_names, user_emails, notify=notify)
+        return {
+            "message": "Success",
+            "data": {
+                "queued": False,
+                "assigned": [{"session": session, "assigned_user": user} for session, user in pairs],
+                "total_assigned": len(pairs)
+            }
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Error bulk assigning sessions to users: {e!s}")
+        return {"message": "Error", "error": str(e)}
+
+@frappe.whitelist()
+def apply_assignment_rules(rule_name=None, dry_run=1):
+    """
+    Materialize Session Assignment Rules (one rule, or all enabled rules).
+    With dry_run, return the pending assignments instead of queueing them.
+    """
+    try:
+        if not get_identity().is_system_manager:
+            return {"message": "Error", "error": "Access denied. Only administrators can apply assignment rules."}
+
+        rules = [rule_name] if rule_name else None
+
+        if cint(dry_run):
+            return {
+                "message": "Success",
+                "data": {
+                    "dry_run": True,
+                    "pending": [
+                        {"session": session, "assigned_user": user}
+                        for session, user in get_rule_delta(rules, limit=MAX_RULE_PREVIEW)
+                    ],
+                    "total_pending": count_rule_delta(rules)
+                }
+            }
+
+        # Progress is published to the current user while the job runs
+        enqueue_rule_delta(rules)
+        return {
+            "message": "Success",
+            "data": {"dry_run": False, "queued": True}
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Error applying assignment rules: {e!s}")
+        return {"message": "Error", "error": str(e)}
@@ -3,6 +3,9 @@ from frappe import _
 from frappe.utils import get_fullname, cstr
 import json
 
+from surgical_training.utils.identity import get_identity
+from surgical_training.utils import user_stats
+
 
 @frappe.whitelist()
 def get_user_profile():
@@ -93,7 +96,7 @@ def setup_role_administrator():
 	user = frappe.session.user
 	
 	# Only allow System Manager to run this
-	if "System Manager" not in frappe.get_roles(user):
+	if not get_identity(user).is_system_manager:
 		frappe.throw(_("Only System Manager can setup roles"))
 	
 	try:
@@ -451,24 +454,10 @@ def get_user_stats(user=None):
 			"recent_activity": []
 		}
 		
-		# Count sessions assigned to user (if doctor doctype exists)
-		if frappe.db.exists("DocType", "Session Assignment"):
-			stats["total_sessions"] = frappe.db.count("Session Assignment", {
-				"doctor": user,
-				"docstatus": ["!=", 2]
-			})
-		
-		# Count comments by user
-		if frappe.db.exists("DocType", "Video Comment"):
-			stats["total_comments"] = frappe.db.count("Video Comment", {
-				"doctor": user,
-				"docstatus": ["!=", 2]
-			})
-		
-		# Get last login
-		last_login = frappe.db.get_value("User", user, "last_login")
-		if last_login:
-			stats["last_active"] = last_login
+		cached_stats = user_stats.get_user_stats(user)
+		stats["total_sessions"] = cached_stats["total_sessions"]
+		stats["total_comments"] = cached_stats["total_comments"]
+		stats["last_active"] = cached_stats["last_login"]
 		
 		return stats
 		
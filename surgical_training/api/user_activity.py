@@ -1,205 +1,45 @@
 import frappe
 from frappe import _
-from frappe.utils import get_datetime, format_datetime, now_datetime, getdate
+from frappe.utils import cint, get_datetime, format_datetime, now_datetime, getdate
 import json
 
+from surgical_training.utils import user_stats
+from surgical_training.utils.user_stats import get_canonical_user
+
+ACTIVITY_PAGE_SIZE = 50
+MAX_ACTIVITY_PAGE_SIZE = 200
+
 @frappe.whitelist()
-def get_user_activity_history(limit=None):
-	"""Get current user's activity history including comments, sessions, and other activities"""
+def get_user_activity_history(limit=None, cursor=None):
+	"""
+	Get a page of the current user's activity history, newest first.
+	Pass the returned next_cursor back to fetch older activities; stats are
+	only computed for the first page.
+	"""
 	user = frappe.session.user
 	
-	# Convert limit to integer (handles both string and int inputs)
-	# If no limit specified, get all activities
-	if limit is not None:
-		try:
-			limit = int(limit)
-		except (ValueError, TypeError):
-			limit = None
-	
 	try:
-		activities = []
-		
-		# Get user's comments on videos
-		# Handle potential user format mismatch (e.g., admin-administrator@gmail.com vs administrator@gmail.com)
-		user_variations = [user]
-		if "@" in user and not user.startswith("admin-"):
-			user_variations.append(f"admin-{user}")
-		elif user.startswith("admin-"):
-			user_variations.append(user.replace("admin-", "", 1))
-		
-		# Debug logging
-		print(f"🔍 User Activity Debug - User: {user}, Variations: {user_variations}")
-		
-		
-		comments = frappe.get_all(
-			"Video Comment",
-			filters={
-				"doctor": ["in", user_variations],
-				"docstatus": ["!=", 2]
-			},
-			fields=[
-				"name", "comment_text", "timestamp", "video_title", 
-				"creation", "modified", "session"
-			],
-			order_by="creation desc"
-		)
-		
-		print(f"🔍 Found {len(comments)} comments")
-		
-		for comment in comments:
-			activities.append({
-				"type": "comment",
-				"title": f"Commented on video: {comment.video_title or 'Unknown Video'}",
-				"description": comment.comment_text[:100] + ("..." if len(comment.comment_text) > 100 else ""),
-				"timestamp": comment.creation,
-				"session": comment.session,
-				"details": {
-					"video_title": comment.video_title,
-					"video_timestamp": comment.timestamp,
-					"full_comment": comment.comment_text
-				}
-			})
-		
-		# Get user's session assignments - try direct user match first
-		assignments = frappe.get_all(
-			"Session Assignment",
-			filters={
-				"assigned_user": user,
-				"docstatus": ["!=", 2]
-			},
-			fields=[
-				"name", "session", "assignment_date", "doctor_status", 
-				"assigned_by", "creation", "modified"
-			],
-			order_by="creation desc"
-		)
-		
-		print(f"🔍 Found {len(assignments)} session assignments with direct user match")
-		
-		# If no assignments found with direct match, try user variations
-		if not assignments:
-			assignments = frappe.get_all(
-				"Session Assignment",
-				filters={
-					"assigned_user": ["in", user_variations],
-					"docstatus": ["!=", 2]
-				},
-				fields=[
-					"name", "session", "assignment_date", "doctor_status", 
-					"assigned_by", "creation", "modified"
-				],
-				order_by="creation desc"
-			)
-			print(f"🔍 Found {len(assignments)} session assignments with user variations")
-		
-		for assignment in assignments:
-			# Get session details
-			session_doc = frappe.get_doc("Session", assignment.session)
-			activities.append({
-				"type": "session_assignment",
-				"title": f"Assigned to session: {session_doc.title}",
-				"description": f"Status: {assignment.doctor_status or 'Pending'}",
-				"timestamp": assignment.assignment_date or assignment.creation,
-				"session": assignment.session,
-				"details": {
-					"session_title": session_doc.title,
-					"session_description": session_doc.description,
-					"assigned_by": assignment.assigned_by,
-					"status": assignment.doctor_status
-				}
-			})
-		
-		# If no session assignments found, create session activities from sessions user has worked on (via comments)
-		if not assignments:
-			# Group comments by session to get activity details
-			sessions_from_comments = set([c.session for c in comments if c.session])
-			print(f"🔍 Sessions found from comments: {list(sessions_from_comments)}")
-			
-			for session_name in sessions_from_comments:
-				try:
-					session_doc = frappe.get_doc("Session", session_name)
-					# Get all comments for this session
-					session_comments = [c for c in comments if c.session == session_name]
-					
-					# Get first and last comment times
-					earliest_comment = min(session_comments, key=lambda x: x.creation)
-					latest_comment = max(session_comments, key=lambda x: x.creation)
-					comment_count = len(session_comments)
-					
-					# Create description based on comment activity
-					if comment_count == 1:
-						description = f"Left {comment_count} comment on training videos"
-					else:
-						description = f"Left {comment_count} comments on training videos"
-					
-					# Use the latest comment time as the activity timestamp (more recent activity)
-					activities.append({
-						"type": "session_assignment", 
-						"title": f"Participated in session: {session_doc.title}",
-						"description": description,
-						"timestamp": latest_comment.creation,
-						"session": session_name,
-						"details": {
-							"session_title": session_doc.title,
-							"session_description": session_doc.description,
-							"comment_count": comment_count,
-							"first_activity": earliest_comment.creation,
-							"latest_activity": latest_comment.creation,
-							"status": "Active Participant"
-						}
-					})
-				except Exception as e:
-					print(f"🔍 Error getting session {session_name}: {e}")
-					continue
-		
-		# Evaluations removed from activity history as requested
+		limit = min(max(cint(limit) or ACTIVITY_PAGE_SIZE, 1), MAX_ACTIVITY_PAGE_SIZE)
 		
-		# Get recent login activity (from User table)
-		user_doc = frappe.get_doc("User", user)
-		if user_doc.last_login:
-			activities.append({
-				"type": "login",
-				"title": "Logged in",
-				"description": "Accessed the surgical training platform",
-				"timestamp": user_doc.last_login,
-				"session": None,
-				"details": {
-					"login_time": user_doc.last_login
-				}
-			})
+		rows = get_activity_page(user, limit + 1, json.loads(cursor) if cursor else None)
 		
-		print(f"🔍 Total activities before sorting: {len(activities)}")
-		print(f"🔍 Activities by type: {[(a['type'], a['title'][:50]) for a in activities[:5]]}")
+		next_cursor = None
+		if len(rows) > limit:
+			rows = rows[:limit]
+			next_cursor = json.dumps([str(rows[-1].event_time), rows[-1].name])
 		
-		# Sort all activities by timestamp (most recent first)
-		activities.sort(key=lambda x: get_datetime(x["timestamp"]), reverse=True)
-		
-		# Get summary statistics from ALL activities before limiting
-		all_activities_stats = {
-			"total_comments": len([a for a in activities if a["type"] == "comment"]),
-			"total_sessions": len(set([a["session"] for a in activities if a["session"]])),
-			"total_evaluations": len([a for a in activities if a["type"] == "evaluation"]),
-			"last_activity": activities[0]["timestamp"] if activities else None
-		}
-		
-		print(f"🔍 Stats calculated: {all_activities_stats}")
-		
-		# Only limit activities if a specific limit was requested
-		if limit is not None:
-			activities = activities[:limit]
+		activities = [build_activity(row) for row in rows]
 		
 		# Format timestamps for display
 		for activity in activities:
 			activity["formatted_time"] = format_datetime(activity["timestamp"], format_string="MMM dd, yyyy 'at' hh:mm a")
 			activity["relative_time"] = get_relative_time(activity["timestamp"])
 		
-		# Use the comprehensive stats from all activities
-		stats = all_activities_stats
-		
 		return {
 			"status": "success",
 			"activities": activities,
-			"stats": stats,
+			"stats": None if cursor else get_activity_summary(user),
+			"next_cursor": next_cursor,
 			"user": user
 		}
 		
@@ -211,6 +51,146 @@ def get_user_activity_history(limit=None):
 			"error": str(e)
 		}
 
+def get_activity_page(user, limit, cursor=None):
+	"""
+	One range scan over the user's Activity Events, ordered by (event_time, name)
+	descending and resumed after the keyset cursor. The source rows are joined
+	by primary key for display only; events of deleted comments are skipped.
+	"""
+	# Events are stored under the canonical user (admin-<email> variants included)
+	values = {"user": get_canonical_user(user), "limit": limit}
+	cursor_condition = ""
+	if cursor:
+		values["cursor_time"], values["cursor_name"] = get_datetime(cursor[0]), cursor[1]
+		cursor_condition = "AND (ae.event_time < %(cursor_time)s OR (ae.event_time = %(cursor_time)s AND ae.name < %(cursor_name)s))"
+
+	return frappe.db.sql(f"""
+		SELECT ae.name, ae.event_type, ae.event_time, ae.session, ae.summary,
+			s.title AS session_title, s.description AS session_description,
+			vc.video_title, vc.timestamp AS video_timestamp, vc.comment_text,
+			sa.doctor_status AS status, sa.assigned_by
+		FROM `tabActivity Event` ae
+		LEFT JOIN `tabSession` s ON s.name = ae.session
+		LEFT JOIN `tabVideo Comment` vc
+			ON ae.reference_doctype = 'Video Comment' AND vc.name = ae.reference_name
+		LEFT JOIN `tabSession Assignment` sa
+			ON ae.reference_doctype = 'Session Assignment' AND sa.name = ae.reference_name
+		WHERE ae.user = %(user)s
+			AND ae.event_type != 'comment_deleted'
+			AND NOT (ae.event_type = 'comment' AND vc.name IS NULL)
+			{cursor_condition}
+		ORDER BY ae.event_time DESC, ae.name DESC
+		LIMIT %(limit)s
+	""", values, as_dict=True)
+
+def build_activity(row):
+	"""Shape one Activity Event like the activity entries the UI renders"""
+	if row.event_type == "comment":
+		comment_text = row.comment_text or ""
+		return {
+			"type": "comment",
+			"title": f"Commented on video: {row.video_title or 'Unknown Video'}",
+			"description": comment_text[:100] + ("..." if len(comment_text) > 100 else ""),
+			"timestamp": row.event_time,
+			"session": row.session,
+			"details": {
+				"video_title": row.video_title,
+				"video_timestamp": row.video_timestamp,
+				"full_comment": comment_text
+			}
+		}
+
+	if row.event_type == "login":
+		return {
+			"type": "login",
+			"title": "Logged in",
+			"description": "Accessed the surgical training platform",
+			"timestamp": row.event_time,
+			"session": None,
+			"details": {
+				"login_time": row.event_time
+			}
+		}
+
+	if row.event_type == "evaluation":
+		title, description = f"Evaluated session: {row.session_title}", row.summary
+	elif row.event_type == "status_change":
+		title, description = f"Updated session: {row.session_title}", row.summary
+	else:
+		title, description = f"Assigned to session: {row.session_title}", f"Status: {row.status or 'Pending'}"
+
+	return {
+		"type": "session_assignment",
+		"title": title,
+		"description": description,
+		"timestamp": row.event_time,
+		"session": row.session,
+		"details": {
+			"session_title": row.session_title,
+			"session_description": row.session_description,
+			"assigned_by": row.assigned_by,
+			"status": row.status
+		}
+	}
+
+def get_activity_summary(user):
+	"""Summary stats of the feed, from the cached stats service"""
+	stats = user_stats.get_user_stats(user)
+	return {
+		"total_comments": stats["total_comments"],
+		"total_sessions": stats["total_sessions"],
+		"total_evaluations": stats["completed_evaluations"],
+		"comments_this_week": stats["comments_this_week"],
+		"last_activity": stats["last_activity"]
+	}
+
+@frappe.whitelist()
+def get_activity_events(event_type=None, session=None, cursor=None, limit=None):
+	"""Page through the current user's Activity Event log, newest first"""
+	user = frappe.session.user
+
+	try:
+		limit = min(max(cint(limit) or ACTIVITY_PAGE_SIZE, 1), MAX_ACTIVITY_PAGE_SIZE)
+		values = {"user": get_canonical_user(user), "limit": limit + 1}
+		conditions = ["user = %(user)s"]
+
+		if event_type:
+			conditions.append("event_type = %(event_type)s")
+			values["event_type"] = event_type
+		if session:
+			conditions.append("session = %(session)s")
+			values["session"] = session
+		if cursor:
+			values["cursor_time"], values["cursor_name"] = json.loads(cursor)
+			conditions.append("(event_time < %(cursor_time)s OR (event_time = %(cursor_time)s AND name < %(cursor_name)s))")
+
+		events = frappe.db.sql(f"""
+			SELECT name, event_type, session, event_time, reference_doctype, reference_name, summary
+			FROM `tabActivity Event`
+			WHERE {" AND ".join(conditions)}
+			ORDER BY event_time DESC, name DESC
+			LIMIT %(limit)s
+		""", values, as_dict=True)
+
+		next_cursor = None
+		if len(events) > limit:
+			events = events[:limit]
+			next_cursor = json.dumps([str(events[-1].event_time), events[-1].name])
+
+		return {
+			"status": "success",
+			"events": events,
+			"next_cursor": next_cursor
+		}
+
+	except Exception as e:
+		frappe.log_error(f"Error getting activity events: {e!s}")
+		return {
+			"status": "error",
+			"message": _("Failed to get activity events"),
+			"error": str(e)
+		}
+
 def get_relative_time(timestamp):
 	"""Get relative time string like '2 hours ago'"""
 	try:
@@ -249,58 +229,17 @@ def get_user_activity_stats():
 	user = frappe.session.user
 	
 	try:
-		# Handle potential user format mismatch
-		user_variations = [user]
-		if "@" in user and not user.startswith("admin-"):
-			user_variations.append(f"admin-{user}")
-		elif user.startswith("admin-"):
-			user_variations.append(user.replace("admin-", "", 1))
-		
-		stats = {}
-		
-		# Count total comments
-		stats["total_comments"] = frappe.db.count("Video Comment", {
-			"doctor": ["in", user_variations],
-			"docstatus": ["!=", 2]
-		})
-		
-		# Count total sessions assigned
-		stats["total_sessions"] = frappe.db.count("Session Assignment", {
-			"assigned_user": ["in", user_variations],
-			"docstatus": ["!=", 2]
-		})
-		
-		# Count completed evaluations
-		if frappe.db.exists("DocType", "Session Evaluation"):
-			stats["completed_evaluations"] = frappe.db.count("Session Evaluation", {
-				"doctor": ["in", user_variations],
-				"docstatus": ["!=", 2]
-			})
-		else:
-			stats["completed_evaluations"] = 0
-		
-		# Get most recent activity
-		recent_comment = frappe.get_all(
-			"Video Comment",
-			filters={"doctor": ["in", user_variations], "docstatus": ["!=", 2]},
-			fields=["creation"],
-			order_by="creation desc",
-			limit=1
-		)
-		
-		stats["last_activity"] = recent_comment[0].creation if recent_comment else None
-		
-		# Calculate activity this week
-		week_ago = frappe.utils.add_days(frappe.utils.nowdate(), -7)
-		stats["comments_this_week"] = frappe.db.count("Video Comment", {
-			"doctor": ["in", user_variations],
-			"creation": [">=", week_ago],
-			"docstatus": ["!=", 2]
-		})
+		stats = user_stats.get_user_stats(user)
 		
 		return {
 			"status": "success",
-			"stats": stats
+			"stats": {
+				"total_comments": stats["total_comments"],
+				"total_sessions": stats["total_sessions"],
+				"completed_evaluations": stats["completed_evaluations"],
+				"last_activity": stats["last_comment"],
+				"comments_this_week": stats["comments_this_week"]
+			}
 		}
 		
 	except Exception as e:
@@ -145,6 +145,53 @@ app_license = "mit"
 # 	}
 # }
 
+doc_events = {
+	"User": {
+		"on_update": [
+			"surgical_training.utils.author_names.clear_author_names_cache",
+			"surgical_training.utils.identity.on_user_update",
+			"surgical_training.utils.assignment_rules.on_user_update"
+		],
+		"on_trash": "surgical_training.utils.author_names.clear_author_names_cache"
+	},
+	"Video Comment": {
+		"after_insert": [
+			"surgical_training.utils.activity_events.on_comment_insert",
+			"surgical_training.utils.user_stats.on_comment_change"
+		],
+		"on_update": "surgical_training.utils.user_stats.on_comment_change",
+		"on_trash": [
+			"surgical_training.utils.activity_events.on_comment_trash",
+			"surgical_training.utils.user_stats.on_comment_change"
+		]
+	},
+	"Session Assignment": {
+		"after_insert": [
+			"surgical_training.utils.activity_events.on_assignment_insert",
+			"surgical_training.utils.user_stats.on_assignment_change",
+			"surgical_training.utils.assignment_queries.on_assignment_change"
+		],
+		"on_update": [
+			"surgical_training.utils.activity_events.on_assignment_update",
+			"surgical_training.utils.user_stats.on_assignment_change",
+			"surgical_training.utils.assignment_queries.on_assignment_change"
+		],
+		"on_trash": [
+			"surgical_training.utils.user_stats.on_assignment_change",
+			"surgical_training.utils.assignment_queries.on_assignment_change"
+		]
+	},
+	"Session Evaluation": {
+		"after_insert": [
+			"surgical_training.utils.activity_events.on_evaluation_insert",
+			"surgical_training.utils.user_stats.on_evaluation_change"
+		],
+		"on_trash": "surgical_training.utils.user_stats.on_evaluation_change"
+	}
+}
+
+on_login = "surgical_training.utils.activity_events.on_login"
+
 # Scheduled Tasks
 # ---------------
 
@@ -166,6 +213,21 @@ app_license = "mit"
 # 	],
 # }
 
+scheduler_events = {
+	"hourly": [
+		"surgical_training.surgical_training.doctype.session_assignment.session_assignment.reconcile_comment_counts",
+		"surgical_training.utils.notifications.reconcile_notification_counts"
+	],
+	"daily": [
+		"surgical_training.surgical_training.doctype.video_comment_tombstone.video_comment_tombstone.purge_old_tombstones",
+		"surgical_training.surgical_training.doctype.idempotency_key.idempotency_key.purge_expired_keys",
+		"surgical_training.utils.notifications.archive_read_notifications"
+	],
+	"monthly": [
+		"surgical_training.surgical_training.doctype.activity_event.activity_event.prune_old_events"
+	]
+}
+
 # Testing
 # -------
 
@@ -199,6 +261,8 @@ app_license = "mit"
 # before_request = ["surgical_training.utils.before_request"]
 # after_request = ["surgical_training.utils.after_request"]
 
+after_request = ["surgical_training.utils.identity.log_identity_stats"]
+
 # Job Events
 # ----------
 # before_job = ["surgical_training.utils.before_job"]
@@ -262,6 +326,11 @@ whitelisted_methods = [
     "surgical_training.api.session.get_sessions",
     "surgical_training.api.session.get_session_details", 
     "surgical_training.api.comment.get_custom_templates",
+    "surgical_training.api.comment.get_comments_in_window",
+    "surgical_training.api.comment.get_comment_histogram",
+    "surgical_training.api.comment.get_comment_changes",
+    "surgical_training.api.comment.bulk_comment_operations",
+    "surgical_training.api.comment.search_comments",
     "surgical_training.api.video.serve_video_file",
     "surgical_training.api.video.serve_video",
     "surgical_training.api.video_management.create_fallback_video",
@@ -283,6 +352,9 @@ whitelisted_methods = [
     "surgical_training.api.notification.create_notification",
     "surgical_training.api.notification.delete_notification",
     "surgical_training.api.notification.get_notification_count",
+    "surgical_training.api.notification.mark_notifications_read",
+    "surgical_training.api.notification.delete_notifications",
+    "surgical_training.api.notification.notify_session_participants",
     "surgical_training.api.comment_new.add_comment",
     "surgical_training.api.comment_new.get_comments_by_video",
     "surgical_training.api.comment_new.update_comment",
@@ -296,6 +368,7 @@ whitelisted_methods = [
     "surgical_training.api.doctor_session.get_session_comments",
     "surgical_training.api.doctor_session.get_doctor_dashboard_stats",
     "surgical_training.api.user_activity.get_user_activity_history",
+    "surgical_training.api.user_activity.get_activity_events",
     "surgical_training.api.user_activity.get_user_activity_stats",
     "surgical_training.api.user_admin.add_doctor_role_to_user",
     "surgical_training.api.user_admin.get_user_roles"
@@ -0,0 +1,10 @@
+import frappe
+
+
+def execute():
+    """Index comments and tombstones by (session, change_seq) for the comment changes feed"""
+    from surgical_training.surgical_training.doctype.video_comment import video_comment
+    from surgical_training.surgical_training.doctype.video_comment_tombstone import video_comment_tombstone
+
+    video_comment.on_doctype_update()
+    video_comment_tombstone.on_doctype_update()
@@ -0,0 +1,8 @@
+import frappe
+
+
+def execute():
+    """Index Video Comment by (session, modified) for the comment changes feed"""
+    from surgical_training.surgical_training.doctype.video_comment import video_comment
+
+    video_comment.on_doctype_update()
@@ -0,0 +1,8 @@
+import frappe
+
+
+def execute():
+    """Add the FULLTEXT index on Video Comment.comment_text used by comment search"""
+    from surgical_training.surgical_training.doctype.video_comment import video_comment
+
+    video_comment.on_doctype_update()
@@ -0,0 +1,16 @@
+import frappe
+
+
+def execute():
+    """Create the composite indexes used by the comment, assignment and notification queries.
+
+    Fresh installs get them from each DocType's on_doctype_update; this patch
+    backfills existing sites. add_index skips indexes that already exist, so
+    re-running it is safe.
+    """
+    from surgical_training.surgical_training.doctype.session_assignment import session_assignment
+    from surgical_training.surgical_training.doctype.user_notification import user_notification
+    from surgical_training.surgical_training.doctype.video_comment import video_comment
+
+    for module in (video_comment, session_assignment, user_notification):
+        module.on_doctype_update()
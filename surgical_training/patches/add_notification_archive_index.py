@@ -0,0 +1,8 @@
+import frappe
+
+
+def execute():
+    """Index User Notification by (is_read, created_at) for the archival job"""
+    from surgical_training.surgical_training.doctype.user_notification import user_notification
+
+    user_notification.on_doctype_update()
@@ -0,0 +1,21 @@
+import frappe
+
+
+def execute():
+    """Point existing Video Comments at their Session Video row by matching titles"""
+    frappe.reload_doc("surgical_training", "doctype", "video_comment")
+
+    from surgical_training.surgical_training.doctype.video_comment import video_comment
+
+    frappe.db.sql("""
+        UPDATE `tabVideo Comment` vc
+        INNER JOIN `tabSession Video` sv
+            ON sv.parent = vc.session
+            AND sv.parenttype = 'Session'
+            AND sv.title = vc.video_title
+        SET vc.session_video = sv.name
+        WHERE IFNULL(vc.session_video, '') = ''
+    """)
+    frappe.db.commit()
+
+    video_comment.on_doctype_update()
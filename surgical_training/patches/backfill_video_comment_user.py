@@ -0,0 +1,59 @@
+import frappe
+
+
+def execute():
+    """Fill Video Comment.user from the legacy doctor values.
+
+    Comments are grouped by their distinct doctor value, each value is resolved
+    once, and every resolved user is written with a single UPDATE over all of
+    its doctor variants.
+    """
+    frappe.reload_doc("surgical_training", "doctype", "video_comment")
+
+    from surgical_training.surgical_training.doctype.video_comment import video_comment
+
+    doctors = frappe.db.sql_list("""
+        SELECT DISTINCT doctor
+        FROM `tabVideo Comment`
+        WHERE IFNULL(user, '') = ''
+    """)
+
+    if doctors:
+        # Resolve Doctor records and plain emails in one query each
+        doctor_users = dict(frappe.get_all(
+            "Doctor",
+            filters={"name": ["in", doctors]},
+            fields=["name", "user"],
+            as_list=True
+        ))
+        known_users = set(frappe.get_all(
+            "User",
+            filters={"name": ["in", doctors]},
+            pluck="name"
+        ))
+
+        variants_by_user = {}
+        for doctor in doctors:
+            if doctor.startswith("admin-"):
+                user = doctor[len("admin-"):]
+            elif doctor.startswith("doctor-"):
+                user = doctor[len("doctor-"):]
+            elif doctor_users.get(doctor):
+                user = doctor_users[doctor]
+            elif doctor in known_users:
+                user = doctor
+            else:
+                print(f"Could not resolve a user for doctor value '{doctor}'")
+                continue
+            variants_by_user.setdefault(user, []).append(doctor)
+
+        for user, variants in variants_by_user.items():
+            frappe.db.sql("""
+                UPDATE `tabVideo Comment`
+                SET user = %s
+                WHERE doctor IN %s AND IFNULL(user, '') = ''
+            """, (user, tuple(variants)))
+
+        frappe.db.commit()
+
+    video_comment.on_doctype_update()
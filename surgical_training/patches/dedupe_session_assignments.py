@@ -0,0 +1,50 @@
+import frappe
+
+STATUS_RANK = {"Not Started": 0, "In Progress": 1, "Completed": 2}
+
+
+def execute():
+    """Merge duplicate Session Assignments into the most advanced row per pair, then add the unique index"""
+    from surgical_training.surgical_training.doctype.session_assignment import session_assignment
+
+    rows = frappe.db.sql("""
+        SELECT sa.name, sa.session, sa.assigned_user, sa.doctor_status, sa.assignment_date,
+            sa.started_at, sa.completed_at, sa.progress_notes, sa.modified
+        FROM `tabSession Assignment` sa
+        INNER JOIN (
+            SELECT session, assigned_user
+            FROM `tabSession Assignment`
+            GROUP BY session, assigned_user
+            HAVING COUNT(*) > 1
+        ) duplicate ON duplicate.session = sa.session AND duplicate.assigned_user = sa.assigned_user
+    """, as_dict=True)
+
+    groups = {}
+    for row in rows:
+        groups.setdefault((row.session, row.assigned_user), []).append(row)
+
+    for group in groups.values():
+        # The furthest status wins; among equals, the most recently touched row
+        survivor = max(group, key=lambda row: (STATUS_RANK.get(row.doctor_status, 0), row.modified, row.name))
+        others = [row for row in group if row.name != survivor.name]
+
+        frappe.db.set_value("Session Assignment", survivor.name, {
+            "assignment_date": min_value(row.assignment_date for row in group),
+            "started_at": min_value(row.started_at for row in group) if survivor.doctor_status != "Not Started" else None,
+            "completed_at": (survivor.completed_at or max_value(row.completed_at for row in group))
+                if survivor.doctor_status == "Completed" else None,
+            "progress_notes": survivor.progress_notes or next((row.progress_notes for row in others if row.progress_notes), None)
+        }, update_modified=False)
+        frappe.db.delete("Session Assignment", {"name": ["in", [row.name for row in others]]})
+
+    session_assignment.on_doctype_update()
+
+
+def min_value(values):
+    values = [value for value in values if value]
+    return min(values) if values else None
+
+
+def max_value(values):
+    values = [value for value in values if value]
+    return max(values) if values else None
@@ -0,0 +1,8 @@
+import frappe
+
+
+def execute():
+    """Correct Session Assignment.total_comments before the comment hooks start maintaining it"""
+    from surgical_training.surgical_training.doctype.session_assignment import session_assignment
+
+    session_assignment.reconcile_comment_counts()
@@ -2,9 +2,17 @@ import frappe
 from frappe import _
 import json
 
+from surgical_training.utils.idempotency import get_idempotency_key, get_replayed_response, save_idempotent_response
+
 @frappe.whitelist()
 def add_evaluation(**kwargs):
     try:
+        # A retry with the same idempotency_key replays the first response
+        idempotency_key = get_idempotency_key(kwargs.get("idempotency_key"))
+        replayed = get_replayed_response("add_evaluation", idempotency_key)
+        if replayed:
+            return replayed
+
         # Log received data for debugging
         frappe.logger().debug(f"Received evaluation data: {kwargs}")
         
@@ -56,15 +64,16 @@ def add_evaluation(**kwargs):
         
         # Save to database
         evaluation.insert(ignore_permissions=True)
-        frappe.db.commit()
-        
-        frappe.logger().info(f"Evaluation {evaluation.name} saved successfully")
-        return {
+        response = save_idempotent_response("add_evaluation", idempotency_key, {
             "message": "Success",
             "data": {
                 "name": evaluation.name
             }
-        }
+        })
+        frappe.db.commit()
+
+        frappe.logger().info(f"Evaluation {response['data']['name']} saved successfully")
+        return response
         
     except frappe.exceptions.ValidationError as e:
         frappe.db.rollback()
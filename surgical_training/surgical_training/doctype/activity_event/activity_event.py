@@ -0,0 +1,39 @@
+# Copyright (c) 2026, None and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_months, get_first_day, nowdate
+
+# Events are kept for this many whole months; older months are pruned
+ACTIVITY_EVENT_RETENTION_MONTHS = 24
+PRUNE_BATCH_SIZE = 5000
+
+
+class ActivityEvent(Document):
+	pass
+
+
+def prune_old_events():
+	"""Scheduled job: drop the months of events that fell out of the retention window"""
+	cutoff = get_first_day(add_months(nowdate(), -ACTIVITY_EVENT_RETENTION_MONTHS))
+
+	# Batches keep each delete's locks and undo log small
+	while True:
+		names = frappe.get_all(
+			"Activity Event",
+			filters={"event_time": ["<", cutoff]},
+			pluck="name",
+			limit=PRUNE_BATCH_SIZE
+		)
+		if not names:
+			break
+		frappe.db.delete("Activity Event", {"name": ["in", names]})
+		frappe.db.commit()
+
+
+def on_doctype_update():
+	"""Indexes for the per-user and per-session feeds and the monthly prune"""
+	frappe.db.add_index("Activity Event", ["user", "event_time"])
+	frappe.db.add_index("Activity Event", ["session", "event_time"])
+	frappe.db.add_index("Activity Event", ["event_time"])
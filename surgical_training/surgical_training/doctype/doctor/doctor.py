@@ -1,10 +1,18 @@
 import frappe
 from frappe.model.document import Document
 
+from surgical_training.utils.author_names import clear_author_names_cache
+
 class Doctor(Document):
     def validate(self):
         self.set_full_name()
     
+    def on_update(self):
+        clear_author_names_cache()
+
+    def on_trash(self):
+        clear_author_names_cache()
+
     def set_full_name(self):
         # Get the full name from the linked User
         if self.user:
@@ -0,0 +1,21 @@
+# Copyright (c) 2026, None and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import now_datetime
+
+
+class IdempotencyKey(Document):
+	pass
+
+
+def purge_expired_keys():
+	"""Scheduled job: delete idempotency keys past their TTL"""
+	frappe.db.delete("Idempotency Key", {"expires_at": ["<", now_datetime()]})
+	frappe.db.commit()
+
+
+def on_doctype_update():
+	"""Index for the expiry purge"""
+	frappe.db.add_index("Idempotency Key", ["expires_at"])
@@ -1,11 +1,56 @@
 import frappe
 from frappe.model.document import Document
+from frappe.utils import now
+
+from surgical_training.utils.comment_changes import mark_comment_changes
+from surgical_training.utils.comment_histogram import invalidate_comment_histograms
+from surgical_training.utils.comment_index import invalidate_comment_index
+from surgical_training.utils.session_videos import invalidate_session_videos
 
 class Session(Document):
     def before_save(self):
         self.validate_videos()
     
+    def on_update(self):
+        invalidate_session_videos(self.name)
+        self.invalidate_resized_video_histograms()
+        self.sync_comment_video_titles()
+
+    def on_trash(self):
+        invalidate_session_videos(self.name)
+
     def validate_videos(self):
         """Ensure at least one video is attached to the session"""
         if not self.videos or len(self.videos) == 0:
-            frappe.throw("At least one video must be attached to the session") 
\ No newline at end of file
+            frappe.throw("At least one video must be attached to the session")
+
+    def invalidate_resized_video_histograms(self):
+        """Histogram bins span the video duration, so a changed duration drops its histograms"""
+        before = self.get_doc_before_save()
+        old_durations = {row.name: row.duration for row in before.videos} if before else {}
+        for row in self.videos:
+            if old_durations.get(row.name) != row.duration:
+                invalidate_comment_histograms(row.name)
+
+    def sync_comment_video_titles(self):
+        """Carry video renames over to the comments that reference the row"""
+        renamed = frappe.db.sql_list("""
+            SELECT vc.name
+            FROM `tabVideo Comment` vc
+            INNER JOIN `tabSession Video` sv ON sv.name = vc.session_video
+            WHERE vc.session = %s AND vc.video_title != sv.title
+        """, self.name)
+        if not renamed:
+            return
+
+        frappe.db.sql("""
+            UPDATE `tabVideo Comment` vc
+            INNER JOIN `tabSession Video` sv ON sv.name = vc.session_video
+            SET vc.video_title = sv.title, vc.modified = %s
+            WHERE vc.name IN %s
+        """, (now(), tuple(renamed)))
+
+        # Synced clients pick the new titles up from get_comment_changes
+        mark_comment_changes(renamed, "update")
+        for session_video in {row.name for row in self.videos}:
+            invalidate_comment_index(session_video)
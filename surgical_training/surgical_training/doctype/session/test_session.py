@@ -0,0 +1,90 @@
+# Copyright (c) 2026, None and contributors
+# For license information, please see license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from surgical_training.utils.realtime import COMMENT_EVENT
+from surgical_training.utils.session_videos import VIDEO_MAP_KEY, get_session_videos
+
+
+class TestSessionVideoCache(FrappeTestCase):
+    def setUp(self):
+        self.session = frappe.get_doc({
+            "doctype": "Session",
+            "title": "Cache Test Session",
+            "session_date": "2026-10-19",
+            "videos": [
+                {"title": "Intro", "video_file": "/files/intro.mp4", "duration": 120},
+                {"title": "Closure", "video_file": "/files/closure.mp4", "duration": 300}
+            ]
+        }).insert(ignore_permissions=True)
+        self.key = VIDEO_MAP_KEY.format(self.session.name)
+        frappe.db.after_commit.run()
+
+    def test_video_map_is_cached_with_ttl(self):
+        videos = get_session_videos(self.session.name)
+        self.assertEqual(set(videos["by_title"]), {"Intro", "Closure"})
+        self.assertGreater(frappe.cache.ttl(frappe.cache.make_key(self.key)), 0)
+
+        # A cached read does not touch the database
+        with patch("surgical_training.utils.session_videos.build_session_videos") as build:
+            self.assertEqual(get_session_videos(self.session.name), videos)
+            build.assert_not_called()
+
+    def test_session_video_write_invalidates_map(self):
+        stale = get_session_videos(self.session.name)
+
+        self.session.videos[0].duration = 180
+        self.session.append("videos", {"title": "Debrief", "video_file": "/files/debrief.mp4", "duration": 60})
+        self.session.save(ignore_permissions=True)
+        self.assertIsNone(frappe.cache.get_value(self.key))
+
+        # A concurrent reader caches the pre-commit rows; the after-commit drop removes them
+        frappe.cache.set_value(self.key, stale)
+        frappe.db.after_commit.run()
+        self.assertIsNone(frappe.cache.get_value(self.key))
+
+        videos = get_session_videos(self.session.name)
+        self.assertIn("Debrief", videos["by_title"])
+        self.assertEqual(videos["by_title"]["Intro"].duration, 180)
+
+
+class TestCommentRealtime(FrappeTestCase):
+    def setUp(self):
+        # publish_realtime sends through emit_via_redis on its own connection, not frappe.cache
+        patcher = patch("frappe.realtime.emit_via_redis")
+        self.emit = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.session = frappe.get_doc({
+            "doctype": "Session",
+            "title": "Realtime Test Session",
+            "session_date": "2026-10-19",
+            "videos": [{"title": "Intro", "video_file": "/files/intro.mp4", "duration": 120}]
+        }).insert(ignore_permissions=True)
+
+    def test_comment_event_published_to_session_room(self):
+        comment = frappe.get_doc({
+            "doctype": "Video Comment",
+            "doctor": "Administrator",
+            "session": self.session.name,
+            "video_title": "Intro",
+            "timestamp": 12,
+            "comment_text": "Check the port placement"
+        }).insert(ignore_permissions=True)
+
+        # Realtime events are sent after commit; nothing goes out before it
+        self.assertFalse([call for call in self.emit.call_args_list if call.args[0] == COMMENT_EVENT])
+
+        # Run the callbacks without committing
+        frappe.db.after_commit.run()
+
+        comment_events = [call.args for call in self.emit.call_args_list if call.args[0] == COMMENT_EVENT]
+        self.assertEqual(len(comment_events), 1)
+        _, message, room = comment_events[0]
+        self.assertEqual(message["name"], comment.name)
+        self.assertEqual(message["action"], "insert")
+        self.assertIn(f"Session/{self.session.name}", room)
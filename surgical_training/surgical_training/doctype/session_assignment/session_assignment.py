@@ -5,27 +5,26 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import now
 
+from surgical_training.utils.identity import get_identity
+
 class SessionAssignment(Document):
     def validate(self):
-        # Check for duplicate assignments
-        existing = frappe.get_all(
-            "Session Assignment",
-            filters={
-                "session": self.session,
-                "assigned_user": self.assigned_user,
-                "name": ["!=", self.name or ""]
-            }
-        )
-        
-        if existing:
-            frappe.throw(f"Session '{self.session}' is already assigned to user '{self.assigned_user}'")
-        
+        # Duplicate (session, assigned_user) pairs are rejected by the unique index
         # Validate status transitions and timestamps
         self.validate_status_transitions()
         
-        # Update comment count
-        self.update_comment_count()
+        # Comment hooks keep the count current; only a new pairing needs a full count
+        if self.is_new() or self.has_value_changed("session") or self.has_value_changed("assigned_user"):
+            self.update_comment_count()
     
+    def before_save(self):
+        # total_comments is maintained by adjust_comment_count; an ordinary save must not
+        # write back the value loaded with the form over increments made since
+        if not self.is_new() and not self.has_value_changed("session") and not self.has_value_changed("assigned_user"):
+            self.total_comments = frappe.db.get_value(
+                "Session Assignment", self.name, "total_comments", for_update=True
+            )
+
     def before_insert(self):
         if not self.assignment_date:
             self.assignment_date = now()
@@ -59,7 +58,7 @@ class SessionAssignment(Document):
         if self.session and self.assigned_user:
             comment_count = frappe.db.count("Video Comment", {
                 "session": self.session,
-                "doctor": self.assigned_user
+                "user": self.assigned_user
             })
             self.total_comments = comment_count
     
@@ -69,15 +68,56 @@ class SessionAssignment(Document):
             user = frappe.session.user
             
         # System managers can edit any status
-        if "System Manager" in frappe.get_roles(user):
+        if get_identity(user).is_system_manager:
             return True
             
         # Doctors can only edit their own assignments
-        if "Physician" in frappe.get_roles(user) and self.assigned_user == user:
+        if get_identity(user).is_physician and self.assigned_user == user:
             return True
             
         return False
 
+def adjust_comment_count(session, user, delta):
+    """Atomically add delta to the total_comments of a user's assignment on a session"""
+    if not session or not user or not delta:
+        return
+
+    frappe.db.sql("""
+        UPDATE `tabSession Assignment`
+        SET total_comments = GREATEST(IFNULL(total_comments, 0) + %s, 0)
+        WHERE session = %s AND assigned_user = %s
+    """, (delta, session, user))
+
+def reconcile_comment_counts():
+    """Scheduled job: correct any total_comments that drifted from the real comment count"""
+    frappe.db.sql("""
+        UPDATE `tabSession Assignment` sa
+        LEFT JOIN (
+            SELECT session, user, COUNT(*) AS comment_count
+            FROM `tabVideo Comment`
+            GROUP BY session, user
+        ) vc ON vc.session = sa.session AND vc.user = sa.assigned_user
+        SET sa.total_comments = IFNULL(vc.comment_count, 0)
+        WHERE IFNULL(sa.total_comments, -1) != IFNULL(vc.comment_count, 0)
+    """)
+    frappe.db.commit()
+
+def on_doctype_update():
+    """Composite index for the per-doctor session list filtered by status, unique session/user pairs"""
+    frappe.db.add_index("Session Assignment", ["assigned_user", "doctor_status", "assignment_date"])
+
+    # Sites with legacy duplicates get the unique index from the dedupe patch
+    if not frappe.db.has_index("tabSession Assignment", "unique_session_assigned_user") and not has_duplicate_assignments():
+        frappe.db.add_unique("Session Assignment", ["session", "assigned_user"], constraint_name="unique_session_assigned_user")
+
+def has_duplicate_assignments():
+    return bool(frappe.db.sql("""
+        SELECT 1 FROM `tabSession Assignment`
+        GROUP BY session, assigned_user
+        HAVING COUNT(*) > 1
+        LIMIT 1
+    """))
+
 # Permission hooks for row-level security
 def get_permission_query_conditions(user):
     """
@@ -89,12 +129,12 @@ def get_permission_query_conditions(user):
         user = frappe.session.user
     
     # System Managers can see everything
-    if "System Manager" in frappe.get_roles(user):
+    if get_identity(user).is_system_manager:
         return ""
     
     # Physicians can only see their own assignments
-    if "Physician" in frappe.get_roles(user):
-        return f"`tabSession Assignment`.assigned_user = '{user}'"
+    if get_identity(user).is_physician:
+        return f"`tabSession Assignment`.assigned_user = {frappe.db.escape(user)}"
     
     # Default: no access
     return "1=0"
@@ -109,11 +149,11 @@ def has_permission(doc, user):
         user = frappe.session.user
     
     # System Managers can access everything
-    if "System Manager" in frappe.get_roles(user):
+    if get_identity(user).is_system_manager:
         return True
     
     # Physicians can only access their own assignments
-    if "Physician" in frappe.get_roles(user):
+    if get_identity(user).is_physician:
         return doc.assigned_user == user
     
     # Default: no access
@@ -0,0 +1,160 @@
+# Copyright (c) 2026, None and contributors
+# For license information, please see license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from surgical_training.surgical_training.doctype.session_assignment.session_assignment import (
+    on_doctype_update,
+)
+from surgical_training.utils import assignments
+from surgical_training.utils.activity_events import get_activity_event_name
+
+USERS = [f"doctor.assign{i}.test@example.com" for i in range(3)]
+
+
+class TestBulkAssign(FrappeTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        on_doctype_update()
+
+        for user in USERS:
+            if not frappe.db.exists("User", user):
+                frappe.get_doc({
+                    "doctype": "User",
+                    "email": user,
+                    "first_name": "Assign",
+                    "send_welcome_email": 0
+                }).insert(ignore_permissions=True)
+
+        cls.sessions = [
+            frappe.get_doc({
+                "doctype": "Session",
+                "title": f"Bulk Assign Session {i}",
+                "session_date": "2026-10-19",
+                "videos": [{"title": "Intro", "video_file": "/files/intro.mp4", "duration": 120}]
+            }).insert(ignore_permissions=True).name
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        frappe.db.savepoint("bulk_assign_test")
+        self.addCleanup(frappe.db.rollback, save_point="bulk_assign_test")
+
+        # Keep the per-chunk commits inside the test transaction
+        patcher = patch.object(frappe.db, "commit")
+        self.commit = patcher.start()
+        self.addCleanup(patcher.stop)
+        frappe.local.surgical_training_activity_events = None
+
+    def assignment_pairs(self):
+        return sorted(frappe.get_all(
+            "Session Assignment",
+            filters={"session": ["in", self.sessions], "assigned_user": ["in", USERS]},
+            fields=["session", "assigned_user"],
+            as_list=True
+        ))
+
+    def queued_events(self):
+        return getattr(frappe.local, "surgical_training_activity_events", None) or []
+
+    def test_existing_pairs_are_skipped(self):
+        first = assignments.bulk_assign(self.sessions, USERS[:2])
+        self.assertEqual(len(first), 4)
+
+        second = assignments.bulk_assign(self.sessions, USERS)
+        self.assertEqual(sorted(second), sorted((session, USERS[2]) for session in self.sessions))
+        self.assertEqual(len(self.assignment_pairs()), 6)
+
+    def test_unique_index_rejects_duplicates(self):
+        self.assertTrue(frappe.db.has_index("tabSession Assignment", "unique_session_assigned_user"))
+        assignments.bulk_assign(self.sessions[:1], USERS[:1])
+
+        with self.assertRaises((frappe.UniqueValidationError, frappe.DuplicateEntryError)):
+            frappe.get_doc({
+                "doctype": "Session Assignment",
+                "session": self.sessions[0],
+                "assigned_user": USERS[0]
+            }).insert(ignore_permissions=True)
+
+    def test_racing_insert_records_only_inserted_rows(self):
+        # A pair assigned between the anti-join and the insert is ignored by the unique index
+        assignments.bulk_assign(self.sessions[:1], USERS[:1])
+        frappe.local.surgical_training_activity_events = None
+
+        pairs = [(self.sessions[0], USERS[0]), (self.sessions[0], USERS[1])]
+        inserted = assignments.insert_assignments(pairs, "Administrator")
+        self.assertEqual(inserted, [(self.sessions[0], USERS[1])])
+
+        name = frappe.db.get_value("Session Assignment", {"session": self.sessions[0], "assigned_user": USERS[1]})
+        events = self.queued_events()
+        self.assertEqual([event[0] for event in events], [get_activity_event_name("assignment", name)])
+        self.assertEqual(events[0][10], name)
+
+    def test_insert_side_effects(self):
+        frappe.get_doc({
+            "doctype": "Video Comment",
+            "doctor": USERS[0],
+            "user": USERS[0],
+            "session": self.sessions[0],
+            "video_title": "Intro",
+            "timestamp": 5,
+            "comment_text": "Before assignment"
+        }).db_insert()
+
+        with patch.object(assignments, "invalidate_user_stats") as invalidate_stats, \
+                patch.object(assignments, "invalidate_assignment_totals") as invalidate_totals:
+            assignments.bulk_assign(self.sessions[:1], USERS[:2])
+
+        invalidate_stats.assert_called_once()
+        self.assertEqual(set(invalidate_stats.call_args.args), set(USERS[:2]))
+        invalidate_totals.assert_called_once()
+
+        counts = dict(frappe.get_all(
+            "Session Assignment",
+            filters={"session": self.sessions[0], "assigned_user": ["in", USERS[:2]]},
+            fields=["assigned_user", "total_comments"],
+            as_list=True
+        ))
+        self.assertEqual(counts, {USERS[0]: 1, USERS[1]: 0})
+        self.assertEqual({event[5] for event in self.queued_events()}, {"assignment"})
+        self.assertEqual({event[6] for event in self.queued_events()}, set(USERS[:2]))
+
+    def test_commits_and_reports_progress_per_chunk(self):
+        with patch.object(assignments, "ASSIGNMENT_CHUNK_SIZE", 2), \
+                patch.object(frappe, "publish_progress") as publish_progress:
+            assigned = assignments.bulk_assign(self.sessions, USERS, progress_title="Assigning sessions")
+
+        self.assertEqual(len(assigned), 6)
+        self.assertEqual(self.commit.call_count, 3)
+        self.assertEqual(publish_progress.call_count, 3)
+        self.assertEqual(publish_progress.call_args.args[0], 100)
+
+    def test_failed_job_resumes_after_committed_chunks(self):
+        insert_assignments = assignments.insert_assignments
+        chunks = []
+
+        def fail_second_chunk(chunk, *args):
+            chunks.append(chunk)
+            if len(chunks) == 2:
+                raise Exception("Lost connection to MySQL server")
+            return insert_assignments(chunk, *args)
+
+        with patch.object(assignments, "ASSIGNMENT_CHUNK_SIZE", 2), \
+                patch.object(assignments, "insert_assignments", fail_second_chunk), \
+                patch.object(frappe.db, "rollback"), \
+                patch.object(frappe, "log_error"), \
+                patch.object(frappe, "enqueue") as enqueue:
+            assignments.run_bulk_assign(self.sessions, USERS, "Administrator")
+
+        self.assertEqual(len(self.assignment_pairs()), 2)
+        retry = enqueue.call_args.kwargs
+        self.assertEqual(retry["attempt"], 2)
+
+        # The retry recomputes the missing pairs and only inserts the rest
+        resumed = assignments.run_bulk_assign(retry["sessions"], retry["users"], retry["assigned_by"], attempt=2)
+        self.assertEqual(len(resumed), 4)
+        self.assertEqual(len(self.assignment_pairs()), 6)
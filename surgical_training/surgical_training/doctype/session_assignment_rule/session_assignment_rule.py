@@ -0,0 +1,30 @@
+# Copyright (c) 2026, None and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+from surgical_training.utils.assignment_rules import enqueue_rule_delta
+
+
+class SessionAssignmentRule(Document):
+	def validate(self):
+		seen = set()
+		for row in self.sessions:
+			if row.session in seen:
+				frappe.throw(_("Session {0} is listed more than once").format(row.session))
+			seen.add(row.session)
+
+	def on_update(self):
+		"""Materialize the rule; when only sessions were added, just for those"""
+		if not self.enabled:
+			return
+
+		sessions = {row.session for row in self.sessions}
+		before = self.get_doc_before_save()
+		if before and before.enabled and before.role == self.role:
+			sessions -= {row.session for row in before.sessions}
+
+		if sessions:
+			enqueue_rule_delta(rules=[self.name], sessions=list(sessions))
@@ -4,6 +4,9 @@
 import frappe
 from frappe.model.document import Document
 
+from surgical_training.utils.notifications import adjust_notification_counts
+from surgical_training.utils.realtime import publish_notification_event
+
 
 class UserNotification(Document):
 	def before_insert(self):
@@ -14,6 +17,19 @@ class UserNotification(Document):
 		if not self.is_read:
 			self.is_read = 0
 	
+	def after_insert(self):
+		"""Count the notification and push it to the recipient's open clients"""
+		adjust_notification_counts(self.user, total=1, unread=0 if self.is_read else 1)
+		publish_notification_event(self)
+
+	def on_update(self):
+		"""Keep the unread counter in step with read/unread changes"""
+		if not self.flags.in_insert and self.has_value_changed("is_read"):
+			adjust_notification_counts(self.user, unread=-1 if self.is_read else 1)
+
+	def on_trash(self):
+		adjust_notification_counts(self.user, total=-1, unread=0 if self.is_read else -1)
+
 	def validate(self):
 		"""Validate notification data"""
 		if not self.user:
@@ -40,4 +56,10 @@ class UserNotification(Document):
 		"""Get formatted time for display"""
 		if self.created_at:
 			return frappe.utils.pretty_date(self.created_at)
-		return ""
\ No newline at end of file
+		return ""
+
+
+def on_doctype_update():
+	"""Composite indexes for the per-user inbox and unread counts, and the archival scan"""
+	frappe.db.add_index("User Notification", ["user", "is_read", "created_at"])
+	frappe.db.add_index("User Notification", ["is_read", "created_at"])
@@ -0,0 +1,14 @@
+# Copyright (c) 2026, None and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class UserNotificationArchive(Document):
+	pass
+
+
+def on_doctype_update():
+	"""Index for per-user archive lookups"""
+	frappe.db.add_index("User Notification Archive", ["user", "created_at"])
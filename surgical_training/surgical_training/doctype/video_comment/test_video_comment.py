@@ -0,0 +1,264 @@
+# Copyright (c) 2026, None and contributors
+# For license information, please see license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, now_datetime
+
+from surgical_training.utils.activity_events import EVENT_FIELDS
+
+# Enough spread-out rows that the optimizer prefers an index to a table scan
+ROWS = 400
+SESSIONS = 20
+USERS = 20
+
+
+class TestHotQueryIndexes(FrappeTestCase):
+    """EXPLAIN the SQL the hot read paths actually issue and check each one reads through its composite index"""
+
+    USER = "hot-doctor-3@example.com"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for module in cls.doctype_modules():
+            module.on_doctype_update()
+
+        base = now_datetime()
+        frappe.db.bulk_insert("Session", [
+            "name", "creation", "modified", "owner", "modified_by", "docstatus", "idx", "title", "session_date"
+        ], [
+            (f"hot-session-{i}", base, base, "Administrator", "Administrator", 0, 0, f"Hot Session {i}", base.date())
+            for i in range(SESSIONS)
+        ])
+        frappe.db.bulk_insert("Video Comment", [
+            "name", "creation", "modified", "owner", "modified_by", "docstatus", "idx",
+            "doctor", "user", "session", "video_title", "session_video", "timestamp", "comment_text", "created_at"
+        ], [
+            (
+                f"test-hot-vc-{i}", add_to_date(base, minutes=-i), base, "Administrator", "Administrator", 0, 0,
+                f"hot-doctor-{i % USERS}@example.com", f"hot-doctor-{i % USERS}@example.com",
+                f"hot-session-{i % SESSIONS}", f"Video {i % 3}", f"hot-sv-{i % 60}", i, "text", base
+            )
+            for i in range(ROWS)
+        ])
+        frappe.db.bulk_insert("User Notification", [
+            "name", "creation", "modified", "owner", "modified_by", "docstatus", "idx",
+            "user", "title", "message", "notification_type", "is_read", "created_at"
+        ], [
+            (
+                f"test-hot-un-{i}", base, base, "Administrator", "Administrator", 0, 0,
+                ("Administrator", f"hot-doctor-{i % USERS}@example.com")[i % 2], "Title", "Message", "comment", i % 3 == 0,
+                add_to_date(base, minutes=-i)
+            )
+            for i in range(ROWS)
+        ])
+        frappe.db.bulk_insert("Session Assignment", [
+            "name", "creation", "modified", "owner", "modified_by", "docstatus", "idx",
+            "session", "assigned_user", "assignment_date", "doctor_status"
+        ], [
+            (
+                f"test-hot-sa-{i}", base, base, "Administrator", "Administrator", 0, 0,
+                f"hot-session-{i // USERS}", f"hot-doctor-{i % USERS}@example.com",
+                add_to_date(base, minutes=-i), ("Not Started", "In Progress", "Completed")[i % 3]
+            )
+            for i in range(ROWS)
+        ])
+        frappe.db.bulk_insert("Activity Event", EVENT_FIELDS, [
+            (
+                f"test-hot-ae-{i}", "Administrator", "Administrator", base, base, "comment",
+                f"hot-doctor-{i % USERS}@example.com", f"hot-session-{i % SESSIONS}", add_to_date(base, minutes=-i),
+                "Video Comment", f"test-hot-vc-{i}", "Commented"
+            )
+            for i in range(ROWS)
+        ])
+
+    @classmethod
+    def tearDownClass(cls):
+        frappe.db.rollback()
+        super().tearDownClass()
+
+    def tearDown(self):
+        frappe.set_user("Administrator")
+
+    @staticmethod
+    def doctype_modules():
+        from surgical_training.surgical_training.doctype.activity_event import activity_event
+        from surgical_training.surgical_training.doctype.session_assignment import session_assignment
+        from surgical_training.surgical_training.doctype.user_notification import user_notification
+        from surgical_training.surgical_training.doctype.video_comment import video_comment
+
+        return (video_comment, session_assignment, user_notification, activity_event)
+
+    def issued_queries(self, func, *args, **kwargs):
+        """Run func and return the (query, values) of every SELECT it sent to the database"""
+        with patch.object(frappe.db, "sql", wraps=frappe.db.sql) as sql:
+            func(*args, **kwargs)
+
+        queries = []
+        for call in sql.call_args_list:
+            query = call.args[0] if call.args else call.kwargs["query"]
+            values = call.args[1] if len(call.args) > 1 else call.kwargs.get("values", ())
+            if query.lstrip().upper().startswith("SELECT"):
+                queries.append((query, values))
+        return queries
+
+    def assertReadsThrough(self, queries, table, index):
+        """Every issued query over table reads it through index"""
+        plans = [
+            [row for row in frappe.db.sql(f"EXPLAIN {query}", values, as_dict=True) if row.table == table]
+            for query, values in queries
+        ]
+        plans = [plan for plan in plans if plan]
+        self.assertTrue(plans, f"no issued query reads {table}")
+        for plan in plans:
+            self.assertNotIn("ALL", [row.type for row in plan], f"full scan of {table} in plan {plan}")
+            self.assertIn(index, [row.key for row in plan], f"{index} unused in plan {plan}")
+
+    def test_comment_list_by_video(self):
+        from surgical_training.api.comment import get_comments_by_video
+
+        frappe.set_user("administrator@gmail.com")
+        queries = self.issued_queries(get_comments_by_video, "hot-session-3", "Video 1")
+        self.assertReadsThrough(queries, "tabVideo Comment", "session_video_title_timestamp_index")
+
+    def test_doctor_session_list(self):
+        # api/doctor_session.py get_doctor_sessions
+        from surgical_training.utils.assignment_queries import get_assignments_with_sessions
+
+        queries = self.issued_queries(get_assignments_with_sessions, self.USER, doctor_status="In Progress")
+        self.assertReadsThrough(queries, "sa", "assigned_user_doctor_status_assignment_date_index")
+
+    def test_activity_feed(self):
+        # api/user_activity.py get_user_activity_history
+        from surgical_training.api.user_activity import get_activity_page
+
+        queries = self.issued_queries(get_activity_page, self.USER, 21)
+        self.assertReadsThrough(queries, "ae", "user_event_time_index")
+
+    def test_user_stats(self):
+        # utils/user_stats.py, behind the dashboard and activity stats endpoints
+        from surgical_training.utils.user_stats import compute_user_stats
+
+        queries = self.issued_queries(compute_user_stats, self.USER)
+        self.assertReadsThrough(queries, "vc", "user_creation_index")
+        self.assertReadsThrough(queries, "tabSession Assignment", "assigned_user_doctor_status_assignment_date_index")
+
+    def test_unread_notifications(self):
+        from surgical_training.api.notification import get_user_notifications
+
+        queries = self.issued_queries(get_user_notifications, only_unread=True)
+        self.assertReadsThrough(queries, "tabUser Notification", "user_is_read_created_at_index")
+
+
+class TestBulkCommentOperations(FrappeTestCase):
+    """bulk_comment_operations against the same operations sent through add_comment one by one"""
+
+    COMMENTS = 50
+    USER = "doctor.bulk.test@example.com"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if not frappe.db.exists("User", cls.USER):
+            frappe.get_doc({
+                "doctype": "User",
+                "email": cls.USER,
+                "first_name": "Bulk",
+                "send_welcome_email": 0
+            }).insert(ignore_permissions=True)
+
+        cls.session = frappe.get_doc({
+            "doctype": "Session",
+            "title": "Bulk Comment Session",
+            "session_date": "2026-10-19",
+            "videos": [{"title": "Main", "video_file": "/files/main.mp4", "duration": 600}]
+        }).insert(ignore_permissions=True)
+
+    def setUp(self):
+        frappe.set_user(self.USER)
+        self.addCleanup(frappe.set_user, "Administrator")
+
+        # Keep the endpoints' commits inside the test transaction
+        patcher = patch.object(frappe.db, "commit")
+        self.commit = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def operations(self):
+        valid = [
+            {"op": "create", "session": self.session.name, "video_title": "Main", "timestamp": i * 10,
+             "comment_text": f"Note {i}", "duration": 15, "comment_type": ("neutral", "warning")[i % 2]}
+            for i in range(self.COMMENTS)
+        ]
+        invalid = [
+            {"op": "create", "session": self.session.name, "video_title": "Missing", "timestamp": 5, "comment_text": "Lost"},
+            {"op": "create", "session": self.session.name, "video_title": "Main", "timestamp": 900, "comment_text": "Too late"},
+            {"op": "create", "session": self.session.name, "video_title": "Main", "timestamp": -1, "comment_text": "Too early"}
+        ]
+        return valid + invalid
+
+    def run_sequential(self, operations):
+        from surgical_training.api.comment import add_comment
+
+        results = []
+        for operation in operations:
+            response = add_comment(
+                operation["session"], operation["video_title"], operation["timestamp"], operation["comment_text"],
+                duration=operation.get("duration"), comment_type=operation.get("comment_type")
+            )
+            results.append(response.get("error"))
+        return results
+
+    def run_bulk(self, operations):
+        from surgical_training.api.comment import bulk_comment_operations
+
+        response = bulk_comment_operations(operations)
+        self.assertEqual(response["message"], "Success")
+        return [result.get("error") for result in response["data"]["results"]]
+
+    def saved_rows(self):
+        rows = frappe.get_all(
+            "Video Comment",
+            filters={"session": self.session.name},
+            fields=["doctor", "user", "session_video", "video_title", "timestamp", "duration", "comment_type", "comment_text"],
+            as_list=True
+        )
+        frappe.db.delete("Video Comment", {"session": self.session.name})
+        return sorted(rows)
+
+    def test_bulk_matches_sequential(self):
+        operations = self.operations()
+
+        sequential_errors = self.run_sequential(operations)
+        sequential_rows = self.saved_rows()
+        bulk_errors = self.run_bulk(operations)
+        bulk_rows = self.saved_rows()
+
+        self.assertEqual(len(bulk_rows), self.COMMENTS)
+        self.assertEqual(bulk_rows, sequential_rows)
+        self.assertEqual(bulk_errors, sequential_errors)
+
+    def comment_inserts(self, run, operations):
+        """INSERT statements into Video Comment and commits issued by run"""
+        self.commit.reset_mock()
+        with patch.object(frappe.db, "sql", wraps=frappe.db.sql) as sql:
+            run(operations)
+        self.saved_rows()
+
+        inserts = [
+            call for call in sql.call_args_list
+            if str(call.args[0] if call.args else call.kwargs["query"]).lstrip().upper().startswith("INSERT INTO `TABVIDEO COMMENT`")
+        ]
+        return len(inserts), self.commit.call_count
+
+    def test_bulk_writes_in_one_statement_and_commit(self):
+        operations = self.operations()
+
+        sequential_inserts, _ = self.comment_inserts(self.run_sequential, operations)
+        bulk_inserts, bulk_commits = self.comment_inserts(self.run_bulk, operations)
+
+        self.assertEqual(sequential_inserts, self.COMMENTS)
+        self.assertEqual(bulk_inserts, 1)
+        self.assertEqual(bulk_commits, 1)
@@ -1,6 +1,16 @@
 import frappe
 from frappe.model.document import Document
-from frappe.utils import now_datetime
+from frappe.utils import now, now_datetime
+
+from surgical_training.surgical_training.doctype.session_assignment.session_assignment import adjust_comment_count
+from surgical_training.utils.activity_events import record_activity_event
+from surgical_training.utils.comment_changes import mark_comment_changes
+from surgical_training.utils.comment_histogram import invalidate_comment_histograms
+from surgical_training.utils.comment_index import invalidate_comment_index
+from surgical_training.utils.identity import get_identity
+from surgical_training.utils.realtime import publish_comment_event
+from surgical_training.utils.session_videos import get_session_videos
+from surgical_training.utils.user_stats import invalidate_user_stats
 
 class VideoComment(Document):
     def before_save(self):
@@ -12,46 +22,181 @@ class VideoComment(Document):
             self.doctor = frappe.session.user
     
     def before_insert(self):
+        self.set_user()
+
         # Ensure Physicians can only create comments with their own user
-        if self.has_physician_role() and self.doctor != frappe.session.user:
+        if self.has_physician_role() and self.user != frappe.session.user:
             frappe.throw("You can only create comments as yourself")
     
+    def after_insert(self):
+        adjust_comment_count(self.session, self.user, 1)
+
+    def on_update(self):
+        self.invalidate_video_caches()
+        self.move_comment_count()
+        mark_comment_changes([self.name], "insert" if self.flags.in_insert else "update")
+        publish_comment_event(self, "insert" if self.flags.in_insert else "update")
+
+    def on_trash(self):
+        self.invalidate_video_caches()
+        adjust_comment_count(self.session, self.user, -1)
+        self.add_tombstone()
+        publish_comment_event(self, "delete")
+
+    def add_tombstone(self):
+        """Record the delete for clients syncing comment changes"""
+        frappe.get_doc({
+            "doctype": "Video Comment Tombstone",
+            "comment": self.name,
+            "session": self.session,
+            "session_video": self.session_video,
+            "video_title": self.video_title,
+            "user": self.user,
+            "deleted_at": now()
+        }).insert(ignore_permissions=True)
+        mark_comment_changes([self.name], "delete")
+
+    def move_comment_count(self):
+        """Move this comment between assignment counters if its session or user changed"""
+        previous = self.get_doc_before_save()
+        if not previous or (previous.session, previous.user) == (self.session, self.user):
+            return
+        adjust_comment_count(previous.session, previous.user, -1)
+        adjust_comment_count(self.session, self.user, 1)
+
+    def invalidate_video_caches(self):
+        """Drop the cached comment index and histograms of this comment's video"""
+        invalidate_comment_index(self.session_video)
+        invalidate_comment_histograms(self.session_video)
+
     def validate(self):
+        self.set_user()
+        self.set_session_video()
+
         # Validate the timestamp is within video duration
         self.validate_timestamp_in_video_range()
         
         # Enforce row-level security for Physicians
         self.validate_physician_access()
     
+    def set_session_video(self):
+        """Link the comment to its Session Video row, matched by title on first save"""
+        if not self.session_video:
+            video = get_session_videos(self.session)["by_title"].get(self.video_title)
+            self.session_video = video.name if video else None
+
     def validate_timestamp_in_video_range(self):
         """Validate that the timestamp is within the video duration"""
-        session = frappe.get_doc("Session", self.session)
+        video = get_session_videos(self.session)["by_name"].get(self.session_video)
         
-        # Find the video with the matching title
-        video_found = False
-        for video in session.videos:
-            if video.title == self.video_title:
-                video_found = True
-                if video.duration and self.timestamp > video.duration:
-                    frappe.throw(f"Timestamp {self.timestamp} is greater than video duration {video.duration}")
-                break
-        
-        if not video_found:
+        if not video:
             frappe.throw(f"Video with title '{self.video_title}' not found in session {self.session}")
+
+        # Follow renames of the video row
+        self.video_title = video.title
+
+        if video.duration and self.timestamp > video.duration:
+            frappe.throw(f"Timestamp {self.timestamp} is greater than video duration {video.duration}")
     
+    def set_user(self):
+        """Resolve the canonical User behind the legacy doctor value"""
+        if not self.user:
+            self.user = resolve_comment_user(self.doctor) if self.doctor else frappe.session.user
+
     def validate_physician_access(self):
         """Ensure Physicians can only access their own comments"""
         if self.has_physician_role():
-            if self.doctor != frappe.session.user:
+            if self.user != frappe.session.user:
                 frappe.throw("You can only access your own comments")
     
     def has_physician_role(self):
         """Check if current user has Physician role"""
-        return "Physician" in frappe.get_roles(frappe.session.user)
+        return get_identity().is_physician
     
     def has_system_manager_role(self):
         """Check if current user has System Manager role"""
-        return "System Manager" in frappe.get_roles(frappe.session.user)
+        return get_identity().is_system_manager
+
+def after_bulk_write(comments, action):
+    """
+    Run the on_update/on_trash side effects for comments written with bulk SQL.
+    comments are dicts with the Video Comment columns; action is insert, update or delete.
+    """
+    for session_video in {comment.session_video for comment in comments}:
+        invalidate_comment_index(session_video)
+        invalidate_comment_histograms(session_video)
+
+    if action in ("insert", "delete"):
+        counts = {}
+        for comment in comments:
+            counts[(comment.session, comment.user)] = counts.get((comment.session, comment.user), 0) + 1
+        for (session, user), count in counts.items():
+            adjust_comment_count(session, user, count if action == "insert" else -count)
+
+    if action == "insert":
+        for comment in comments:
+            record_activity_event(
+                "comment", comment.user, comment.session, "Video Comment", comment.name,
+                f"Commented on {comment.video_title}", comment.created_at
+            )
+
+    if action == "delete" and comments:
+        for comment in comments:
+            record_activity_event(
+                "comment_deleted", comment.user, comment.session, "Video Comment", comment.name,
+                f"Deleted a comment on {comment.video_title}"
+            )
+
+        timestamp = now()
+        frappe.db.bulk_insert(
+            "Video Comment Tombstone",
+            ["name", "owner", "modified_by", "creation", "modified", "comment", "session", "session_video", "video_title", "user", "deleted_at"],
+            [
+                (frappe.generate_hash(length=10), frappe.session.user, frappe.session.user, timestamp, timestamp,
+                 comment.name, comment.session, comment.session_video, comment.video_title, comment.user, timestamp)
+                for comment in comments
+            ]
+        )
+
+    invalidate_user_stats(*{comment.user for comment in comments})
+    mark_comment_changes([comment.name for comment in comments], action)
+
+    for comment in comments:
+        publish_comment_event(comment, action)
+
+def resolve_comment_user(doctor):
+    """
+    Map a legacy doctor value to the User it belongs to.
+    The doctor field holds Doctor names, raw emails, admin-<email> or doctor-<email>.
+    """
+    if not doctor:
+        return None
+
+    for prefix in ("admin-", "doctor-"):
+        if doctor.startswith(prefix):
+            return doctor[len(prefix):]
+
+    doctor_user = frappe.db.get_value("Doctor", doctor, "user")
+    if doctor_user:
+        return doctor_user
+
+    if frappe.db.exists("User", doctor):
+        return doctor
+
+    return None
+
+def on_doctype_update():
+    """Composite indexes for the comment list, author and per-session lookups, plus comment search"""
+    frappe.db.add_index("Video Comment", ["session", "video_title", "timestamp"])
+    frappe.db.add_index("Video Comment", ["session_video", "timestamp"])
+    frappe.db.add_index("Video Comment", ["user", "creation"])
+    frappe.db.add_index("Video Comment", ["session", "user"])
+    frappe.db.add_index("Video Comment", ["session", "modified"])
+    frappe.db.add_index("Video Comment", ["session", "change_seq"])
+
+    # Full-text index for search_comments; add_index only builds plain indexes
+    if not frappe.db.has_index("tabVideo Comment", "comment_text_fulltext"):
+        frappe.db.sql_ddl("ALTER TABLE `tabVideo Comment` ADD FULLTEXT INDEX comment_text_fulltext (comment_text)")
 
 # Hook functions for permission control
 def get_permission_query_conditions(user):
@@ -64,12 +209,12 @@ def get_permission_query_conditions(user):
         user = frappe.session.user
     
     # System Managers can see everything
-    if "System Manager" in frappe.get_roles(user):
+    if get_identity(user).is_system_manager:
         return ""
     
     # Physicians can only see their own comments
-    if "Physician" in frappe.get_roles(user):
-        return f"`tabVideo Comment`.doctor = '{user}'"
+    if get_identity(user).is_physician:
+        return f"`tabVideo Comment`.user = {frappe.db.escape(user)}"
     
     # Default: no access
     return "1=0"
@@ -84,12 +229,12 @@ def has_permission(doc, user):
         user = frappe.session.user
     
     # System Managers can access everything
-    if "System Manager" in frappe.get_roles(user):
+    if get_identity(user).is_system_manager:
         return True
     
     # Physicians can only access their own comments
-    if "Physician" in frappe.get_roles(user):
-        return doc.doctor == user
+    if get_identity(user).is_physician:
+        return doc.user == user
     
     # Default: no access
     return False 
\ No newline at end of file
@@ -0,0 +1,33 @@
+# Copyright (c) 2026, None and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, now_datetime
+
+from surgical_training.utils.comment_changes import set_purged_cursor
+
+# Clients whose sync cursor is older than this must reload the full comment list
+TOMBSTONE_RETENTION_DAYS = 30
+
+
+class VideoCommentTombstone(Document):
+	pass
+
+
+def purge_old_tombstones():
+	"""Scheduled job: delete tombstones past the retention window"""
+	cutoff = add_days(now_datetime(), -TOMBSTONE_RETENTION_DAYS)
+	purged_seq = frappe.db.sql("""
+		SELECT MAX(change_seq) FROM `tabVideo Comment Tombstone` WHERE deleted_at < %s
+	""", cutoff)[0][0]
+	if purged_seq:
+		set_purged_cursor(purged_seq)
+	frappe.db.delete("Video Comment Tombstone", {"deleted_at": ["<", cutoff]})
+	frappe.db.commit()
+
+
+def on_doctype_update():
+	"""Composite indexes for the per-session changes feed and the purge job"""
+	frappe.db.add_index("Video Comment Tombstone", ["session", "deleted_at"])
+	frappe.db.add_index("Video Comment Tombstone", ["session", "change_seq"])
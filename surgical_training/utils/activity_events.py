@@ -0,0 +1,95 @@
+import hashlib
+
+import frappe
+from frappe.utils import now
+
+from surgical_training.utils.user_stats import get_canonical_user
+
+# Activity Events are buffered on frappe.local and written with one bulk
+# insert just before the transaction commits, so they land atomically with
+# the change that caused them and a rolled-back request leaves none behind.
+# Events that happen once per document are named with the full SHA1 of their
+# type and document, the same way the backfill_activity_events patch names
+# them, so a replay inserts nothing twice. Events are stored under the
+# canonical user so a user's feed is one range scan on (user, event_time).
+KEYED_EVENT_TYPES = ("comment", "comment_deleted", "assignment", "evaluation")
+EVENT_FIELDS = ["name", "owner", "modified_by", "creation", "modified", "event_type", "user", "session", "event_time", "reference_doctype", "reference_name", "summary"]
+
+
+def record_activity_event(event_type, user, session=None, reference_doctype=None, reference_name=None, summary=None, event_time=None):
+	"""Queue one Activity Event for the current transaction"""
+	if not user or user == "Guest":
+		return
+
+	buffer = getattr(frappe.local, "surgical_training_activity_events", None)
+	if buffer is None:
+		buffer = frappe.local.surgical_training_activity_events = []
+		frappe.db.before_commit.add(flush_activity_events)
+		frappe.db.after_rollback.add(discard_activity_events)
+
+	timestamp = now()
+	buffer.append((
+		get_activity_event_name(event_type, reference_name), frappe.session.user, frappe.session.user, timestamp, timestamp,
+		event_type, get_canonical_user(user), session, event_time or timestamp, reference_doctype, reference_name,
+		(summary or "")[:140] or None
+	))
+
+
+def get_activity_event_name(event_type, reference_name=None):
+	"""Name derived from the source document for once-per-document events, random otherwise"""
+	if event_type in KEYED_EVENT_TYPES and reference_name:
+		return hashlib.sha1(f"{event_type}:{reference_name}".encode()).hexdigest()
+	return frappe.generate_hash(length=10)
+
+
+def flush_activity_events():
+	"""Write the queued events with a single bulk insert, skipping ones already logged"""
+	buffer = getattr(frappe.local, "surgical_training_activity_events", None)
+	frappe.local.surgical_training_activity_events = None
+	if buffer:
+		frappe.db.bulk_insert("Activity Event", EVENT_FIELDS, buffer, ignore_duplicates=True)
+
+
+def discard_activity_events():
+	"""Drop the events of a rolled-back transaction"""
+	frappe.local.surgical_training_activity_events = None
+
+
+# Document hooks
+
+
+def on_comment_insert(doc, method=None):
+	record_activity_event(
+		"comment", doc.user, doc.session, doc.doctype, doc.name,
+		f"Commented on {doc.video_title}", doc.creation
+	)
+
+
+def on_comment_trash(doc, method=None):
+	record_activity_event(
+		"comment_deleted", doc.user, doc.session, doc.doctype, doc.name,
+		f"Deleted a comment on {doc.video_title}"
+	)
+
+
+def on_assignment_insert(doc, method=None):
+	record_activity_event(
+		"assignment", doc.assigned_user, doc.session, doc.doctype, doc.name,
+		f"Assigned by {doc.assigned_by}", doc.assignment_date or doc.creation
+	)
+
+
+def on_assignment_update(doc, method=None):
+	if not doc.flags.in_insert and doc.has_value_changed("doctor_status"):
+		record_activity_event(
+			"status_change", doc.assigned_user, doc.session, doc.doctype, doc.name,
+			f"Status: {doc.doctor_status}"
+		)
+
+
+def on_evaluation_insert(doc, method=None):
+	record_activity_event("evaluation", doc.doctor, doc.session, doc.doctype, doc.name, "Submitted evaluation", doc.creation)
+
+
+def on_login(login_manager):
+	record_activity_event("login", login_manager.user, summary="Logged in")
@@ -0,0 +1,157 @@
+import hashlib
+import json
+
+import frappe
+from frappe.utils import get_datetime
+
+# Assignment reads for the doctor dashboard: each helper is one query, so a
+# page costs the same number of round trips however many sessions it shows.
+ASSIGNMENT_ORDER_FIELDS = ("assignment_date", "completed_at")
+
+# Admin listing: keyset pages over the joined rows. Every nullable sort
+# column is wrapped in IFNULL/COALESCE so a NULL never falls out of the
+# (value, name) cursor.
+ADMIN_SORT_FIELDS = {
+	"creation": "sa.creation",
+	"assignment_date": "COALESCE(sa.assignment_date, sa.creation)",
+	"doctor_status": "IFNULL(sa.doctor_status, '')",
+	"assigned_user": "IFNULL(sa.assigned_user, '')",
+	"full_name": "IFNULL(u.full_name, '')",
+	"session_title": "IFNULL(s.title, '')",
+}
+ADMIN_PAGE_SIZE = 50
+MAX_ADMIN_PAGE_SIZE = 200
+
+# Totals per filter set are cached under a version that any assignment
+# write replaces, so a stale count never outlives the next change.
+COUNT_KEY = "surgical_training:assignment_count:{0}:{1}"
+COUNT_VERSION_KEY = "surgical_training:assignment_count_version"
+COUNT_TTL = 300
+
+
+def get_assignments_with_sessions(user, doctor_status=None, order_by="assignment_date"):
+	"""A user's assignments joined with their Session columns and video count, newest first"""
+	if order_by not in ASSIGNMENT_ORDER_FIELDS:
+		order_by = "assignment_date"
+
+	values = {"user": user}
+	conditions = ["sa.assigned_user = %(user)s"]
+	if doctor_status:
+		conditions.append("sa.doctor_status = %(doctor_status)s")
+		values["doctor_status"] = doctor_status
+
+	return frappe.db.sql(f"""
+		SELECT sa.name, sa.session, sa.doctor_status, sa.started_at, sa.completed_at,
+			sa.progress_notes, sa.total_comments, sa.assignment_date,
+			s.title AS session_title, s.description AS session_description,
+			s.session_date, s.status AS session_status,
+			(
+				SELECT COUNT(*)
+				FROM `tabSession Video` sv
+				WHERE sv.parent = sa.session AND sv.parenttype = 'Session'
+			) AS video_count
+		FROM `tabSession Assignment` sa
+		INNER JOIN `tabSession` s ON s.name = sa.session
+		WHERE {" AND ".join(conditions)}
+		ORDER BY sa.{order_by} DESC
+	""", values, as_dict=True)
+
+
+def get_user_comments_by_session(user, sessions):
+	"""{session: [comments]} of a user's comments on the given sessions, oldest first"""
+	comments_by_session = {session: [] for session in sessions}
+	if not sessions:
+		return comments_by_session
+
+	for comment in frappe.get_all(
+		"Video Comment",
+		filters={"session": ["in", list(sessions)], "user": user},
+		fields=["name", "session", "video_title", "timestamp", "comment_text", "comment_type", "created_at"],
+		order_by="created_at asc"
+	):
+		comments_by_session[comment.pop("session")].append(comment)
+
+	return comments_by_session
+
+
+def get_assignment_page(filters=None, sort_by="creation", sort_order="desc", cursor=None, limit=ADMIN_PAGE_SIZE):
+	"""
+	One page of assignments joined with the user's full name and session title.
+	cursor is the [sort value, name] of the last row of the previous page.
+	"""
+	sort_expr = ADMIN_SORT_FIELDS.get(sort_by) or ADMIN_SORT_FIELDS["creation"]
+	direction = "ASC" if str(sort_order).lower() == "asc" else "DESC"
+	comparison = ">" if direction == "ASC" else "<"
+
+	conditions, values = _admin_conditions(filters)
+	if cursor:
+		values["cursor_value"], values["cursor_name"] = cursor
+		conditions.append(f"""(
+			{sort_expr} {comparison} %(cursor_value)s
+			OR ({sort_expr} = %(cursor_value)s AND sa.name {comparison} %(cursor_name)s)
+		)""")
+	values["limit"] = limit
+
+	return frappe.db.sql(f"""
+		SELECT sa.name, sa.session, sa.assigned_user, sa.assigned_by, sa.assignment_date,
+			sa.doctor_status, sa.total_comments, sa.creation, sa.modified,
+			u.full_name, s.title AS session_title,
+			{sort_expr} AS sort_value
+		FROM `tabSession Assignment` sa
+		LEFT JOIN `tabUser` u ON u.name = sa.assigned_user
+		LEFT JOIN `tabSession` s ON s.name = sa.session
+		{("WHERE " + " AND ".join(conditions)) if conditions else ""}
+		ORDER BY {sort_expr} {direction}, sa.name {direction}
+		LIMIT %(limit)s
+	""", values, as_dict=True)
+
+
+def get_assignment_totals(filters=None):
+	"""{"total", "users"} for the filter set, cached until the next assignment write"""
+	version = frappe.cache.get_value(COUNT_VERSION_KEY) or "0"
+	digest = hashlib.sha256(json.dumps(filters or {}, sort_keys=True, default=str).encode()).hexdigest()
+	key = COUNT_KEY.format(version, digest)
+
+	totals = frappe.cache.get_value(key)
+	if totals is None:
+		conditions, values = _admin_conditions(filters)
+		total, users = frappe.db.sql(f"""
+			SELECT COUNT(*), COUNT(DISTINCT sa.assigned_user)
+			FROM `tabSession Assignment` sa
+			{("WHERE " + " AND ".join(conditions)) if conditions else ""}
+		""", values)[0]
+		totals = {"total": total, "users": users}
+		frappe.cache.set_value(key, totals, expires_in_sec=COUNT_TTL)
+	return totals
+
+
+def invalidate_assignment_totals():
+	"""Retire every cached total once the current transaction commits; old entries expire on their TTL"""
+	frappe.db.after_commit.add(_bump_count_version)
+
+
+def _bump_count_version():
+	# After commit, so a count taken mid-transaction is never cached under the new version
+	frappe.cache.set_value(COUNT_VERSION_KEY, frappe.generate_hash(length=10))
+
+
+def on_assignment_change(doc, method=None):
+	invalidate_assignment_totals()
+
+
+def _admin_conditions(filters):
+	filters = filters or {}
+	conditions, values = [], {}
+
+	for key, column in (("session", "sa.session"), ("user", "sa.assigned_user"), ("status", "sa.doctor_status")):
+		if filters.get(key):
+			conditions.append(f"{column} = %({key})s")
+			values[key] = filters[key]
+	if filters.get("from_date"):
+		conditions.append("sa.assignment_date >= %(from_date)s")
+		values["from_date"] = get_datetime(filters["from_date"])
+	if filters.get("to_date"):
+		conditions.append("sa.assignment_date < DATE_ADD(DATE(%(to_date)s), INTERVAL 1 DAY)")
+		values["to_date"] = get_datetime(filters["to_date"])
+
+	return conditions, values
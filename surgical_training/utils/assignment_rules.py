@@ -0,0 +1,132 @@
+import frappe
+
+from surgical_training.utils.assignments import assign_pairs, retry_assignment_job
+
+# Session Assignment Rules map a role to a set of sessions. A rule edit or a
+# role grant enqueues only the slice that changed (the new sessions, or the
+# one user), and a single anti-join finds the pairs still missing in it.
+
+
+def get_rule_delta(rules=None, users=None, sessions=None, limit=None):
+	"""
+	Missing (session, user) pairs implied by enabled rules.
+	Each of rules, users and sessions narrows the scan when given.
+	"""
+	scope, values = _rule_delta_scope(rules, users, sessions)
+	if scope is None:
+		return []
+
+	if limit:
+		values["limit"] = limit
+	return frappe.db.sql(f"""
+		SELECT DISTINCT rs.session, hr.parent
+		{scope}
+		ORDER BY rs.session, hr.parent
+		{"LIMIT %(limit)s" if limit else ""}
+	""", values)
+
+
+def count_rule_delta(rules=None, users=None, sessions=None):
+	"""Number of pairs get_rule_delta would return, counted in SQL"""
+	scope, values = _rule_delta_scope(rules, users, sessions)
+	if scope is None:
+		return 0
+
+	return frappe.db.sql(f"""
+		SELECT COUNT(DISTINCT rs.session, hr.parent)
+		{scope}
+	""", values)[0][0]
+
+
+def _rule_delta_scope(rules, users, sessions):
+	"""FROM/WHERE of the delta anti-join and its values; None when a filter is empty"""
+	conditions = ["r.enabled = 1", "sa.name IS NULL"]
+	values = {}
+	for key, column, items in (("rules", "r.name", rules), ("users", "hr.parent", users), ("sessions", "rs.session", sessions)):
+		if items is None:
+			continue
+		if not items:
+			return None, values
+		conditions.append(f"{column} IN %({key})s")
+		values[key] = tuple(items)
+
+	return f"""
+		FROM `tabSession Assignment Rule` r
+		INNER JOIN `tabSession Assignment Rule Session` rs
+			ON rs.parent = r.name AND rs.parenttype = 'Session Assignment Rule'
+		INNER JOIN `tabHas Role` hr ON hr.role = r.role AND hr.parenttype = 'User'
+		INNER JOIN `tabUser` u ON u.name = hr.parent AND u.enabled = 1
+		LEFT JOIN `tabSession Assignment` sa
+			ON sa.session = rs.session AND sa.assigned_user = hr.parent
+		WHERE {" AND ".join(conditions)}
+	""", values
+
+
+def enqueue_rule_delta(rules=None, users=None, sessions=None):
+	"""Queue apply_rule_delta on the long queue once the triggering change commits"""
+	return frappe.enqueue(
+		"surgical_training.utils.assignment_rules.apply_rule_delta",
+		queue="long",
+		enqueue_after_commit=True,
+		rules=rules,
+		users=users,
+		sessions=sessions
+	)
+
+
+def apply_rule_delta(rules=None, users=None, sessions=None, attempt=1):
+	"""
+	Background job: assign the pending delta, notifying users for the rules that ask for it.
+	A failed run is re-queued; the delta is recomputed, so it resumes after the last committed chunk.
+	"""
+	try:
+		return _apply_rule_delta(rules, users, sessions)
+	except Exception:
+		frappe.db.rollback()
+		if not retry_assignment_job(
+			"surgical_training.utils.assignment_rules.apply_rule_delta", attempt,
+			rules=rules, users=users, sessions=sessions
+		):
+			raise
+
+
+def _apply_rule_delta(rules, users, sessions):
+	rule_flags = dict(frappe.get_all(
+		"Session Assignment Rule",
+		filters={"enabled": 1, **({"name": ["in", rules]} if rules is not None else {})},
+		fields=["name", "notify"],
+		as_list=True
+	))
+
+	assigned = []
+	# Notifying rules go first so a pair shared with a silent rule still notifies
+	for notify in (1, 0):
+		scope = [rule for rule, flag in rule_flags.items() if flag == notify]
+		if scope:
+			assigned += assign_pairs(
+				get_rule_delta(scope, users, sessions),
+				notify=bool(notify),
+				progress_title="Applying assignment rules"
+			)
+	return assigned
+
+
+def on_user_update(doc, method=None):
+	"""Apply the rules of roles a user just gained, or of all their roles if just enabled"""
+	if not doc.enabled:
+		return
+
+	before = doc.get_doc_before_save()
+	roles = {row.role for row in doc.get("roles")}
+	if before and before.enabled:
+		roles -= {row.role for row in before.get("roles")}
+	if not roles:
+		return
+
+	rules = frappe.get_all(
+		"Session Assignment Rule",
+		filters={"enabled": 1, "role": ["in", list(roles)]},
+		pluck="name"
+	)
+	if rules:
+		enqueue_rule_delta(rules=rules, users=[doc.name])
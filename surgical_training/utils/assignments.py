@@ -0,0 +1,193 @@
+import frappe
+from frappe.utils import now
+
+from surgical_training.utils.activity_events import record_activity_event
+from surgical_training.utils.assignment_queries import invalidate_assignment_totals
+from surgical_training.utils.notifications import enqueue_notifications
+from surgical_training.utils.user_stats import invalidate_user_stats
+
+# Assigning many sessions to many users: the missing (session, user) pairs
+# come from one anti-join and are bulk-inserted in chunks. The unique
+# (session, assigned_user) index makes a concurrent duplicate a no-op.
+#
+# Each chunk commits together with its Activity Events and its assignees'
+# notification jobs, so a failure part-way leaves whole chunks behind. The
+# background jobs are resumable: a failed run is re-queued, recomputes the
+# missing pairs and carries on after the last committed chunk.
+ASSIGNMENT_CHUNK_SIZE = 1000
+# Matrices larger than this run as a background job
+BACKGROUND_ASSIGN_THRESHOLD = 500
+# Runs of a background assignment job before a failure is final
+MAX_JOB_ATTEMPTS = 3
+ASSIGNMENT_FIELDS = [
+	"name", "owner", "modified_by", "creation", "modified", "docstatus", "idx",
+	"session", "assigned_user", "assigned_by", "assignment_date", "doctor_status", "total_comments"
+]
+
+
+def get_missing_assignment_pairs(sessions, users):
+	"""(session, user) pairs among existing sessions and users that have no assignment yet"""
+	if not sessions or not users:
+		return []
+
+	return frappe.db.sql("""
+		SELECT s.name, u.name
+		FROM `tabSession` s
+		CROSS JOIN `tabUser` u
+		LEFT JOIN `tabSession Assignment` sa
+			ON sa.session = s.name AND sa.assigned_user = u.name
+		WHERE s.name IN %(sessions)s AND u.name IN %(users)s AND sa.name IS NULL
+		ORDER BY s.name, u.name
+	""", {"sessions": tuple(sessions), "users": tuple(users)})
+
+
+def bulk_assign(sessions, users, assigned_by=None, notify=False, progress_title=None):
+	"""
+	Assign every session to every user, skipping existing pairs.
+	Returns the (session, user) pairs that were assigned.
+	"""
+	pairs = get_missing_assignment_pairs(sessions, users)
+	return assign_pairs(pairs, assigned_by, notify, progress_title)
+
+
+def assign_pairs(pairs, assigned_by=None, notify=False, progress_title=None):
+	"""
+	Insert assignments for (session, user) pairs known to be missing.
+	Commits per chunk, notifying that chunk's assignees with it, and, given
+	progress_title, reports progress to the caller.
+	"""
+	assigned_by = assigned_by or frappe.session.user
+	pairs = [tuple(pair) for pair in pairs]
+	comment_counts = _get_comment_counts(
+		{session for session, _ in pairs}, {user for _, user in pairs}
+	) if pairs else {}
+	assigned = []
+
+	for done, chunk in enumerate(_chunks(pairs), start=1):
+		inserted = insert_assignments(chunk, assigned_by, comment_counts)
+		if notify and inserted:
+			_notify_assignees(inserted)
+		frappe.db.commit()
+		assigned.extend(inserted)
+
+		if progress_title:
+			processed = min(done * ASSIGNMENT_CHUNK_SIZE, len(pairs))
+			frappe.publish_progress(
+				processed * 100 / len(pairs),
+				title=progress_title,
+				description=f"Assigned {processed} of {len(pairs)}"
+			)
+
+	return assigned
+
+
+def enqueue_bulk_assign(sessions, users, notify=False):
+	"""Queue run_bulk_assign on the long queue; progress is published to the enqueuing user"""
+	return frappe.enqueue(
+		"surgical_training.utils.assignments.run_bulk_assign",
+		queue="long",
+		enqueue_after_commit=True,
+		sessions=sessions,
+		users=users,
+		assigned_by=frappe.session.user,
+		notify=notify
+	)
+
+
+def run_bulk_assign(sessions, users, assigned_by=None, notify=False, attempt=1):
+	"""Background job: bulk_assign, re-queued on failure to resume after the last committed chunk"""
+	try:
+		return bulk_assign(sessions, users, assigned_by, notify, progress_title="Assigning sessions")
+	except Exception:
+		frappe.db.rollback()
+		if not retry_assignment_job(
+			"surgical_training.utils.assignments.run_bulk_assign", attempt,
+			sessions=sessions, users=users, assigned_by=assigned_by, notify=notify
+		):
+			raise
+
+
+def retry_assignment_job(method, attempt, **kwargs):
+	"""
+	Re-queue a failed assignment job unless it has run MAX_JOB_ATTEMPTS times.
+	The job recomputes its missing pairs, so the retry skips committed chunks.
+	"""
+	if attempt >= MAX_JOB_ATTEMPTS:
+		return False
+
+	frappe.log_error(f"Assignment job {method} failed on attempt {attempt}, retrying")
+	frappe.enqueue(method, queue="long", attempt=attempt + 1, **kwargs)
+	return True
+
+
+def insert_assignments(pairs, assigned_by, comment_counts=None):
+	"""
+	Bulk-insert assignments with the side effects of SessionAssignment insert hooks.
+	Pairs a concurrent writer already assigned are skipped; returns the pairs inserted.
+	"""
+	timestamp = now()
+	comment_counts = comment_counts or {}
+	names = {frappe.generate_hash(length=10): (session, user) for session, user in pairs}
+
+	frappe.db.bulk_insert("Session Assignment", ASSIGNMENT_FIELDS, [
+		(
+			name, assigned_by, assigned_by, timestamp, timestamp, 0, 0,
+			session, user, assigned_by, timestamp, "Not Started", comment_counts.get((session, user), 0)
+		)
+		for name, (session, user) in names.items()
+	], ignore_duplicates=True)
+
+	# INSERT IGNORE drops rows that hit the unique index; only our surviving names were inserted
+	inserted = frappe.db.sql_list("""
+		SELECT name FROM `tabSession Assignment` WHERE name IN %s
+	""", (tuple(names),)) if names else []
+
+	for name in inserted:
+		session, user = names[name]
+		record_activity_event("assignment", user, session, "Session Assignment", name, f"Assigned by {assigned_by}", timestamp)
+	if inserted:
+		invalidate_user_stats(*{names[name][1] for name in inserted})
+		invalidate_assignment_totals()
+
+	return [names[name] for name in inserted]
+
+
+def _get_comment_counts(sessions, users):
+	"""{(session, user): comments} for the matrix, in one grouped query"""
+	return {
+		(session, user): count
+		for session, user, count in frappe.db.sql("""
+			SELECT session, user, COUNT(*)
+			FROM `tabVideo Comment`
+			WHERE session IN %(sessions)s AND user IN %(users)s
+			GROUP BY session, user
+		""", {"sessions": tuple(sessions), "users": tuple(users)})
+	}
+
+
+def _notify_assignees(pairs):
+	"""Queue one notification fan-out per session for its new assignees"""
+	users_by_session = {}
+	for session, user in pairs:
+		users_by_session.setdefault(session, []).append(user)
+
+	titles = dict(frappe.get_all(
+		"Session", filters={"name": ["in", list(users_by_session)]}, fields=["name", "title"], as_list=True
+	))
+	for session, users in users_by_session.items():
+		enqueue_notifications({
+			"title": "New Session Assigned",
+			"message": f"You have been assigned to the training session: {titles.get(session) or session}",
+			"notification_type": "session",
+			"related_doctype": "Session",
+			"related_doc": session,
+			"action_url": f"/surgical_training/session/{session}",
+			"icon": "calendar",
+			"priority": "medium"
+		}, users=users)
+
+
+def _chunks(pairs, size=None):
+	size = size or ASSIGNMENT_CHUNK_SIZE
+	for i in range(0, len(pairs), size):
+		yield pairs[i:i + size]
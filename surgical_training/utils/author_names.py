@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+
+import frappe
+
+# Display names rarely change, so keep a small per-site LRU in each worker.
+# Entries expire after CACHE_TTL seconds; User/Doctor updates bump a shared
+# generation in Redis so every worker drops its copy on the next lookup.
+CACHE_SIZE = 2048
+CACHE_TTL = 300
+GENERATION_KEY = "surgical_training:author_names_generation"
+
+_lock = threading.Lock()
+_site_caches = {}
+
+
+def get_author_names(doctors):
+	"""Return {doctor value: display name} for every distinct author in a result set"""
+	cache = _get_site_cache()
+	now = time.monotonic()
+	names = {}
+	missing = []
+
+	with _lock:
+		for doctor in set(filter(None, doctors)):
+			entry = cache["entries"].get(doctor)
+			if entry and entry[0] > now:
+				cache["entries"].move_to_end(doctor)
+				names[doctor] = entry[1]
+			else:
+				missing.append(doctor)
+
+	if missing:
+		resolved = _resolve_author_names(missing)
+		names.update(resolved)
+
+		with _lock:
+			for doctor, name in resolved.items():
+				cache["entries"][doctor] = (now + CACHE_TTL, name)
+				cache["entries"].move_to_end(doctor)
+			while len(cache["entries"]) > CACHE_SIZE:
+				cache["entries"].popitem(last=False)
+
+	return names
+
+
+def get_author_name(doctor):
+	"""Display name for a single comment author"""
+	return get_author_names([doctor]).get(doctor, doctor)
+
+
+def clear_author_names_cache(doc=None, method=None):
+	"""Invalidate cached display names; used as a User/Doctor document hook"""
+	frappe.cache.set_value(GENERATION_KEY, frappe.generate_hash(length=10))
+	with _lock:
+		_site_caches.pop(frappe.local.site, None)
+
+
+def _get_site_cache():
+	"""Per-site cache, reset when another worker has bumped the generation"""
+	generation = frappe.cache.get_value(GENERATION_KEY)
+	site = frappe.local.site
+
+	with _lock:
+		cache = _site_caches.get(site)
+		if not cache or cache["generation"] != generation:
+			cache = {"generation": generation, "entries": OrderedDict()}
+			_site_caches[site] = cache
+		return cache
+
+
+def _resolve_author_names(doctors):
+	"""Resolve display names with one Doctor and one User query for the whole batch"""
+	names = {}
+	plain = []
+
+	for doctor in doctors:
+		if doctor.startswith("admin-"):
+			# Admin fallback comment
+			email = doctor[len("admin-"):]
+			if email == "administrator@gmail.com":
+				names[doctor] = "Administrator"
+			else:
+				names[doctor] = f"Administrator ({email})"
+		elif doctor.startswith("doctor-"):
+			# Doctor fallback comment
+			email_name = doctor[len("doctor-"):].split("@")[0]
+			names[doctor] = email_name.replace("doctor", "Dr. ").title()
+		else:
+			plain.append(doctor)
+
+	if plain:
+		names.update(frappe.get_all(
+			"Doctor",
+			filters={"name": ["in", plain]},
+			fields=["name", "doctor_name"],
+			as_list=True
+		))
+
+		users = [doctor for doctor in plain if doctor not in names]
+		if users:
+			for user, full_name in frappe.get_all(
+				"User",
+				filters={"name": ["in", users]},
+				fields=["name", "full_name"],
+				as_list=True
+			):
+				names[user] = full_name or user.split("@")[0].replace(".", " ").title()
+
+		for doctor in plain:
+			names.setdefault(doctor, doctor)
+
+	return names
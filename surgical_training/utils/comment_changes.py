@@ -0,0 +1,82 @@
+import frappe
+
+# Sync cursor for get_comment_changes. Each transaction that writes comments
+# takes the next number of a tabSeries counter just before it commits and
+# stamps it on the comments and tombstones it touched. The counter row stays
+# locked until the commit, so numbers become visible in commit order and a
+# client past number N can never miss a change committed later.
+CHANGE_SERIES = "video_comment_change"
+# Highest number whose tombstones were purged; older cursors must reload
+PURGED_SERIES = "video_comment_change_purged"
+
+
+def mark_comment_changes(names, action):
+	"""Queue comment names inserted, updated or deleted (action) for stamping at commit"""
+	if not names:
+		return
+
+	changes = getattr(frappe.local, "surgical_training_comment_changes", None)
+	if changes is None:
+		changes = frappe.local.surgical_training_comment_changes = {"insert": set(), "update": set(), "delete": set()}
+		frappe.db.before_commit.add(stamp_comment_changes)
+		frappe.db.after_rollback.add(discard_comment_changes)
+
+	changes[action].update(names)
+
+
+def stamp_comment_changes():
+	"""Take the next change number and stamp it on this transaction's changes"""
+	changes = getattr(frappe.local, "surgical_training_comment_changes", None)
+	frappe.local.surgical_training_comment_changes = None
+	if not changes:
+		return
+
+	seq = _next_change_seq()
+	if changes["insert"]:
+		frappe.db.sql("""
+			UPDATE `tabVideo Comment` SET change_seq = %(seq)s, created_seq = %(seq)s
+			WHERE name IN %(names)s
+		""", {"seq": seq, "names": tuple(changes["insert"])})
+	updated = changes["update"] - changes["insert"]
+	if updated:
+		frappe.db.sql("""
+			UPDATE `tabVideo Comment` SET change_seq = %(seq)s
+			WHERE name IN %(names)s
+		""", {"seq": seq, "names": tuple(updated)})
+	if changes["delete"]:
+		frappe.db.sql("""
+			UPDATE `tabVideo Comment Tombstone` SET change_seq = %(seq)s
+			WHERE comment IN %(names)s AND IFNULL(change_seq, 0) = 0
+		""", {"seq": seq, "names": tuple(changes["delete"])})
+
+
+def discard_comment_changes():
+	frappe.local.surgical_training_comment_changes = None
+
+
+def get_change_cursor():
+	"""Latest committed change number, as seen by this transaction's snapshot"""
+	return _get_series(CHANGE_SERIES)
+
+
+def get_purged_cursor():
+	return _get_series(PURGED_SERIES)
+
+
+def set_purged_cursor(seq):
+	"""Record that tombstones up to seq were purged"""
+	frappe.db.sql("""
+		INSERT INTO `tabSeries` (name, current) VALUES (%(name)s, %(seq)s)
+		ON DUPLICATE KEY UPDATE current = GREATEST(current, %(seq)s)
+	""", {"name": PURGED_SERIES, "seq": seq})
+
+
+def _next_change_seq():
+	frappe.db.sql("INSERT IGNORE INTO `tabSeries` (name, current) VALUES (%s, 0)", CHANGE_SERIES)
+	frappe.db.sql("UPDATE `tabSeries` SET current = current + 1 WHERE name = %s", CHANGE_SERIES)
+	return _get_series(CHANGE_SERIES)
+
+
+def _get_series(name):
+	row = frappe.db.sql("SELECT current FROM `tabSeries` WHERE name = %s", name)
+	return row[0][0] if row else 0
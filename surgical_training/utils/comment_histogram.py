@@ -0,0 +1,89 @@
+import math
+
+import frappe
+
+from surgical_training.utils.comment_index import ROW_FIELDS, get_comment_index
+
+# Binned comment counts per video, cached per (bin width, scope) in one Redis
+# hash per video so a Video Comment change can drop them all at once, again
+# once it commits. Bin widths are snapped to a fixed set and the hash expires,
+# so callers cannot grow the cache without bound.
+HISTOGRAM_KEY = "surgical_training:comment_histogram:{0}"
+HISTOGRAM_TTL = 6 * 60 * 60
+
+COMMENT_TYPES = ("neutral", "positive", "warning", "critical")
+BIN_WIDTHS = (1, 2, 5, 10, 15, 30, 60, 120, 300, 600)
+MAX_BINS = 2000
+
+TIMESTAMP = ROW_FIELDS.index("timestamp")
+DURATION = ROW_FIELDS.index("duration")
+COMMENT_TYPE = ROW_FIELDS.index("comment_type")
+USER = ROW_FIELDS.index("user")
+
+
+def normalize_bin_width(bin_width):
+	"""Smallest supported bin width not below the requested one"""
+	return next((width for width in BIN_WIDTHS if width >= bin_width), BIN_WIDTHS[-1])
+
+
+def get_comment_histogram(session_video, video_duration, bin_width, user=None):
+	"""Cached histogram for one video; pass user to count only that user's comments"""
+	bin_width = normalize_bin_width(bin_width)
+	key = HISTOGRAM_KEY.format(session_video)
+	field = f"{bin_width}:{user or 'all'}"
+
+	histogram = frappe.cache.hget(key, field)
+	if histogram is None:
+		histogram = build_comment_histogram(session_video, video_duration, bin_width, user)
+		frappe.cache.hset(key, field, histogram)
+		frappe.cache.expire(frappe.cache.make_key(key), HISTOGRAM_TTL)
+	return histogram
+
+
+def build_comment_histogram(session_video, video_duration, bin_width, user=None):
+	"""
+	Count the comments of one video per bin and comment_type.
+	A comment counts in every bin its [timestamp, timestamp + duration] span touches.
+	"""
+	rows = get_comment_index(session_video)["rows"]
+	if user:
+		rows = [row for row in rows if row[USER] == user]
+
+	length = max([video_duration or 0] + [row[TIMESTAMP] + (row[DURATION] or 0) for row in rows])
+	bin_width = max(bin_width, math.ceil(length / MAX_BINS), 1)
+	bin_count = max(math.ceil(length / bin_width), 1)
+
+	# Difference arrays: +1 where a span starts, -1 after the bin where it ends
+	deltas = {comment_type: [0] * (bin_count + 1) for comment_type in COMMENT_TYPES}
+	for row in rows:
+		start = row[TIMESTAMP]
+		end = start + (row[DURATION] or 0)
+		first_bin = min(int(start // bin_width), bin_count - 1)
+		last_bin = min(max(first_bin, math.ceil(end / bin_width) - 1), bin_count - 1)
+
+		comment_deltas = deltas.get(row[COMMENT_TYPE]) or deltas["neutral"]
+		comment_deltas[first_bin] += 1
+		comment_deltas[last_bin + 1] -= 1
+
+	counts = {}
+	for comment_type, comment_deltas in deltas.items():
+		running = 0
+		counts[comment_type] = []
+		for delta in comment_deltas[:bin_count]:
+			running += delta
+			counts[comment_type].append(running)
+
+	return {
+		"bin_width": bin_width,
+		"bin_count": bin_count,
+		"total_comments": len(rows),
+		"counts": counts
+	}
+
+
+def invalidate_comment_histograms(session_video):
+	"""Drop every cached histogram of a video now and again after commit"""
+	if session_video:
+		key = HISTOGRAM_KEY.format(session_video)
+		frappe.cache.delete_value(key)
+		frappe.db.after_commit.add(lambda: frappe.cache.delete_value(key))
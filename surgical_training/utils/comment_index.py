@@ -0,0 +1,86 @@
+from bisect import bisect_left, bisect_right
+
+import frappe
+
+from surgical_training.utils.session_videos import find_session_video
+
+# One cached entry per Session Video row, holding its comments sorted by
+# timestamp. Entries are dropped from Video Comment hooks, again once the
+# write commits, and rebuilt on the next read, so a burst of edits costs a
+# single rebuild. The TTL bounds how long an entry built from uncommitted
+# rows can survive.
+INDEX_KEY = "surgical_training:comment_index:{0}"
+INDEX_TTL = 6 * 60 * 60
+
+ROW_FIELDS = ("name", "user", "doctor", "timestamp", "duration", "comment_type", "comment_text", "modified")
+
+
+def get_comment_index(session_video):
+	"""Sorted comment index for one video, built from the database on a cache miss"""
+	key = INDEX_KEY.format(session_video)
+	index = frappe.cache.get_value(key)
+	if index is None:
+		index = build_comment_index(session_video)
+		frappe.cache.set_value(key, index, expires_in_sec=INDEX_TTL)
+	return index
+
+
+def build_comment_index(session_video):
+	"""Load the comments of one video as parallel, timestamp-sorted arrays"""
+	rows = frappe.get_all(
+		"Video Comment",
+		filters={"session_video": session_video},
+		fields=list(ROW_FIELDS),
+		order_by="timestamp asc, name asc",
+		as_list=True
+	)
+
+	return {
+		"starts": [row[3] for row in rows],
+		"rows": rows,
+		# Bounds how far before a window a still-running comment can start
+		"max_duration": max((row[4] or 0 for row in rows), default=0)
+	}
+
+
+def invalidate_comment_index(session_video):
+	"""Drop the cached index of a video now and again after commit, so the next read rebuilds it"""
+	if session_video:
+		key = INDEX_KEY.format(session_video)
+		frappe.cache.delete_value(key)
+		frappe.db.after_commit.add(lambda: frappe.cache.delete_value(key))
+
+
+def resolve_session_video(session, video):
+	"""Session Video row name for a row name or video title within a session"""
+	session_video = find_session_video(session, video)
+	return session_video.name if session_video else None
+
+
+def get_comments_in_window(session_video, start, end, user=None, after=None):
+	"""
+	Comments whose [timestamp, timestamp + duration] overlaps [start, end].
+	Pass user to restrict the result to that user's own comments, and after,
+	a (timestamp, name) pair, to continue past the last comment of a page.
+	"""
+	index = get_comment_index(session_video)
+	starts = index["starts"]
+
+	# Only comments starting in [start - max_duration, end] can overlap the window
+	lo = bisect_left(starts, start - index["max_duration"])
+	hi = bisect_right(starts, end)
+	if after:
+		lo = max(lo, bisect_left(starts, after[0]))
+
+	comments = []
+	for row in index["rows"][lo:hi]:
+		comment = frappe._dict(zip(ROW_FIELDS, row, strict=True))
+		if after and (comment.timestamp, comment.name) <= tuple(after):
+			continue
+		if comment.timestamp + (comment.duration or 0) < start:
+			continue
+		if user and comment.user != user:
+			continue
+		comments.append(comment)
+
+	return comments
@@ -0,0 +1,73 @@
+import hashlib
+import json
+
+import frappe
+from frappe.utils import add_to_date, now, now_datetime
+
+# Clients retry writes over flaky networks with the same key; a replay within
+# the TTL gets the stored response back instead of creating a duplicate row.
+IDEMPOTENCY_TTL_HOURS = 24
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def get_idempotency_key(idempotency_key=None):
+	"""Key from the endpoint argument, falling back to the Idempotency-Key header"""
+	key = idempotency_key
+	if not key and getattr(frappe.local, "request", None):
+		key = frappe.get_request_header(IDEMPOTENCY_HEADER)
+	return (key or "").strip()[:140] or None
+
+
+def get_replayed_response(endpoint, idempotency_key):
+	"""Stored response of an earlier write with this key, or None"""
+	if not idempotency_key:
+		return None
+
+	row = frappe.db.get_value(
+		"Idempotency Key",
+		_key_name(endpoint, idempotency_key),
+		["response", "expires_at"],
+		as_dict=True
+	)
+	if row and row.expires_at > now_datetime():
+		return json.loads(row.response)
+	return None
+
+
+def save_idempotent_response(endpoint, idempotency_key, response):
+	"""
+	Record a successful write's response in the write's own transaction.
+	Returns the response to send: when a concurrent retry committed first,
+	this write is rolled back and the first response is returned instead.
+	"""
+	if not idempotency_key or response.get("message") != "Success":
+		return response
+
+	name = _key_name(endpoint, idempotency_key)
+	timestamp = now()
+
+	# An expired key may be reused
+	frappe.db.delete("Idempotency Key", {"name": name, "expires_at": ["<", timestamp]})
+
+	try:
+		frappe.db.bulk_insert(
+			"Idempotency Key",
+			["name", "owner", "modified_by", "creation", "modified", "endpoint", "user", "idempotency_key", "response", "expires_at"],
+			[(
+				name, frappe.session.user, frappe.session.user, timestamp, timestamp,
+				endpoint, frappe.session.user, idempotency_key, json.dumps(response, default=str),
+				add_to_date(timestamp, hours=IDEMPOTENCY_TTL_HOURS)
+			)]
+		)
+	except Exception as e:
+		if not frappe.db.is_primary_key_violation(e):
+			raise
+		frappe.db.rollback()
+		return get_replayed_response(endpoint, idempotency_key) or response
+
+	return response
+
+
+def _key_name(endpoint, idempotency_key):
+	"""Keys are scoped per user and endpoint"""
+	return hashlib.sha256(f"{frappe.session.user}:{endpoint}:{idempotency_key}".encode()).hexdigest()
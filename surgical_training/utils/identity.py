@@ -0,0 +1,87 @@
+import frappe
+
+# Who the caller is does not change within a request, so it is resolved once
+# per user and kept on frappe.local, which Frappe resets for every request and
+# background job. Every reuse is counted; log_identity_stats reports the count.
+ADMIN_EMAIL = "administrator@gmail.com"
+
+
+class Identity:
+	"""Roles, admin flag and comment author key of one user"""
+
+	def __init__(self, user):
+		self.user = user
+		self.roles = frozenset(frappe.get_roles(user))
+		self.is_admin = user == ADMIN_EMAIL
+		self.is_system_manager = "System Manager" in self.roles
+		self.is_physician = "Physician" in self.roles
+		self.is_doctor_email = (user or "").lower().startswith("doctor")
+		self._doctor = None
+		self._doctor_loaded = False
+
+	@property
+	def doctor(self):
+		"""Name of the Doctor record linked to the user, loaded on first use"""
+		if not self._doctor_loaded:
+			self._doctor = frappe.db.get_value("Doctor", {"user": self.user}, "name")
+			self._doctor_loaded = True
+		else:
+			_count_reuse()
+		return self._doctor
+
+	@property
+	def doctor_key(self):
+		"""Doctor value stored on the user's comments, or None if the user cannot comment"""
+		if self.is_admin:
+			return f"admin-{self.user}"
+		if self.doctor:
+			return self.doctor
+		if self.is_physician or self.is_doctor_email:
+			return f"doctor-{self.user}"
+		return None
+
+
+def get_identity(user=None):
+	"""Identity of a user (default: the session user), computed once per request"""
+	user = user or frappe.session.user
+	identities = getattr(frappe.local, "surgical_training_identities", None)
+	if identities is None:
+		identities = frappe.local.surgical_training_identities = {}
+
+	identity = identities.get(user)
+	if identity:
+		_count_reuse()
+	else:
+		identity = identities[user] = Identity(user)
+	return identity
+
+
+def clear_identity(user=None):
+	"""Forget the identities of this request, e.g. after changing a user's roles"""
+	identities = getattr(frappe.local, "surgical_training_identities", None)
+	if identities:
+		if user:
+			identities.pop(user, None)
+		else:
+			identities.clear()
+
+
+def on_user_update(doc, method=None):
+	"""User hook: roles may have changed, so resolve the user again on next use"""
+	clear_identity(doc.name)
+
+
+def get_identity_lookups_saved():
+	"""Number of role/Doctor lookups served from the context in this request"""
+	return getattr(frappe.local, "surgical_training_identity_reuses", 0)
+
+
+def log_identity_stats(response=None, request=None):
+	"""after_request hook: log how many lookups the identity context saved"""
+	saved = get_identity_lookups_saved()
+	if saved and request:
+		frappe.logger("surgical_training.identity").debug(f"{request.path}: {saved} identity lookups reused")
+
+
+def _count_reuse():
+	frappe.local.surgical_training_identity_reuses = get_identity_lookups_saved() + 1
@@ -0,0 +1,339 @@
+import frappe
+from frappe.model.naming import parse_naming_series
+from frappe.utils import add_days, add_to_date, now, now_datetime
+
+from surgical_training.utils.realtime import publish_notification_event, publish_notifications_changed
+
+# Set-based reads and writes over one user's User Notification rows. Rows are
+# locked and collected first so callers know exactly which rows changed, then
+# written in chunks with one statement each.
+CHUNK_SIZE = 1000
+
+# Per-user total/unread counters in a Redis hash. Writes apply deltas after
+# commit, only to an existing hash, so a miss always rebuilds from SQL; the
+# hourly reconcile drops every hash to bound any drift.
+COUNTS_KEY = "surgical_training:notification_counts:{0}"
+COUNTS_TTL = 24 * 60 * 60
+
+# Fan-out jobs insert this many notifications per statement and commit
+NOTIFICATION_SERIES = "NOTIF-.YYYY.-"
+FAN_OUT_CHUNK_SIZE = 500
+NOTIFICATION_FIELDS = [
+	"name", "owner", "modified_by", "creation", "modified", "docstatus", "idx", "naming_series",
+	"user", "title", "message", "notification_type", "related_doctype", "related_doc",
+	"is_read", "created_at", "occurrence_count", "action_url", "icon", "priority"
+]
+
+# Unread notifications of these types about the same document merge into one
+# row with a counter when they arrive within the window. The window is counted
+# from the row's creation, which merges never touch, so a steady stream of
+# comments cannot keep one row open forever.
+COALESCE_TYPES = ("comment",)
+COALESCE_WINDOW_MINUTES = 30
+
+# Read notifications older than this move to User Notification Archive
+NOTIFICATION_RETENTION_DAYS = 90
+ARCHIVE_BATCH_SIZE = 5000
+
+ADJUST_COUNTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+	redis.call('HINCRBY', KEYS[1], 'total', ARGV[1])
+	redis.call('HINCRBY', KEYS[1], 'unread', ARGV[2])
+end
+"""
+
+
+def get_notification_counts(user):
+	"""{"total_count", "unread_count"} of a user, from Redis or one SQL query on a miss"""
+	key = frappe.cache.make_key(COUNTS_KEY.format(user))
+	total, unread = frappe.cache.hmget(key, ["total", "unread"])
+	if total is not None and unread is not None:
+		return {"total_count": max(int(total), 0), "unread_count": max(int(unread), 0)}
+
+	total, unread = frappe.db.sql("""
+		SELECT COUNT(*), COALESCE(SUM(is_read = 0), 0)
+		FROM `tabUser Notification`
+		WHERE user = %s
+	""", user)[0]
+
+	pipeline = frappe.cache.pipeline()
+	pipeline.hset(key, mapping={"total": int(total), "unread": int(unread)})
+	pipeline.expire(key, COUNTS_TTL)
+	pipeline.execute()
+
+	return {"total_count": int(total), "unread_count": int(unread)}
+
+
+def adjust_notification_counts(user, total=0, unread=0):
+	"""Add deltas to a user's cached counters once the current transaction commits"""
+	if user and (total or unread):
+		frappe.db.after_commit.add(
+			lambda: frappe.cache.eval(ADJUST_COUNTS_SCRIPT, 1, frappe.cache.make_key(COUNTS_KEY.format(user)), total, unread)
+		)
+
+
+def reconcile_notification_counts():
+	"""Scheduled job: drop every cached counter so the next read recounts from SQL"""
+	frappe.cache.delete_keys(COUNTS_KEY.format(""))
+
+
+def mark_notifications_read(user, notification_type=None, related_doctype=None, related_doc=None, names=None):
+	"""Mark a user's matching unread notifications read; returns their names"""
+	conditions, values = _selector(user, notification_type, related_doctype, related_doc, names)
+	conditions.append("is_read = 0")
+
+	names = frappe.db.sql_list(f"""
+		SELECT name FROM `tabUser Notification`
+		WHERE {" AND ".join(conditions)}
+		FOR UPDATE
+	""", values)
+
+	timestamp = now()
+	for chunk in _chunks(names):
+		frappe.db.sql("""
+			UPDATE `tabUser Notification`
+			SET is_read = 1, read_at = %(timestamp)s, modified = %(timestamp)s, modified_by = %(user)s
+			WHERE name IN %(names)s
+		""", {"timestamp": timestamp, "user": frappe.session.user, "names": tuple(chunk)})
+
+	if names:
+		adjust_notification_counts(user, unread=-len(names))
+		publish_notifications_changed(user, "read", names)
+	return names
+
+
+def delete_notifications(user, notification_type=None, related_doctype=None, related_doc=None, names=None, only_read=False):
+	"""Delete a user's matching notifications; returns {name: is_read} of the deleted rows"""
+	conditions, values = _selector(user, notification_type, related_doctype, related_doc, names)
+	if only_read:
+		conditions.append("is_read = 1")
+
+	deleted = dict(frappe.db.sql(f"""
+		SELECT name, is_read FROM `tabUser Notification`
+		WHERE {" AND ".join(conditions)}
+		FOR UPDATE
+	""", values))
+
+	for chunk in _chunks(list(deleted)):
+		frappe.db.delete("User Notification", {"name": ["in", chunk]})
+
+	if deleted:
+		unread = sum(1 for is_read in deleted.values() if not is_read)
+		adjust_notification_counts(user, total=-len(deleted), unread=-unread)
+		publish_notifications_changed(user, "delete", list(deleted))
+	return deleted
+
+
+def enqueue_notifications(notification, session=None, users=None, exclude_users=None):
+	"""
+	Queue a background job that sends one notification to many users.
+	notification holds the User Notification fields (title, message, notification_type, ...);
+	recipients are the users assigned to session, the given users, or both.
+	"""
+	return frappe.enqueue(
+		"surgical_training.utils.notifications.fan_out_notifications",
+		queue="long",
+		enqueue_after_commit=True,
+		notification=notification,
+		session=session,
+		users=users,
+		exclude_users=exclude_users,
+		sent_by=frappe.session.user
+	)
+
+
+def fan_out_notifications(notification, session=None, users=None, exclude_users=None, sent_by=None):
+	"""Background job: resolve the recipients with one query and bulk-insert their notifications"""
+	recipients = get_notification_recipients(session, users, exclude_users)
+	sent_by = sent_by or frappe.session.user
+
+	for chunk in _chunks(recipients, FAN_OUT_CHUNK_SIZE):
+		merged = coalesce_notifications(chunk, notification)
+		chunk = [user for user in chunk if user not in merged]
+		if not chunk:
+			frappe.db.commit()
+			continue
+
+		timestamp = now()
+		names = _reserve_notification_names(len(chunk))
+		rows = [
+			frappe._dict(
+				name=name, user=user, is_read=0, created_at=timestamp,
+				title=notification.get("title"),
+				message=notification.get("message"),
+				notification_type=notification.get("notification_type") or "info",
+				related_doctype=notification.get("related_doctype"),
+				related_doc=notification.get("related_doc"),
+				action_url=notification.get("action_url"),
+				icon=notification.get("icon"),
+				priority=notification.get("priority") or "medium"
+			)
+			for name, user in zip(names, chunk, strict=True)
+		]
+
+		frappe.db.bulk_insert("User Notification", NOTIFICATION_FIELDS, [
+			(
+				row.name, sent_by, sent_by, timestamp, timestamp, 0, 0, NOTIFICATION_SERIES,
+				row.user, row.title, row.message, row.notification_type, row.related_doctype, row.related_doc,
+				0, timestamp, 1, row.action_url, row.icon, row.priority
+			)
+			for row in rows
+		])
+
+		# The side effects of UserNotification.after_insert
+		for row in rows:
+			adjust_notification_counts(row.user, total=1, unread=1)
+			publish_notification_event(row)
+
+		frappe.db.commit()
+
+	return len(recipients)
+
+
+def coalesce_notifications(users, notification):
+	"""
+	Merge a new notification into each user's recent unread one of the same type
+	about the same document. Returns {user: merged notification name}; users
+	missing from it still need a new row.
+	"""
+	if notification.get("notification_type") not in COALESCE_TYPES or not notification.get("related_doc") or not users:
+		return {}
+
+	rows = frappe.db.sql("""
+		SELECT name, user, occurrence_count
+		FROM `tabUser Notification`
+		WHERE user IN %(users)s AND notification_type = %(notification_type)s
+			AND related_doc = %(related_doc)s AND is_read = 0 AND creation >= %(cutoff)s
+		ORDER BY creation DESC
+		FOR UPDATE
+	""", {
+		"users": tuple(users),
+		"notification_type": notification.get("notification_type"),
+		"related_doc": notification.get("related_doc"),
+		"cutoff": add_to_date(now_datetime(), minutes=-COALESCE_WINDOW_MINUTES)
+	}, as_dict=True)
+
+	# The newest match of each user absorbs the notification
+	latest = {}
+	for row in rows:
+		latest.setdefault(row.user, row)
+	if not latest:
+		return {}
+
+	timestamp = now()
+	frappe.db.sql("""
+		UPDATE `tabUser Notification`
+		SET occurrence_count = IFNULL(occurrence_count, 1) + 1, title = %(title)s, message = %(message)s,
+			created_at = %(timestamp)s, modified = %(timestamp)s
+		WHERE name IN %(names)s
+	""", {
+		"title": notification.get("title"),
+		"message": notification.get("message"),
+		"timestamp": timestamp,
+		"names": tuple(row.name for row in latest.values())
+	})
+
+	for row in latest.values():
+		publish_notification_event(frappe._dict(
+			notification, name=row.name, user=row.user, is_read=0, created_at=timestamp,
+			occurrence_count=(row.occurrence_count or 1) + 1
+		))
+
+	return {user: row.name for user, row in latest.items()}
+
+
+def archive_read_notifications():
+	"""Scheduled job: move read notifications past the retention window to the archive table"""
+	cutoff = add_days(now_datetime(), -NOTIFICATION_RETENTION_DAYS)
+
+	while True:
+		rows = frappe.db.sql("""
+			SELECT name, user
+			FROM `tabUser Notification`
+			WHERE is_read = 1 AND created_at < %s
+			ORDER BY created_at
+			LIMIT %s
+		""", (cutoff, ARCHIVE_BATCH_SIZE))
+		if not rows:
+			break
+
+		names = tuple(name for name, _ in rows)
+		frappe.db.sql("""
+			INSERT IGNORE INTO `tabUser Notification Archive`
+				(name, owner, modified_by, creation, modified, docstatus, idx, user, title,
+				 notification_type, related_doctype, related_doc, occurrence_count, created_at, read_at)
+			SELECT name, owner, modified_by, creation, NOW(6), 0, 0, user, title,
+				notification_type, related_doctype, related_doc, IFNULL(occurrence_count, 1), created_at, read_at
+			FROM `tabUser Notification`
+			WHERE name IN %s
+		""", (names,))
+		frappe.db.delete("User Notification", {"name": ["in", names]})
+
+		archived = {}
+		for _, user in rows:
+			archived[user] = archived.get(user, 0) + 1
+		for user, count in archived.items():
+			adjust_notification_counts(user, total=-count)
+
+		frappe.db.commit()
+
+
+def get_notification_recipients(session=None, users=None, exclude_users=None):
+	"""Enabled users among the session's assignees and the given users, in one query"""
+	conditions = []
+	values = {"exclude_users": tuple(exclude_users or ()) or ("",)}
+	if session:
+		conditions.append("""u.name IN (
+			SELECT assigned_user FROM `tabSession Assignment` WHERE session = %(session)s
+		)""")
+		values["session"] = session
+	if users:
+		conditions.append("u.name IN %(users)s")
+		values["users"] = tuple(users)
+	if not conditions:
+		return []
+
+	return frappe.db.sql_list(f"""
+		SELECT u.name
+		FROM `tabUser` u
+		WHERE u.enabled = 1
+			AND ({" OR ".join(conditions)})
+			AND u.name NOT IN %(exclude_users)s
+		ORDER BY u.name
+	""", values)
+
+
+def _reserve_notification_names(count):
+	"""Take count consecutive names from the User Notification series with one update"""
+	prefix = parse_naming_series(NOTIFICATION_SERIES)
+	frappe.db.sql("INSERT IGNORE INTO `tabSeries` (name, current) VALUES (%s, 0)", prefix)
+	current = frappe.db.sql("SELECT current FROM `tabSeries` WHERE name = %s FOR UPDATE", prefix)[0][0]
+	frappe.db.sql("UPDATE `tabSeries` SET current = current + %s WHERE name = %s", (count, prefix))
+	return [f"{prefix}{current + i:05d}" for i in range(1, count + 1)]
+
+
+def _selector(user, notification_type=None, related_doctype=None, related_doc=None, names=None):
+	"""WHERE conditions limiting the rows to one user and the optional filters"""
+	conditions = ["user = %(user)s"]
+	values = {"user": user}
+
+	if notification_type:
+		conditions.append("notification_type = %(notification_type)s")
+		values["notification_type"] = notification_type
+	if related_doctype:
+		conditions.append("related_doctype = %(related_doctype)s")
+		values["related_doctype"] = related_doctype
+	if related_doc:
+		conditions.append("related_doc = %(related_doc)s")
+		values["related_doc"] = related_doc
+	if names is not None:
+		# An explicit empty selection matches nothing
+		conditions.append("name IN %(names)s" if names else "1 = 0")
+		values["names"] = tuple(names) or ("",)
+
+	return conditions, values
+
+
+def _chunks(names, size=CHUNK_SIZE):
+	for i in range(0, len(names), size):
+		yield names[i:i + size]
@@ -0,0 +1,68 @@
+import frappe
+
+COMMENT_EVENT = "video_comment"
+NOTIFICATION_EVENT = "user_notification"
+NOTIFICATIONS_CHANGED_EVENT = "user_notifications_changed"
+
+
+def publish_comment_event(comment, action):
+	"""
+	Push a Video Comment insert/update/delete to the room of its Session.
+	The room is shared by everyone viewing the session, so the event only
+	names the change; clients fetch the content through get_comment_changes,
+	which applies the row-level permissions.
+	"""
+	frappe.publish_realtime(
+		COMMENT_EVENT,
+		{
+			"action": action,
+			"name": comment.name,
+			"session": comment.session,
+			"session_video": comment.session_video,
+			"video_title": comment.video_title,
+			"modified": str(comment.modified)
+		},
+		doctype="Session",
+		docname=comment.session,
+		after_commit=True
+	)
+
+
+def publish_notification_event(notification):
+	"""Push a new or coalesced User Notification to its recipient's user room"""
+	frappe.publish_realtime(
+		NOTIFICATION_EVENT,
+		{
+			"name": notification.name,
+			"title": notification.title,
+			"message": notification.message,
+			"notification_type": notification.notification_type,
+			"is_read": notification.is_read,
+			"created_at": str(notification.created_at),
+			"action_url": notification.action_url,
+			"icon": notification.icon,
+			"priority": notification.priority,
+			"occurrence_count": notification.get("occurrence_count") or 1,
+			"related_doctype": notification.related_doctype,
+			"related_doc": notification.related_doc
+		},
+		user=notification.user,
+		after_commit=True
+	)
+
+
+def publish_notifications_changed(user, action, names):
+	"""
+	Tell a user's open clients that notifications were marked read or deleted in bulk.
+	Large batches send no names; clients reload their list instead.
+	"""
+	frappe.publish_realtime(
+		NOTIFICATIONS_CHANGED_EVENT,
+		{
+			"action": action,
+			"names": names if len(names) <= 100 else None,
+			"count": len(names)
+		},
+		user=user,
+		after_commit=True
+	)
@@ -0,0 +1,53 @@
+import frappe
+
+# Each Session's video rows by row name and by title. Comment validation
+# runs on every comment write, so it reads this instead of the database;
+# Session on_update/on_trash drop the entry, again once the write commits,
+# and the TTL bounds how long an entry rebuilt from uncommitted data survives.
+VIDEO_MAP_KEY = "surgical_training:session_videos:{0}"
+VIDEO_MAP_TTL = 6 * 60 * 60
+
+
+def get_session_videos(session):
+	"""{"by_name": {row name: video}, "by_title": {title: video}} for a session, in row order"""
+	if not session:
+		return {"by_name": {}, "by_title": {}}
+
+	key = VIDEO_MAP_KEY.format(session)
+	videos = frappe.cache.get_value(key)
+	if videos is None:
+		videos = build_session_videos(session)
+		frappe.cache.set_value(key, videos, expires_in_sec=VIDEO_MAP_TTL)
+	return videos
+
+
+def build_session_videos(session):
+	"""Load a session's video rows with one query"""
+	videos = frappe.get_all(
+		"Session Video",
+		filters={"parent": session, "parenttype": "Session"},
+		fields=["name", "title", "duration"],
+		order_by="idx asc"
+	)
+	return {
+		"by_name": {video.name: video for video in videos},
+		"by_title": {video.title: video for video in reversed(videos)}
+	}
+
+
+def find_session_video(session, video):
+	"""Video row of a session given its row name or title, or None"""
+	videos = get_session_videos(session)
+	return videos["by_name"].get(video) or videos["by_title"].get(video)
+
+
+def invalidate_session_videos(session):
+	"""
+	Drop the cached video map of a session now, for reads later in this
+	transaction, and again after commit, in case a concurrent reader rebuilt
+	it from the pre-commit rows in between
+	"""
+	if session:
+		key = VIDEO_MAP_KEY.format(session)
+		frappe.cache.delete_value(key)
+		frappe.db.after_commit.add(lambda: frappe.cache.delete_value(key))
@@ -0,0 +1,120 @@
+import frappe
+from frappe.utils import add_days, get_datetime, get_first_day, now_datetime, nowdate
+
+# Every dashboard number for one user, computed with two aggregate queries
+# and cached per user. Comment, assignment and evaluation hooks drop the
+# entry; the TTL keeps the "this week"/"this month" windows current.
+STATS_KEY = "surgical_training:user_stats:{0}"
+STATS_TTL = 300
+
+
+def get_user_stats(user):
+	"""Cached stats of a user; see compute_user_stats for the keys"""
+	key = STATS_KEY.format(user)
+	stats = frappe.cache.get_value(key)
+	if stats is None:
+		stats = compute_user_stats(user)
+		frappe.cache.set_value(key, stats, expires_in_sec=STATS_TTL)
+	return stats
+
+
+def compute_user_stats(user):
+	"""All assignment, comment, evaluation and login stats of a user"""
+	values = {
+		"user": user,
+		"user_variations": tuple(get_user_variations(user)),
+		"month_start": get_first_day(nowdate()),
+		"seven_days_ago": add_days(now_datetime(), -7),
+		"week_ago": add_days(nowdate(), -7)
+	}
+
+	# Status counts are for the user itself; totals also cover the admin- variant
+	assignments = frappe.db.sql("""
+		SELECT
+			COUNT(*) AS total_sessions,
+			SUM(CASE WHEN assigned_user = %(user)s AND doctor_status = 'Not Started' THEN 1 ELSE 0 END) AS not_started,
+			SUM(CASE WHEN assigned_user = %(user)s AND doctor_status = 'In Progress' THEN 1 ELSE 0 END) AS in_progress,
+			SUM(CASE WHEN assigned_user = %(user)s AND doctor_status = 'Completed' THEN 1 ELSE 0 END) AS completed,
+			SUM(CASE WHEN assigned_user = %(user)s AND doctor_status = 'Completed'
+				AND completed_at >= %(month_start)s THEN 1 ELSE 0 END) AS completed_this_month,
+			MAX(COALESCE(assignment_date, creation)) AS last_assignment
+		FROM `tabSession Assignment`
+		WHERE assigned_user IN %(user_variations)s AND docstatus != 2
+	""", values, as_dict=True)[0]
+
+	activity = frappe.db.sql("""
+		SELECT
+			COUNT(*) AS total_comments,
+			MAX(vc.creation) AS last_comment,
+			SUM(CASE WHEN vc.created_at >= %(seven_days_ago)s THEN 1 ELSE 0 END) AS recent_comments,
+			SUM(CASE WHEN vc.creation >= %(week_ago)s THEN 1 ELSE 0 END) AS comments_this_week,
+			(
+				SELECT COUNT(*) FROM `tabSession Evaluation`
+				WHERE doctor IN %(user_variations)s AND docstatus != 2
+			) AS completed_evaluations,
+			(SELECT last_login FROM `tabUser` WHERE name = %(user)s) AS last_login
+		FROM `tabVideo Comment` vc
+		WHERE vc.user = %(user)s AND vc.docstatus != 2
+	""", values, as_dict=True)[0]
+
+	activity_times = [
+		get_datetime(value) for value in (activity.last_comment, assignments.last_assignment, activity.last_login) if value
+	]
+
+	return {
+		"total_sessions": assignments.total_sessions or 0,
+		"session_counts": {
+			"not_started": int(assignments.not_started or 0),
+			"in_progress": int(assignments.in_progress or 0),
+			"completed": int(assignments.completed or 0)
+		},
+		"completed_this_month": int(assignments.completed_this_month or 0),
+		"total_comments": activity.total_comments or 0,
+		"recent_comments": int(activity.recent_comments or 0),
+		"comments_this_week": int(activity.comments_this_week or 0),
+		"last_comment": activity.last_comment,
+		"completed_evaluations": activity.completed_evaluations or 0,
+		"last_login": activity.last_login,
+		"last_activity": max(activity_times) if activity_times else None
+	}
+
+
+def get_user_variations(user):
+	"""User values that may refer to this user on assignments and evaluations"""
+	user_variations = [user]
+	if "@" in user and not user.startswith("admin-"):
+		user_variations.append(f"admin-{user}")
+	elif user.startswith("admin-"):
+		user_variations.append(user.replace("admin-", "", 1))
+	return user_variations
+
+
+def get_canonical_user(user):
+	"""The one value all of a user's variations map to, as stored on Activity Events"""
+	if user and user.startswith("admin-"):
+		return user.replace("admin-", "", 1)
+	return user
+
+
+def invalidate_user_stats(*users):
+	"""Drop the cached stats of the given users"""
+	keys = set()
+	for user in filter(None, users):
+		keys.update(STATS_KEY.format(variation) for variation in get_user_variations(user))
+	if keys:
+		frappe.cache.delete_value(list(keys))
+
+
+# Document hooks
+
+
+def on_comment_change(doc, method=None):
+	invalidate_user_stats(doc.user)
+
+
+def on_assignment_change(doc, method=None):
+	invalidate_user_stats(doc.assigned_user)
+
+
+def on_evaluation_change(doc, method=None):
+	invalidate_user_stats(doc.doctor)